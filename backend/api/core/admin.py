@@ -96,4 +96,24 @@ class SmartphoneImageAdmin(admin.ModelAdmin):
         obj.user = request.user
     obj.save()
 
-admin.site.register(models.SmartphoneImage, SmartphoneImageAdmin)
\ No newline at end of file
+admin.site.register(models.SmartphoneImage, SmartphoneImageAdmin)
+
+
+class TaskAdmin(admin.ModelAdmin):
+  """ Define the admin pages for background tasks."""
+  ordering = ['-id']
+  search_fields = ('name', )
+  list_display = ['id', 'name', 'status', 'attempts', 'run_after']
+  list_filter = ('status', )
+  readonly_fields = ('started_at', 'worker', 'last_error', )
+
+admin.site.register(models.Task, TaskAdmin)
+
+class ApiTokenAdmin(admin.ModelAdmin):
+  """Define the admin pages for API tokens."""
+  ordering = ['-id']
+  search_fields = ('name', 'prefix', 'user__email', )
+  list_display = ['id', 'user', 'name', 'prefix', 'expires_at', 'last_used_at']
+  readonly_fields = ('prefix', 'key_hash', 'created_at', 'last_used_at', )
+
+admin.site.register(models.ApiToken, ApiTokenAdmin)
@@ -0,0 +1,17 @@
+"""
+Password hashers with a cost set from the settings
+"""
+from django.conf import settings
+from django.contrib.auth import hashers
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+  """
+  PBKDF2 using PASSWORD_HASH_ITERATIONS rounds.
+
+  The algorithm name is unchanged, so existing hashes keep verifying and
+  are rehashed at the configured cost on the next successful login.
+  """
+
+  @property
+  def iterations(self):
+    return settings.PASSWORD_HASH_ITERATIONS or super().iterations
@@ -0,0 +1,147 @@
+"""
+Deduplication and responsive variants for uploaded smartphone images
+"""
+import hashlib
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+from PIL import Image, ImageOps, UnidentifiedImageError # type: ignore
+
+from core.models import (
+  SmartphoneImage,
+  ProcessingStatus
+)
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {
+  'JPEG': '.jpg',
+  'WEBP': '.webp',
+  'AVIF': '.avif',
+}
+
+def content_hash(field_file):
+  """Return the SHA-256 hex digest of a file, read in chunks"""
+  digest = hashlib.sha256()
+  for chunk in field_file.chunks():
+    digest.update(chunk)
+  field_file.seek(0)
+
+  return digest.hexdigest()
+
+def deduplicate(smartphone_image):
+  """
+  Point a new upload at the stored file with the same content, if any.
+
+  Uploads are named by their content hash, so identical bytes are written
+  once. When the file already exists the upload is not stored again and
+  the variants of an image sharing it are reused.
+  """
+  field_file = smartphone_image.image
+  smartphone_image.content_hash = content_hash(field_file)
+  name = field_file.field.generate_filename(smartphone_image, field_file.name)
+
+  if not field_file.storage.exists(name):
+    return
+
+  smartphone_image.image = name
+  twin = SmartphoneImage.objects.filter(
+    content_hash = smartphone_image.content_hash,
+    image = name,
+    processing_status = ProcessingStatus.READY,
+  ).exclude(pk = smartphone_image.pk).first()
+
+  if twin is not None:
+    smartphone_image.variants = twin.variants
+    smartphone_image.processing_status = ProcessingStatus.READY
+
+def release(smartphone_image):
+  """Delete the file and variants of a deleted image no row references"""
+  name = smartphone_image.image.name
+  referenced = SmartphoneImage.objects.filter(
+    content_hash = smartphone_image.content_hash,
+    image = name,
+  ).exists()
+  if referenced:
+    return
+
+  storage = smartphone_image.image.storage
+  for variant in smartphone_image.variants:
+    storage.delete(variant['name'])
+  storage.delete(name)
+
+def variant_formats():
+  """Return the configured output formats the installed Pillow can write"""
+  Image.init()
+  return [fmt for fmt in settings.IMAGE_VARIANT_FORMATS if fmt in Image.SAVE]
+
+def variant_prefix(name):
+  """Return the storage name prefix shared by the variants of name"""
+  base, _ = os.path.splitext(name)
+  return f'{base}_w'
+
+def _open(field_file):
+  """Load the image in field_file, applying its EXIF orientation"""
+  with field_file.open('rb'):
+    image = Image.open(field_file)
+    image = ImageOps.exif_transpose(image)
+    image.load()
+
+  has_alpha = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+  return image.convert('RGBA' if has_alpha else 'RGB')
+
+def generate_variants(smartphone_image):
+  """
+  Write downscaled copies of the image next to the original.
+
+  One file is written per configured width narrower than the original
+  and per supported format. Returns the variant descriptions.
+  """
+  source = smartphone_image.image
+  storage = source.storage
+  image = _open(source)
+
+  widths = sorted(
+    width for width in settings.IMAGE_VARIANT_WIDTHS if width < image.width
+  ) or [image.width]
+  prefix = variant_prefix(source.name)
+
+  variants = []
+  for width in widths:
+    resized = image.copy()
+    resized.thumbnail((width, image.height), Image.Resampling.LANCZOS)
+
+    for fmt in variant_formats():
+      name = f'{prefix}{width}{EXTENSIONS[fmt]}'
+
+      # Content-addressed originals share their variants
+      if not (smartphone_image.content_hash and storage.exists(name)):
+        frame = resized.convert('RGB') if fmt == 'JPEG' else resized
+        buffer = io.BytesIO()
+        frame.save(buffer, fmt, quality=settings.IMAGE_VARIANT_QUALITY)
+        name = storage.save(name, ContentFile(buffer.getvalue()))
+
+      variants.append({
+        'name': name,
+        'format': fmt.lower(),
+        'width': resized.width,
+        'height': resized.height,
+      })
+
+  return variants
+
+def process_image(smartphone_image):
+  """Return the variants of a smartphone image, none if it is unreadable"""
+  try:
+    return generate_variants(smartphone_image)
+  except (UnidentifiedImageError, Image.DecompressionBombError):
+    logger.warning(
+      'Unable to generate variants for smartphone image %s',
+      smartphone_image.pk,
+      exc_info=True,
+    )
+    return []
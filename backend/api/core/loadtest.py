@@ -0,0 +1,241 @@
+"""
+HTTP load generator for the public API benchmarks
+"""
+import io
+import json
+import random
+import statistics
+import threading
+import time
+import uuid
+from collections import Counter
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
+from urllib.parse import urlencode, urlsplit
+
+from PIL import Image
+
+def percentile(ordered, fraction):
+  """Return the value below which fraction of the sorted samples fall"""
+  index = min(len(ordered) - 1, int(len(ordered) * fraction))
+
+  return ordered[index]
+
+def summarize(latencies, statuses, elapsed):
+  """Return the throughput and latency figures of a run, in ms"""
+  ordered = sorted(latencies)
+  errors = sum(
+    count for code, count in statuses.items()
+    if not 200 <= code < 300
+  )
+
+  return {
+    'requests': len(ordered),
+    'errors': errors,
+    'statuses': {str(code): count for code, count in sorted(statuses.items())},
+    'rps': round(len(ordered) / elapsed, 1),
+    'mean_ms': round(statistics.mean(ordered) * 1000, 2),
+    'p50_ms': round(percentile(ordered, 0.50) * 1000, 2),
+    'p95_ms': round(percentile(ordered, 0.95) * 1000, 2),
+    'p99_ms': round(percentile(ordered, 0.99) * 1000, 2),
+  }
+
+def error_rate(result):
+  """Return the share of failed requests in a result"""
+  return result.get('errors', 0) / max(1, result.get('requests', 0))
+
+def regressions(results, baseline, tolerance):
+  """
+  Describe every scenario worse than its baseline beyond tolerance.
+
+  Failing faster is not an improvement: a higher error rate than the
+  baseline's is reported, as is a scenario the baseline does not cover.
+  """
+  found = []
+  for name, result in results.items():
+    expected = baseline.get(name)
+    if expected is None:
+      found.append(f'{name}: not in the baseline, save a new one')
+      continue
+
+    if error_rate(result) > error_rate(expected):
+      found.append(
+        f'{name}: {error_rate(result):.1%} errors, '
+        f'baseline {error_rate(expected):.1%}, statuses {result["statuses"]}'
+      )
+    if result['p95_ms'] > expected['p95_ms'] * (1 + tolerance):
+      found.append(
+        f'{name}: p95 {result["p95_ms"]}ms, baseline {expected["p95_ms"]}ms'
+      )
+    if result['rps'] < expected['rps'] * (1 - tolerance):
+      found.append(
+        f'{name}: {result["rps"]} req/s, baseline {expected["rps"]} req/s'
+      )
+
+  return found
+
+def jpeg(seed):
+  """Return a small JPEG whose content depends on seed"""
+  rng = random.Random(seed)
+  image = Image.new('RGB', (64, 64), tuple(rng.randrange(256) for _ in range(3)))
+  image.putpixel((rng.randrange(64), rng.randrange(64)), (0, 0, 0))
+  buffer = io.BytesIO()
+  image.save(buffer, format='JPEG')
+
+  return buffer.getvalue()
+
+def multipart(field, filename, content, content_type):
+  """Encode a single file as a multipart/form-data body"""
+  boundary = uuid.uuid4().hex
+  body = b''.join([
+    f'--{boundary}\r\n'.encode(),
+    (
+      f'Content-Disposition: form-data; name="{field}"; '
+      f'filename="{filename}"\r\n'
+    ).encode(),
+    f'Content-Type: {content_type}\r\n\r\n'.encode(),
+    content,
+    f'\r\n--{boundary}--\r\n'.encode(),
+  ])
+
+  return body, f'multipart/form-data; boundary={boundary}'
+
+class Fixtures:
+  """Ids and credentials of seeded data the scenarios pick from"""
+
+  def __init__(self, smartphone_ids, tag_ids, logins, token):
+    self.smartphone_ids = smartphone_ids
+    self.tag_ids = tag_ids
+    self.logins = logins
+    self.token = token
+
+def list_by_tag(rng, fixtures):
+  """List smartphones carrying a random tag"""
+  query = urlencode({'tags': rng.choice(fixtures.tag_ids)})
+
+  return 'GET', f'/api/smartphones/smartphone/?{query}', None, {}
+
+def retrieve(rng, fixtures):
+  """Retrieve a random smartphone"""
+  pk = rng.choice(fixtures.smartphone_ids)
+
+  return 'GET', f'/api/smartphones/smartphone/{pk}/', None, {}
+
+def create(rng, fixtures):
+  """Create a smartphone with two tags"""
+  body = json.dumps({
+    'name': f'Load test {rng.randrange(10 ** 6)}',
+    'price': '199.99',
+    'description': 'Created by the load test',
+    'tags': [{'name': f'loadtest-{rng.randrange(20)}'} for _ in range(2)],
+  }).encode()
+
+  return 'POST', '/api/smartphones/smartphone/', body, {
+    'Authorization': f'Token {fixtures.token}',
+    'Content-Type': 'application/json',
+  }
+
+def upload_image(rng, fixtures):
+  """Upload a new image to a random smartphone"""
+  pk = rng.choice(fixtures.smartphone_ids)
+  body, content_type = multipart(
+    'image',
+    'upload.jpg',
+    jpeg(rng.random()),
+    'image/jpeg',
+  )
+
+  return 'POST', f'/api/smartphones/smartphone/{pk}/upload-image/', body, {
+    'Authorization': f'Token {fixtures.token}',
+    'Content-Type': content_type,
+  }
+
+def login(rng, fixtures):
+  """Log in as a random seeded user"""
+  email, password = rng.choice(fixtures.logins)
+  body = urlencode({'email': email, 'password': password}).encode()
+
+  return 'POST', '/api/user/token/', body, {
+    'Content-Type': 'application/x-www-form-urlencoded',
+  }
+
+SCENARIOS = {
+  'list_by_tag': list_by_tag,
+  'retrieve': retrieve,
+  'create': create,
+  'upload_image': upload_image,
+  'login': login,
+}
+
+class LoadTest:
+  """
+  Replay one scenario from concurrent clients over keep-alive connections.
+
+  Requests are built before their timer starts, so only the round trip
+  to the server is measured.
+  """
+
+  def __init__(self, base_url, fixtures, concurrency, requests, timeout=30):
+    self.base_url = urlsplit(base_url)
+    self.fixtures = fixtures
+    self.concurrency = max(1, min(concurrency, requests))
+    self.requests = max(1, requests)
+    self.timeout = timeout
+
+  def _connect(self):
+    """Open a connection to the server under test"""
+    connection_class = (
+      HTTPSConnection if self.base_url.scheme == 'https' else HTTPConnection
+    )
+
+    return connection_class(self.base_url.netloc, timeout=self.timeout)
+
+  def run(self, scenario):
+    """Send the scenario's requests and return their summary"""
+    self.latencies = []
+    self.statuses = Counter()
+    self.lock = threading.Lock()
+    self.remaining = iter(range(self.requests))
+
+    threads = [
+      threading.Thread(target=self._work, args=(scenario, seed), daemon=True)
+      for seed in range(self.concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    elapsed = time.perf_counter() - started
+
+    return summarize(self.latencies, self.statuses, elapsed)
+
+  def _work(self, scenario, seed):
+    """Send requests from one client until none are left"""
+    rng = random.Random(seed)
+    connection = self._connect()
+    prefix = self.base_url.path.rstrip('/')
+
+    try:
+      while True:
+        with self.lock:
+          if next(self.remaining, None) is None:
+            return
+
+        method, path, body, headers = scenario(rng, self.fixtures)
+        started = time.perf_counter()
+        try:
+          connection.request(method, prefix + path, body, headers)
+          response = connection.getresponse()
+          response.read()
+          code = response.status
+        except (HTTPException, OSError):
+          connection.close()
+          connection = self._connect()
+          code = 0
+        latency = time.perf_counter() - started
+
+        with self.lock:
+          self.latencies.append(latency)
+          self.statuses[code] += 1
+    finally:
+      connection.close()
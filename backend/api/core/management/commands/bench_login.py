@@ -0,0 +1,146 @@
+"""
+Django command to benchmark the login endpoint under concurrency.
+"""
+import statistics
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory, override_settings
+
+from user.views import CreateTokenView
+
+PASSWORD = 'bench-password-123'
+
+class Command(BaseCommand):
+  """Issue concurrent logins in process and report throughput and latency."""
+  help = 'Benchmark the login endpoint to size password hashing and workers'
+
+  def add_arguments(self, parser):
+    parser.add_argument(
+      '--requests',
+      type=int,
+      default=200,
+      help='Total login attempts',
+    )
+    parser.add_argument(
+      '--concurrency',
+      type=int,
+      default=4,
+      help='Attempts in flight at the same time, like uwsgi workers',
+    )
+    parser.add_argument(
+      '--iterations',
+      type=int,
+      default=settings.PASSWORD_HASH_ITERATIONS,
+      help='PBKDF2 rounds to hash with, the configured cost by default',
+    )
+    parser.add_argument(
+      '--wrong-password',
+      action='store_true',
+      help='Send bad credentials, like a credential stuffing burst',
+    )
+    parser.add_argument(
+      '--throttle',
+      action='store_true',
+      help='Keep the login rate limits enabled',
+    )
+
+  def handle(self, *args, **options):
+    overrides = {'PASSWORD_HASH_ITERATIONS': options['iterations']}
+    if not options['throttle']:
+      overrides.update(LOGIN_RATE_LIMIT_IP=None, LOGIN_RATE_LIMIT_EMAIL=None)
+
+    with override_settings(**overrides):
+      user = get_user_model().objects.create_user(
+        email = f'bench-{uuid.uuid4().hex}@example.com',
+        password = PASSWORD,
+      )
+      try:
+        self._run(user, options)
+      finally:
+        user.delete()
+
+  def _run(self, user, options):
+    """Send the logins and print a summary"""
+    password = 'wrong' if options['wrong_password'] else PASSWORD
+    total = max(1, options['requests'])
+    concurrency = max(1, min(options['concurrency'], total))
+
+    self.latencies = []
+    self.statuses = Counter()
+    self.lock = threading.Lock()
+    self.remaining = iter(range(total))
+
+    started = time.perf_counter()
+    if concurrency == 1:
+      self._work(user.email, password, 1)
+    else:
+      threads = [
+        threading.Thread(
+          target=self._work,
+          args=(user.email, password, number),
+          daemon=True,
+        )
+        for number in range(1, concurrency + 1)
+      ]
+      for thread in threads:
+        thread.start()
+      for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    self.latencies.sort()
+    def percentile(fraction):
+      index = min(len(self.latencies) - 1, int(len(self.latencies) * fraction))
+      return self.latencies[index] * 1000
+
+    self.stdout.write(
+      f'{total} logins, {concurrency} concurrent, '
+      f'{settings.PASSWORD_HASH_ITERATIONS or "default"} PBKDF2 iterations'
+    )
+    self.stdout.write(
+      'Status codes: ' + ', '.join(
+        f'{code}={count}' for code, count in sorted(self.statuses.items())
+      )
+    )
+    self.stdout.write(
+      f'Latency ms: mean={statistics.mean(self.latencies) * 1000:.1f} '
+      f'p50={percentile(0.5):.1f} p95={percentile(0.95):.1f} '
+      f'p99={percentile(0.99):.1f}'
+    )
+    self.stdout.write(self.style.SUCCESS(
+      f'Throughput: {total / elapsed:.1f} logins/s'
+    ))
+
+  def _work(self, email, password, number):
+    """Send logins from one simulated client until none are left"""
+    factory = RequestFactory()
+    view = CreateTokenView.as_view()
+
+    try:
+      while True:
+        with self.lock:
+          if next(self.remaining, None) is None:
+            return
+
+        request = factory.post(
+          '/api/user/token/',
+          {'email': email, 'password': password},
+          REMOTE_ADDR = f'10.0.0.{number % 255}',
+        )
+        started = time.perf_counter()
+        response = view(request)
+        latency = time.perf_counter() - started
+
+        with self.lock:
+          self.latencies.append(latency)
+          self.statuses[response.status_code] += 1
+    finally:
+      if threading.current_thread() is not threading.main_thread():
+        connection.close()
@@ -0,0 +1,166 @@
+"""
+Django command to benchmark requests through the full request cycle.
+"""
+import statistics
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.db.backends.signals import connection_created
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core.models import ApiToken, Smartphone
+
+class Command(BaseCommand):
+  """
+  Send concurrent requests in process and report requests per second.
+
+  Requests go through the whole handler. The test client skips closing
+  old connections, so that is done around each request as under uwsgi.
+  By default they retrieve the latest smartphone as its owner: an
+  authenticated read skips the response cache and queries the database.
+  Run it once per database configuration to compare them, e.g.
+  DB_CONN_MAX_AGE=0, the default, and DB_POOL=1.
+  """
+  help = 'Benchmark requests per second for the database connection settings'
+
+  def add_arguments(self, parser):
+    parser.add_argument(
+      '--path',
+      help=(
+        'Path requested, one querying the database on every request, '
+        'defaults to the latest smartphone'
+      ),
+    )
+    parser.add_argument(
+      '--requests',
+      type=int,
+      default=1000,
+      help='Total requests',
+    )
+    parser.add_argument(
+      '--concurrency',
+      type=int,
+      default=4,
+      help='Requests in flight at the same time',
+    )
+
+  def handle(self, *args, **options):
+    total = max(1, options['requests'])
+    concurrency = max(1, min(options['concurrency'], total))
+    smartphone = Smartphone.objects.select_related('user').last()
+
+    if smartphone is None:
+      raise CommandError('No smartphone to request, run seed_data first.')
+
+    path = options['path'] or reverse(
+      'smartphone:smartphone-detail',
+      args=[smartphone.id],
+    )
+
+    self.latencies = []
+    self.statuses = Counter()
+    self.connections = 0
+    self.queries = 0
+    self.lock = threading.Lock()
+    self.remaining = iter(range(total))
+
+    token, self.key = ApiToken.objects.create_token(
+      smartphone.user,
+      name='bench_requests',
+    )
+    connection_created.connect(self._count_connection)
+    try:
+      with override_settings(ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']):
+        started = time.perf_counter()
+        self._run(path, concurrency)
+        elapsed = time.perf_counter() - started
+    finally:
+      connection_created.disconnect(self._count_connection)
+      token.delete()
+
+    database = settings.DATABASES['default']
+    pool = database.get('OPTIONS', {}).get('pool')
+    mode = (
+      f'pool max_size={pool["max_size"]}' if pool
+      else f'CONN_MAX_AGE={database.get("CONN_MAX_AGE", 0)}'
+    )
+
+    self.latencies.sort()
+    def percentile(fraction):
+      index = min(len(self.latencies) - 1, int(len(self.latencies) * fraction))
+      return self.latencies[index] * 1000
+
+    self.stdout.write(
+      f'{total} requests to {path}, {concurrency} concurrent, {mode}'
+    )
+    self.stdout.write(
+      'Status codes: ' + ', '.join(
+        f'{code}={count}' for code, count in sorted(self.statuses.items())
+      )
+    )
+    self.stdout.write(f'Connections opened: {self.connections}')
+    self.stdout.write(f'Queries run: {self.queries}')
+    self.stdout.write(
+      f'Latency ms: mean={statistics.mean(self.latencies) * 1000:.2f} '
+      f'p50={percentile(0.5):.2f} p95={percentile(0.95):.2f} '
+      f'p99={percentile(0.99):.2f}'
+    )
+    self.stdout.write(self.style.SUCCESS(
+      f'Throughput: {total / elapsed:.1f} requests/s'
+    ))
+
+  def _count_connection(self, sender, **kwargs):
+    """Count every new database connection"""
+    with self.lock:
+      self.connections += 1
+
+  def _count_query(self, execute, sql, params, many, context):
+    """Count every query sent to the database"""
+    with self.lock:
+      self.queries += 1
+
+    return execute(sql, params, many, context)
+
+  def _run(self, path, concurrency):
+    """Send the requests from concurrency threads"""
+    if concurrency == 1:
+      self._work(path)
+      return
+
+    threads = [
+      threading.Thread(target=self._work, args=(path,), daemon=True)
+      for _ in range(concurrency)
+    ]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+
+  def _work(self, path):
+    """Send requests until none are left"""
+    client = Client(headers = {'Authorization': f'Token {self.key}'})
+
+    try:
+      with connection.execute_wrapper(self._count_query):
+        while True:
+          with self.lock:
+            if next(self.remaining, None) is None:
+              return
+
+          started = time.perf_counter()
+          close_old_connections()
+          response = client.get(path)
+          close_old_connections()
+          latency = time.perf_counter() - started
+
+          with self.lock:
+            self.latencies.append(latency)
+            self.statuses[response.status_code] += 1
+    finally:
+      if threading.current_thread() is not threading.main_thread():
+        connection.close()
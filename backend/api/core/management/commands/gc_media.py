@@ -0,0 +1,212 @@
+"""
+Django command to remove media files nothing references.
+"""
+import os
+import shutil
+import time
+import uuid
+from datetime import timedelta
+from functools import reduce
+from itertools import islice
+from operator import or_
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from core import uploads
+from core.models import (
+  Smartphone,
+  SmartphoneImage,
+  VideoUpload
+)
+
+TEMP_DIR = 'uploads/tmp/'
+
+def walk(root):
+  """Yield the files below root one directory listing at a time"""
+  directories = [root]
+  while directories:
+    try:
+      entries = os.scandir(directories.pop())
+    except FileNotFoundError:
+      continue
+
+    with entries:
+      for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+          directories.append(entry.path)
+        elif entry.is_file(follow_symlinks=False):
+          yield entry
+
+def batched(iterable, size):
+  """Yield lists of up to size items from iterable"""
+  iterator = iter(iterable)
+  while batch := list(islice(iterator, size)):
+    yield batch
+
+def referenced(names):
+  """Return the subset of the storage names the database refers to"""
+  names = set(names)
+  found = set(
+    SmartphoneImage.objects.filter(image__in = names)
+    .values_list('image', flat=True)
+  )
+  found.update(
+    Smartphone.objects.filter(video__in = names)
+    .values_list('video', flat=True)
+  )
+
+  variants = [Q(variants__contains = [{'name': name}]) for name in names]
+  for row in SmartphoneImage.objects.filter(
+    reduce(or_, variants)
+  ).values_list('variants', flat=True):
+    found.update(variant['name'] for variant in row if variant['name'] in names)
+
+  upload_ids = {}
+  for name in names:
+    if name.startswith(TEMP_DIR) and name.endswith('.part'):
+      try:
+        upload_ids[uuid.UUID(name[len(TEMP_DIR):-len('.part')])] = name
+      except ValueError:
+        pass
+  found.update(
+    upload_ids[upload_id] for upload_id in
+    VideoUpload.objects.filter(pk__in = list(upload_ids))
+    .values_list('pk', flat=True)
+  )
+
+  return found
+
+class Command(BaseCommand):
+  """Delete or quarantine files under MEDIA_ROOT/uploads nothing uses."""
+  help = 'Remove orphaned media files'
+
+  def add_arguments(self, parser):
+    parser.add_argument(
+      '--dry-run',
+      action='store_true',
+      help='Report orphans without touching them',
+    )
+    parser.add_argument(
+      '--quarantine',
+      metavar='DIR',
+      help='Move orphans into DIR instead of deleting them',
+    )
+    parser.add_argument(
+      '--min-age',
+      type=int,
+      default=24 * 3600,
+      help='Seconds a file must be untouched before it can be removed',
+    )
+    parser.add_argument(
+      '--rate',
+      type=float,
+      default=0,
+      help='Maximum files removed per second, 0 for no limit',
+    )
+    parser.add_argument(
+      '--batch-size',
+      type=int,
+      default=500,
+      help='Files checked against the database per query',
+    )
+    parser.add_argument(
+      '--prune-images',
+      action='store_true',
+      help='Also delete image rows no smartphone uses any more',
+    )
+
+  def handle(self, *args, **options):
+    self.dry_run = options['dry_run']
+    self.quarantine = options['quarantine']
+    self.interval = 1 / options['rate'] if options['rate'] > 0 else 0
+    self.next_removal = 0
+
+    cutoff = timezone.now() - timedelta(seconds=options['min_age'])
+    self._expire_uploads()
+    if options['prune_images']:
+      self._prune_images(cutoff)
+
+    scanned = orphans = 0
+    root = os.path.join(settings.MEDIA_ROOT, 'uploads')
+    files = (
+      entry for entry in walk(root)
+      if entry.stat().st_mtime < cutoff.timestamp()
+    )
+
+    for batch in batched(files, options['batch_size']):
+      names = {
+        os.path.relpath(entry.path, settings.MEDIA_ROOT).replace(os.sep, '/'):
+        entry.path
+        for entry in batch
+      }
+      found = referenced(names)
+      scanned += len(names)
+
+      for name, path in names.items():
+        if name not in found:
+          orphans += 1
+          self._remove(name, path)
+
+    action = 'Found' if self.dry_run else 'Removed'
+    self.stdout.write(self.style.SUCCESS(
+      f'{action} {orphans} orphaned files out of {scanned} checked.'
+    ))
+
+  def _throttle(self):
+    """Sleep as needed to stay under the removal rate"""
+    if not self.interval:
+      return
+
+    now = time.monotonic()
+    if now < self.next_removal:
+      time.sleep(self.next_removal - now)
+    self.next_removal = max(now, self.next_removal) + self.interval
+
+  def _remove(self, name, path):
+    """Delete or quarantine one orphaned file"""
+    if self.dry_run:
+      self.stdout.write(f'Orphan: {name}')
+      return
+
+    self._throttle()
+    try:
+      if self.quarantine:
+        target = os.path.join(self.quarantine, name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(path, target)
+      else:
+        os.remove(path)
+    except FileNotFoundError:
+      pass
+
+  def _expire_uploads(self):
+    """Drop resumable uploads left unfinished past the expiry"""
+    expired = VideoUpload.objects.filter(
+      updated_at__lt = timezone.now() - timedelta(
+        seconds = settings.VIDEO_UPLOAD_EXPIRY,
+      ),
+    )
+    if self.dry_run:
+      self.stdout.write(f'Expired uploads: {expired.count()}')
+      return
+
+    for upload in expired.iterator():
+      uploads.discard(upload)
+      upload.delete()
+
+  def _prune_images(self, cutoff):
+    """Delete images no longer attached to any smartphone"""
+    unattached = SmartphoneImage.objects.filter(
+      smartphone__isnull = True,
+      updated_at__lt = cutoff,
+    )
+    if self.dry_run:
+      self.stdout.write(f'Unattached images: {unattached.count()}')
+      return
+
+    for image in unattached.iterator():
+      self._throttle()
+      image.delete()
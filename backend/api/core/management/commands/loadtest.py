@@ -0,0 +1,170 @@
+"""
+Django command to load test the public API of a running server.
+"""
+import json
+import random
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.loadtest import Fixtures, LoadTest, regressions, SCENARIOS
+from core.management.commands.seed_data import (
+  SEED_EMAIL_PREFIX,
+  SEED_PASSWORD
+)
+from core.models import ApiToken, Smartphone, Tag
+
+SAMPLE_SIZE = 1000
+
+class Command(BaseCommand):
+  """
+  Replay the API scenarios against a server and report latency percentiles.
+
+  Run it against a local stack holding data from seed_data. Results can be
+  saved as the baseline, stored in the repository, and later runs fail
+  when a scenario is slower than its baseline beyond the tolerance, fails
+  more often, or is missing from it. The
+  login scenario needs LOGIN_RATE_LIMIT_IP and LOGIN_RATE_LIMIT_EMAIL set
+  empty on the server, or it measures the rate limit.
+  """
+  help = 'Load test the public API and compare with the stored baseline'
+
+  def add_arguments(self, parser):
+    parser.add_argument(
+      '--base-url',
+      default='http://localhost:8000',
+      help='Server under test',
+    )
+    parser.add_argument(
+      '--scenario',
+      action='append',
+      choices=sorted(SCENARIOS),
+      help='Scenario to run, repeatable, defaults to all',
+    )
+    parser.add_argument(
+      '--requests',
+      type=int,
+      default=1000,
+      help='Requests per scenario',
+    )
+    parser.add_argument(
+      '--concurrency',
+      type=int,
+      default=10,
+      help='Requests in flight at the same time',
+    )
+    parser.add_argument(
+      '--baseline',
+      default=str(settings.BASE_DIR / 'benchmarks' / 'baseline.json'),
+      help='Baseline JSON file compared with, or written by --save-baseline',
+    )
+    parser.add_argument(
+      '--save-baseline',
+      action='store_true',
+      help='Write the results as the new baseline',
+    )
+    parser.add_argument(
+      '--output',
+      help='Also write the results to this JSON file',
+    )
+    parser.add_argument(
+      '--tolerance',
+      type=float,
+      default=0.2,
+      help='Allowed slowdown relative to the baseline, 0.2 is 20%%',
+    )
+
+  def handle(self, *args, **options):
+    scenarios = options['scenario'] or list(SCENARIOS)
+    user = get_user_model().objects.filter(
+      email__startswith = SEED_EMAIL_PREFIX,
+    ).order_by('pk').first()
+
+    if user is None:
+      raise CommandError('No seeded data, run seed_data first.')
+
+    token, key = ApiToken.objects.create_token(user, name='loadtest')
+    try:
+      fixtures = self._fixtures(key)
+      results = {}
+      for name in scenarios:
+        load_test = LoadTest(
+          options['base_url'],
+          fixtures,
+          options['concurrency'],
+          options['requests'],
+        )
+        results[name] = load_test.run(SCENARIOS[name])
+        self._report(name, results[name])
+    finally:
+      token.delete()
+
+    if options['output']:
+      self._write(options['output'], results)
+
+    if options['save_baseline']:
+      self._write(options['baseline'], results)
+      self.stdout.write(self.style.SUCCESS(
+        f'Baseline saved to {options["baseline"]}'
+      ))
+      return
+
+    try:
+      with open(options['baseline']) as baseline_file:
+        baseline = json.load(baseline_file)
+    except FileNotFoundError:
+      self.stdout.write(self.style.WARNING(
+        f'No baseline at {options["baseline"]}, nothing compared. '
+        'Record one with --save-baseline.'
+      ))
+      return
+
+    found = regressions(results, baseline, options['tolerance'])
+    if found:
+      raise CommandError('Worse than the baseline:\n' + '\n'.join(found))
+
+    self.stdout.write(self.style.SUCCESS('Within the baseline.'))
+
+  def _fixtures(self, key):
+    """Sample the seeded ids the scenarios pick from"""
+    smartphone_ids = self._sample(Smartphone.objects.all())
+    tag_ids = self._sample(Tag.objects.filter(smartphone__isnull = False))
+    emails = get_user_model().objects.filter(
+      email__startswith = SEED_EMAIL_PREFIX,
+    ).values_list('email', flat=True)[:SAMPLE_SIZE]
+
+    if not smartphone_ids or not tag_ids:
+      raise CommandError('No seeded smartphones or tags, run seed_data first.')
+
+    return Fixtures(
+      smartphone_ids = smartphone_ids,
+      tag_ids = tag_ids,
+      logins = [(email, SEED_PASSWORD) for email in emails],
+      token = key,
+    )
+
+  def _sample(self, queryset):
+    """Return up to SAMPLE_SIZE random ids of queryset"""
+    ids = list(queryset.values_list('pk', flat=True).distinct())
+
+    return random.sample(ids, min(SAMPLE_SIZE, len(ids)))
+
+  def _report(self, name, result):
+    """Print the figures of one scenario"""
+    statuses = ', '.join(
+      f'{code}={count}' for code, count in result['statuses'].items()
+    )
+    self.stdout.write(
+      f'{name:<14} {result["rps"]:>8.1f} req/s  '
+      f'p50={result["p50_ms"]:.2f} p95={result["p95_ms"]:.2f} '
+      f'p99={result["p99_ms"]:.2f} ms  {statuses}'
+    )
+
+  def _write(self, path, results):
+    """Write results as JSON"""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as results_file:
+      json.dump(results, results_file, indent=2, sort_keys=True)
+      results_file.write('\n')
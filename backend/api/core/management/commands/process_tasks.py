@@ -0,0 +1,85 @@
+"""
+Django command to run queued background tasks.
+"""
+import os
+import signal
+import socket
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from core import tasks
+
+class Command(BaseCommand):
+  """Run queued tasks with a bounded number of threads."""
+  help = 'Run queued background tasks'
+
+  def add_arguments(self, parser):
+    parser.add_argument(
+      '--concurrency',
+      type=int,
+      default=settings.TASK_WORKER_CONCURRENCY,
+      help='Number of tasks run at the same time',
+    )
+    parser.add_argument(
+      '--once',
+      action='store_true',
+      help='Exit when the queue is idle instead of polling',
+    )
+
+  def handle(self, *args, **options):
+    self.stop = threading.Event()
+    self.once = options['once']
+
+    handlers = {}
+    if threading.current_thread() is threading.main_thread():
+      for signum in (signal.SIGTERM, signal.SIGINT):
+        handlers[signum] = signal.signal(signum, lambda *_: self.stop.set())
+
+    try:
+      self._run(options['concurrency'])
+    finally:
+      for signum, handler in handlers.items():
+        signal.signal(signum, handler)
+
+    self.stdout.write(self.style.SUCCESS('Worker stopped.'))
+
+  def _run(self, concurrency):
+    """Run the worker threads until stopped"""
+    tasks.cleanup()
+
+    concurrency = max(1, concurrency)
+    name = f'{socket.gethostname()}:{os.getpid()}'
+    self.stdout.write(f'Processing tasks with {concurrency} threads...')
+
+    if concurrency == 1:
+      self._work(name)
+    else:
+      threads = [
+        threading.Thread(target=self._work, args=(f'{name}:{index}',))
+        for index in range(concurrency)
+      ]
+      for thread in threads:
+        thread.start()
+      for thread in threads:
+        thread.join()
+
+  def _work(self, name):
+    """Claim and run tasks until stopped"""
+    try:
+      while not self.stop.is_set():
+        task = tasks.claim(name)
+
+        if task is not None:
+          tasks.run(task)
+        elif self.once:
+          break
+        else:
+          tasks.cleanup()
+          close_old_connections()
+          self.stop.wait(settings.TASK_POLL_INTERVAL)
+    finally:
+      if threading.current_thread() is not threading.main_thread():
+        connection.close()
@@ -0,0 +1,22 @@
+"""
+Django command to delete expired API tokens.
+"""
+from django.core.management.base import BaseCommand
+
+from core.models import ApiToken
+
+class Command(BaseCommand):
+  """
+  Delete every expired API token.
+
+  Logins purge the expired tokens of the user logging in; run this from
+  cron for the users that do not come back.
+  """
+  help = 'Delete expired API tokens'
+
+  def handle(self, *args, **options):
+    deleted = ApiToken.objects.purge_expired()
+
+    self.stdout.write(self.style.SUCCESS(
+      f'Deleted {deleted} expired tokens.'
+    ))
@@ -0,0 +1,215 @@
+"""
+Django command to seed users, smartphones, tags and images for benchmarks.
+"""
+import random
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.images import process_image
+from core.loadtest import jpeg
+from core.models import (
+  ProcessingStatus,
+  Smartphone,
+  SmartphoneImage,
+  Tag
+)
+
+SEED_EMAIL_PREFIX = 'seed-'
+SEED_PASSWORD = 'seed-password-123'
+DISTINCT_IMAGES = 16
+
+def seed_email(number):
+  """Return the email of the seeded user number"""
+  return f'{SEED_EMAIL_PREFIX}{number}@example.com'
+
+class Command(BaseCommand):
+  """Generate benchmark data in bulk, removable with --clear."""
+  help = 'Seed users, smartphones, tags and images for load testing'
+
+  def add_arguments(self, parser):
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--smartphones', type=int, default=5000)
+    parser.add_argument(
+      '--tags',
+      type=int,
+      default=20,
+      help='Tags per user',
+    )
+    parser.add_argument(
+      '--images',
+      type=int,
+      default=2,
+      help='Images per smartphone',
+    )
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument(
+      '--seed',
+      type=int,
+      default=0,
+      help='Random seed, the same seed generates the same data',
+    )
+    parser.add_argument(
+      '--clear',
+      action='store_true',
+      help='Delete previously seeded data first',
+    )
+
+  def handle(self, *args, **options):
+    if options['clear']:
+      deleted, _ = get_user_model().objects.filter(
+        email__startswith = SEED_EMAIL_PREFIX,
+      ).delete()
+      self.stdout.write(f'Deleted {deleted} seeded rows.')
+
+    self.rng = random.Random(options['seed'])
+    self.batch_size = options['batch_size']
+
+    with transaction.atomic():
+      users = self._users(options['users'])
+      tags = self._tags(users, options['tags'])
+      smartphones = self._smartphones(users, options['smartphones'])
+      self._tag(smartphones, tags)
+      images = self._images(smartphones, options['images'])
+
+    self.stdout.write(self.style.SUCCESS(
+      f'Seeded {len(users)} users, {len(tags)} tags, '
+      f'{len(smartphones)} smartphones and {images} images. '
+      f'Users log in as {seed_email(0)} with password {SEED_PASSWORD}.'
+    ))
+
+  def _users(self, count):
+    """Create users sharing one password hash"""
+    user_model = get_user_model()
+    existing = user_model.objects.filter(
+      email__startswith = SEED_EMAIL_PREFIX,
+    ).count()
+    password = make_password(SEED_PASSWORD)
+
+    return user_model.objects.bulk_create(
+      [
+        user_model(
+          email = seed_email(number),
+          name = f'Seed user {number}',
+          user_name = f'{SEED_EMAIL_PREFIX}{number}',
+          password = password,
+        )
+        for number in range(existing, existing + count)
+      ],
+      batch_size = self.batch_size,
+    )
+
+  def _tags(self, users, per_user):
+    """Create per_user tags for every user"""
+    return Tag.objects.bulk_create(
+      [
+        Tag(user = user, name = f'seed-tag-{number}')
+        for user in users
+        for number in range(per_user)
+      ],
+      batch_size = self.batch_size,
+    )
+
+  def _smartphones(self, users, count):
+    """Create smartphones spread over users"""
+    if not users:
+      return []
+
+    return Smartphone.objects.bulk_create(
+      [
+        Smartphone(
+          user = self.rng.choice(users),
+          name = f'Seed phone {number}',
+          price = Decimal(self.rng.randrange(1000, 99999)) / 100,
+          description = f'Seeded smartphone number {number}',
+        )
+        for number in range(count)
+      ],
+      batch_size = self.batch_size,
+    )
+
+  def _tag(self, smartphones, tags):
+    """Attach up to three of their owner's tags to each smartphone"""
+    tags_by_user = {}
+    for tag in tags:
+      tags_by_user.setdefault(tag.user_id, []).append(tag)
+
+    SmartphoneTags = Smartphone.tags.through
+    SmartphoneTags.objects.bulk_create(
+      [
+        SmartphoneTags(smartphone_id = smartphone.id, tag_id = tag.id)
+        for smartphone in smartphones
+        for tag in self.rng.sample(
+          tags_by_user.get(smartphone.user_id, []),
+          min(3, len(tags_by_user.get(smartphone.user_id, []))),
+        )
+      ],
+      batch_size = self.batch_size,
+    )
+
+  def _images(self, smartphones, per_smartphone):
+    """
+    Attach images to smartphones.
+
+    A few distinct files are uploaded through the model and processed
+    right away; the remaining rows share their files and variants, as
+    deduplicated uploads do.
+    """
+    if not smartphones or per_smartphone <= 0:
+      return 0
+
+    originals = []
+    for number in range(DISTINCT_IMAGES):
+      image = SmartphoneImage(user_id = smartphones[0].user_id)
+      image.image.save(
+        f'seed-{number}.jpg',
+        ContentFile(jpeg(number)),
+        save = True,
+      )
+      image.variants = process_image(image)
+      image.processing_status = (
+        ProcessingStatus.READY if image.variants else ProcessingStatus.FAILED
+      )
+      SmartphoneImage.objects.filter(pk = image.pk).update(
+        variants = image.variants,
+        processing_status = image.processing_status,
+      )
+      originals.append(image)
+
+    images = SmartphoneImage.objects.bulk_create(
+      [
+        SmartphoneImage(
+          user_id = smartphone.user_id,
+          image = original.image.name,
+          content_hash = original.content_hash,
+          variants = original.variants,
+          processing_status = original.processing_status,
+        )
+        for smartphone in smartphones
+        for original in self.rng.sample(
+          originals,
+          min(per_smartphone, len(originals)),
+        )
+      ],
+      batch_size = self.batch_size,
+    )
+
+    owners = [
+      smartphone
+      for smartphone in smartphones
+      for _ in range(min(per_smartphone, len(originals)))
+    ]
+    SmartphoneImages = Smartphone.images.through
+    SmartphoneImages.objects.bulk_create(
+      [
+        SmartphoneImages(smartphone_id = owner.id, smartphoneimage_id = image.id)
+        for owner, image in zip(owners, images)
+      ],
+      batch_size = self.batch_size,
+    )
+
+    return len(images)
@@ -0,0 +1,126 @@
+"""
+Django command to move existing uploads into their shard directories.
+"""
+import os
+import posixpath
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.models import (
+  Smartphone,
+  SmartphoneImage
+)
+
+class Command(BaseCommand):
+  """Relocate images, variants and videos stored before sharding."""
+  help = 'Move existing uploads into sharded directories'
+
+  def add_arguments(self, parser):
+    parser.add_argument(
+      '--batch-size',
+      type=int,
+      default=500,
+      help='Rows relocated per batch',
+    )
+    parser.add_argument(
+      '--dry-run',
+      action='store_true',
+      help='Report what would move without touching anything',
+    )
+
+  def handle(self, *args, **options):
+    if not hasattr(default_storage, 'shard'):
+      raise CommandError('The default storage does not shard files.')
+
+    self.dry_run = options['dry_run']
+    batch_size = options['batch_size']
+
+    images = self._relocate(
+      SmartphoneImage.objects.exclude(image = ''),
+      'image',
+      batch_size,
+    )
+    videos = self._relocate(
+      Smartphone.objects.exclude(video = ''),
+      'video',
+      batch_size,
+    )
+
+    action = 'Would move' if self.dry_run else 'Moved'
+    self.stdout.write(self.style.SUCCESS(
+      f'{action} {images} images and {videos} videos.'
+    ))
+
+  def _target(self, name):
+    """Return where name belongs, or None if it is already sharded"""
+    if default_storage.is_sharded(name):
+      return None
+
+    return default_storage.shard(name)
+
+  def _move(self, source, target, moved):
+    """Move one file, recording it so the batch can be undone"""
+    source_path = default_storage.path(source)
+    target_path = default_storage.path(target)
+
+    if not os.path.exists(source_path):
+      # Deduplicated files are shared and may have moved with another row
+      return
+
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    os.replace(source_path, target_path)
+    moved.append((target_path, source_path))
+
+  def _relocate(self, queryset, field, batch_size):
+    """Move the files of queryset in primary key batches"""
+    count = 0
+    last_pk = 0
+
+    while True:
+      batch = list(
+        queryset.filter(pk__gt = last_pk).order_by('pk')[:batch_size]
+      )
+      if not batch:
+        return count
+      last_pk = batch[-1].pk
+
+      changed = []
+      moved = []
+      now = timezone.now()
+      try:
+        for obj in batch:
+          name = getattr(obj, field).name
+          target = self._target(name)
+          if target is None:
+            continue
+
+          changed.append(obj)
+          if self.dry_run:
+            continue
+
+          self._move(name, target, moved)
+          setattr(obj, field, target)
+          obj.updated_at = now
+
+          # Variants sit next to the original and follow it
+          for variant in getattr(obj, 'variants', []):
+            variant_target = posixpath.join(
+              posixpath.dirname(target),
+              posixpath.basename(variant['name']),
+            )
+            self._move(variant['name'], variant_target, moved)
+            variant['name'] = variant_target
+
+        if changed and not self.dry_run:
+          fields = [field, 'updated_at']
+          if field == 'image':
+            fields.append('variants')
+          type(batch[0]).objects.bulk_update(changed, fields)
+      except Exception:
+        for target_path, source_path in reversed(moved):
+          os.replace(target_path, source_path)
+        raise
+
+      count += len(changed)
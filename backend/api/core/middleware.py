@@ -0,0 +1,161 @@
+"""
+Middleware choosing the database each request reads from
+"""
+import hashlib
+from itertools import islice
+
+from asgiref.sync import (
+  iscoroutinefunction,
+  markcoroutinefunction,
+  sync_to_async
+)
+from django.conf import settings
+from django.core.cache import caches
+from django.http import StreamingHttpResponse
+
+from core.routers import replica_reads
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_COOKIE = 'replica_pin'
+STREAM_BATCH_SIZE = 64
+
+def _pin_cache_key(request):
+  """
+  Return the cache key pinning the client of request to the primary, or
+  None for anonymous clients
+  """
+  credentials = request.META.get('HTTP_AUTHORIZATION')
+  if not credentials:
+    return None
+
+  digest = hashlib.sha256(credentials.encode()).hexdigest()
+
+  return f'replica-pin:{digest}'
+
+def _succeeded(response):
+  """Return True if the write answered by response went through"""
+  return 200 <= response.status_code < 300
+
+class ReplicaRoutingMiddleware:
+  """
+  Read from a replica for safe requests, except right after a write.
+
+  A client whose write succeeded reads from the primary for the next
+  REPLICA_PIN_SECONDS, so it sees its own changes despite replication
+  lag. The pin is kept in a cookie and, for authenticated clients
+  ignoring cookies, in the cache under their credentials. Anonymous
+  writes are not pinned by address, which many clients may share.
+  """
+
+  sync_capable = True
+  async_capable = True
+
+  def __init__(self, get_response):
+    self.get_response = get_response
+    if iscoroutinefunction(self.get_response):
+      markcoroutinefunction(self)
+
+  def _pin(self, response):
+    """Keep the client on the primary for a while after a write"""
+    response.set_cookie(
+      PIN_COOKIE,
+      '1',
+      max_age = settings.REPLICA_PIN_SECONDS,
+      httponly = True,
+      samesite = 'Lax',
+    )
+
+  def __call__(self, request):
+    if iscoroutinefunction(self):
+      return self.__acall__(request)
+
+    if not settings.REPLICA_DATABASES:
+      return self.get_response(request)
+
+    cache = caches[settings.REPLICA_PIN_CACHE_ALIAS]
+    cache_key = _pin_cache_key(request)
+
+    if request.method not in SAFE_METHODS:
+      response = self.get_response(request)
+      if _succeeded(response):
+        if cache_key:
+          cache.set(cache_key, True, settings.REPLICA_PIN_SECONDS)
+        self._pin(response)
+      return response
+
+    pinned = PIN_COOKIE in request.COOKIES or (
+      cache_key is not None and cache.get(cache_key, False)
+    )
+    with replica_reads(not pinned):
+      return self.get_response(request)
+
+  async def __acall__(self, request):
+    """Async __call__, keeping ASGI requests off the thread pool"""
+    if not settings.REPLICA_DATABASES:
+      return await self.get_response(request)
+
+    cache = caches[settings.REPLICA_PIN_CACHE_ALIAS]
+    cache_key = _pin_cache_key(request)
+
+    if request.method not in SAFE_METHODS:
+      response = await self.get_response(request)
+      if _succeeded(response):
+        if cache_key:
+          await cache.aset(cache_key, True, settings.REPLICA_PIN_SECONDS)
+        self._pin(response)
+      return response
+
+    pinned = PIN_COOKIE in request.COOKIES or (
+      cache_key is not None and await cache.aget(cache_key, False)
+    )
+    with replica_reads(not pinned):
+      return await self.get_response(request)
+
+def _next_batch(iterator):
+  """Return up to STREAM_BATCH_SIZE chunks of iterator"""
+  return list(islice(iterator, STREAM_BATCH_SIZE))
+
+async def _aiter_chunks(iterator):
+  """Yield the chunks of a sync iterator, read in batches off the loop"""
+  try:
+    while batch := await sync_to_async(_next_batch)(iterator):
+      for chunk in batch:
+        yield chunk
+  finally:
+    close = getattr(iterator, 'close', None)
+    if close is not None:
+      await sync_to_async(close)()
+
+class AsyncStreamingMiddleware:
+  """
+  Keep sync streaming responses streaming when served over ASGI.
+
+  Django's ASGI handler reads a sync iterator fully into memory before
+  sending it. Under ASGI the iterator is instead read in small batches
+  in the thread its view ran in, so memory stays flat as under WSGI.
+  """
+
+  sync_capable = True
+  async_capable = True
+
+  def __init__(self, get_response):
+    self.get_response = get_response
+    if iscoroutinefunction(self.get_response):
+      markcoroutinefunction(self)
+
+  def __call__(self, request):
+    if iscoroutinefunction(self):
+      return self.__acall__(request)
+
+    return self.get_response(request)
+
+  async def __acall__(self, request):
+    """Wrap sync streaming content as an async iterator"""
+    response = await self.get_response(request)
+
+    if isinstance(response, StreamingHttpResponse) and not response.is_async:
+      response.streaming_content = _aiter_chunks(
+        iter(response.streaming_content)
+      )
+
+    return response
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:38
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_smartphone_created_at_smartphone_video_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='smartphone',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('name', config='english', weight='A'), '||', django.contrib.postgres.search.SearchVector('description', config='english', weight='B'), django.contrib.postgres.search.SearchConfig('english')), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='smartphone',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='smartphone_search_gin'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:49
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_tags(apps, schema_editor):
+    """Point smartphones at the oldest of each duplicate tag and drop the rest"""
+    Tag = apps.get_model('core', 'Tag')
+    Smartphone = apps.get_model('core', 'Smartphone')
+    SmartphoneTags = Smartphone.tags.through
+
+    duplicates = (
+        Tag.objects.values('user_id', 'name')
+        .annotate(keep_id=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+
+    for duplicate in duplicates:
+        extra = Tag.objects.filter(
+            user_id=duplicate['user_id'],
+            name=duplicate['name'],
+        ).exclude(id=duplicate['keep_id'])
+
+        smartphone_ids = SmartphoneTags.objects.filter(
+            tag__in=extra,
+        ).values_list('smartphone_id', flat=True)
+        SmartphoneTags.objects.bulk_create(
+            [
+                SmartphoneTags(smartphone_id=smartphone_id, tag_id=duplicate['keep_id'])
+                for smartphone_id in set(smartphone_ids)
+            ],
+            ignore_conflicts=True,
+        )
+        extra.delete()
+
+    # Fire the deferred FK checks now so the table can be altered below
+    schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_tags, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='unique_tag_name_per_user'),
+        ),
+    ]
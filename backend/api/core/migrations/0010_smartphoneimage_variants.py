@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_unique_tag_name_per_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='smartphoneimage',
+            name='variants',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_videoupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='smartphoneimage',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:30
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_smartphoneimage_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='smartphone',
+            index=models.Index(condition=models.Q(('video', ''), _negated=True), fields=['video'], name='smartphone_video'),
+        ),
+        migrations.AddIndex(
+            model_name='smartphoneimage',
+            index=models.Index(fields=['image'], name='smartphoneimage_image'),
+        ),
+        migrations.AddIndex(
+            model_name='smartphoneimage',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['variants'], name='smartphoneimage_variants_gin', opclasses=['jsonb_path_ops']),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_apitoken'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='smartphone',
+            index=models.Index(fields=['user', '-id'], name='smartphone_user_id'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['name'], name='tag_name'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['run_after', 'id'], name='task_pending_due'),
+        ),
+        # The M2M table only has (smartphone_id, tag_id) plus one index per
+        # column; tag filters driven from the tag side scan it index-only.
+        # core_smartphone_images gets no reverse index: it is only read
+        # from the smartphone side, and image deletes use its per-column
+        # smartphoneimage_id index.
+        migrations.RunSQL(
+            sql='CREATE INDEX smartphone_tags_tag_smartphone ON core_smartphone_tags (tag_id, smartphone_id);',
+            reverse_sql='DROP INDEX smartphone_tags_tag_smartphone;',
+        ),
+    ]
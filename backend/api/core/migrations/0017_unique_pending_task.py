@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:58
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def drop_duplicate_pending_tasks(apps, schema_editor):
+    """Keep the oldest of each pending task queued more than once"""
+    Task = apps.get_model('core', 'Task')
+
+    duplicates = (
+        Task.objects.filter(status='pending')
+        .values('name', 'payload')
+        .annotate(keep_id=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+
+    for duplicate in duplicates:
+        Task.objects.filter(
+            status='pending',
+            name=duplicate['name'],
+            payload=duplicate['payload'],
+        ).exclude(id=duplicate['keep_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_query_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_pending_tasks, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='task',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'pending')), fields=('name', 'payload'), name='unique_pending_task'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_unique_pending_task'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='smartphone',
+            index=models.Index(fields=['-created_at'], name='smartphone_created_at'),
+        ),
+    ]
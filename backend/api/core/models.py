@@ -3,10 +3,16 @@ Database for models
 """
 import uuid
 import os
+import hashlib
+import secrets
 from django.db.models.functions import Now
 
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
+from django.db.models.functions import Upper
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.contrib.auth.models import (
   AbstractBaseUser,
   BaseUserManager,
@@ -14,9 +20,9 @@ from django.contrib.auth.models import (
 )
 
 def smartphone_image_file_path(instance, filename):
-  """Generate file path for new smartphone image."""
+  """Generate file path for new smartphone image, named by content if hashed."""
   ext = os.path.splitext(filename)[1]
-  filename = f'{uuid.uuid4()}{ext}'
+  filename = f'{getattr(instance, "content_hash", "") or uuid.uuid4()}{ext}'
 
   return os.path.join('uploads', 'smartphone', 'image', filename)
 
@@ -27,6 +33,13 @@ def smartphone_video_file_path(instance, filename):
 
   return os.path.join('uploads', 'smartphone', 'video', filename)
 
+class ProcessingStatus(models.TextChoices):
+  """Progress of the background processing of an uploaded file."""
+  PENDING = 'pending'
+  PROCESSING = 'processing'
+  READY = 'ready'
+  FAILED = 'failed'
+
 class UserManager(BaseUserManager):
   """Manager for user in the system"""
 
@@ -67,6 +80,59 @@ class User(AbstractBaseUser, PermissionsMixin):
 
   USERNAME_FIELD = 'email' # Default username field for authentication
 
+class ApiTokenManager(models.Manager):
+  """Manager for API tokens"""
+
+  def create_token(self, user, name='', lifetime=None):
+    """Create a token for user and return it with its secret key"""
+    prefix = secrets.token_hex(6)
+    key = f'{prefix}.{secrets.token_urlsafe(32)}'
+    expires_at = timezone.now() + lifetime if lifetime else None
+
+    token = self.create(
+      user = user,
+      name = name,
+      prefix = prefix,
+      key_hash = ApiToken.hash_key(key),
+      expires_at = expires_at,
+    )
+
+    return token, key
+
+  def purge_expired(self):
+    """Delete the expired tokens and return how many were deleted"""
+    deleted, _ = self.filter(expires_at__lte = timezone.now()).delete()
+
+    return deleted
+
+class ApiToken(models.Model):
+  """API token of a user, stored hashed."""
+  user = models.ForeignKey(
+    settings.AUTH_USER_MODEL,
+    on_delete = models.CASCADE,
+    related_name = 'api_tokens',
+  )
+  name = models.CharField(max_length=255, blank=True)
+  prefix = models.CharField(max_length=12, unique=True)
+  key_hash = models.CharField(max_length=64)
+  expires_at = models.DateTimeField(null=True, blank=True)
+  last_used_at = models.DateTimeField(null=True, blank=True)
+  created_at = models.DateTimeField(db_default=Now())
+
+  objects = ApiTokenManager()
+
+  @staticmethod
+  def hash_key(key):
+    """Return the stored hash of a token key"""
+    return hashlib.sha256(key.encode()).hexdigest()
+
+  def is_expired(self):
+    """Return True if the token can no longer be used"""
+    return self.expires_at is not None and self.expires_at <= timezone.now()
+
+  def __str__(self):
+    return self.prefix
+
 class Smartphone(models.Model):
   """Smartphone object."""
 
@@ -82,7 +148,43 @@ class Smartphone(models.Model):
 
   images = models.ManyToManyField('SmartphoneImage', blank=True)
   video  = models.FileField(upload_to = smartphone_video_file_path, blank=True)
+  video_status = models.CharField(
+    max_length=16,
+    choices=ProcessingStatus.choices,
+    blank=True,
+    default='',
+  )
   created_at = models.DateTimeField(db_default=Now())
+  updated_at = models.DateTimeField(auto_now=True, db_default=Now())
+
+  # Maintained by Postgres, name weighted above description
+  search_vector = models.GeneratedField(
+    expression = (
+      SearchVector('name', weight='A', config='english') +
+      SearchVector('description', weight='B', config='english')
+    ),
+    output_field = SearchVectorField(),
+    db_persist = True,
+  )
+
+  class Meta:
+    indexes = [
+      GinIndex(fields=['search_vector'], name='smartphone_search_gin'),
+      models.Index(
+        fields=['video'],
+        name='smartphone_video',
+        condition=~models.Q(video=''),
+      ),
+      GinIndex(
+        OpClass(Upper('name'), name='gin_trgm_ops'),
+        name='smartphone_name_trgm',
+      ),
+      # Owner-filtered lists, bulk updates and deletes in id order
+      models.Index(fields=['user', '-id'], name='smartphone_user_id'),
+      # Newest-first reads by creation date; created_at is the start of
+      # the inserting transaction, so id order only approximates it
+      models.Index(fields=['-created_at'], name='smartphone_created_at'),
+    ]
 
   def __str__(self):
     return self.name
@@ -95,6 +197,23 @@ class Tag(models.Model):
     on_delete = models.CASCADE,
   )
   created_at = models.DateTimeField(db_default=Now())
+  updated_at = models.DateTimeField(auto_now=True, db_default=Now())
+
+  class Meta:
+    constraints = [
+      models.UniqueConstraint(
+        fields=['user', 'name'],
+        name='unique_tag_name_per_user',
+      ),
+    ]
+    indexes = [
+      GinIndex(
+        OpClass(Upper('name'), name='gin_trgm_ops'),
+        name='tag_name_trgm',
+      ),
+      # Tag listing ordered by name
+      models.Index(fields=['name'], name='tag_name'),
+    ]
 
   def __str__(self):
     return self.name
@@ -107,7 +226,93 @@ class SmartphoneImage(models.Model):
   )
 
   image = models.ImageField(upload_to = smartphone_image_file_path)
+  content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+  variants = models.JSONField(default=list, blank=True)
+  processing_status = models.CharField(
+    max_length=16,
+    choices=ProcessingStatus.choices,
+    default=ProcessingStatus.PENDING,
+  )
   created_at = models.DateTimeField(db_default=Now())
+  updated_at = models.DateTimeField(auto_now=True, db_default=Now())
+
+  class Meta:
+    indexes = [
+      models.Index(fields=['image'], name='smartphoneimage_image'),
+      GinIndex(
+        fields=['variants'],
+        opclasses=['jsonb_path_ops'],
+        name='smartphoneimage_variants_gin',
+      ),
+    ]
+
+  def __str__(self):
+    return str(self.id)
+
+class VideoUpload(models.Model):
+  """Resumable upload of a smartphone video."""
+  id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+  user = models.ForeignKey(
+    settings.AUTH_USER_MODEL,
+    on_delete = models.CASCADE,
+  )
+  smartphone = models.ForeignKey(
+    Smartphone,
+    on_delete = models.CASCADE,
+  )
+
+  filename = models.CharField(max_length=255)
+  size = models.PositiveBigIntegerField()
+  offset = models.PositiveBigIntegerField(default=0)
+  created_at = models.DateTimeField(db_default=Now())
+  updated_at = models.DateTimeField(auto_now=True, db_default=Now())
+
+  def __str__(self):
+    return str(self.id)
+
+class Task(models.Model):
+  """Job run outside the request by the process_tasks worker."""
+
+  class Status(models.TextChoices):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+  name = models.CharField(max_length=255)
+  payload = models.JSONField(default=dict, blank=True)
+  status = models.CharField(
+    max_length=16,
+    choices=Status.choices,
+    default=Status.PENDING,
+  )
+  attempts = models.PositiveIntegerField(default=0)
+  max_attempts = models.PositiveIntegerField(default=1)
+  run_after = models.DateTimeField(default=timezone.now)
+  started_at = models.DateTimeField(null=True, blank=True)
+  worker = models.CharField(max_length=255, blank=True)
+  last_error = models.TextField(blank=True)
+  created_at = models.DateTimeField(db_default=Now())
+  updated_at = models.DateTimeField(auto_now=True, db_default=Now())
+
+  class Meta:
+    indexes = [
+      models.Index(fields=['status', 'run_after'], name='task_status_run_after'),
+      # Workers claim due tasks without walking finished ones
+      models.Index(
+        fields=['run_after', 'id'],
+        name='task_pending_due',
+        condition=models.Q(status='pending'),
+      ),
+    ]
+    constraints = [
+      # enqueue relies on it to queue a task only once while it waits
+      models.UniqueConstraint(
+        fields=['name', 'payload'],
+        name='unique_pending_task',
+        condition=models.Q(status='pending'),
+      ),
+    ]
 
   def __str__(self):
-    return str(self.id)
\ No newline at end of file
+    return f'{self.name} ({self.status})'
@@ -0,0 +1,43 @@
+"""
+Database router sending safe reads to the read replicas
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+_read_from_replica = ContextVar('read_from_replica', default=False)
+
+@contextmanager
+def replica_reads(enabled=True):
+  """Route reads made inside the block to a replica when enabled"""
+  token = _read_from_replica.set(enabled)
+  try:
+    yield
+  finally:
+    _read_from_replica.reset(token)
+
+class ReplicaRouter:
+  """
+  Route reads to a random replica while replica_reads() is active.
+
+  Everything else, including reads issued for a write such as
+  select_for_update(), goes to the primary. Replicas are filled by
+  Postgres replication, so migrations only run on the primary.
+  """
+
+  def db_for_read(self, model, **hints):
+    if _read_from_replica.get() and settings.REPLICA_DATABASES:
+      return random.choice(settings.REPLICA_DATABASES)
+
+    return None
+
+  def db_for_write(self, model, **hints):
+    return 'default'
+
+  def allow_relation(self, obj1, obj2, **hints):
+    return True
+
+  def allow_migrate(self, db, app_label, model_name=None, **hints):
+    return db not in settings.REPLICA_DATABASES
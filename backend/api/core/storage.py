@@ -0,0 +1,88 @@
+"""
+Local media storage sharded into hashed subdirectories
+"""
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+
+class ShardedFileSystemStorage(FileSystemStorage):
+  """
+  File system storage spreading new files over hashed subdirectories.
+
+  uploads/smartphone/image/<file> is stored as
+  uploads/smartphone/image/ab/cd/<file>, where ab and cd come from a hash
+  of the file name, so no directory grows past a few thousand entries.
+  Files are written to a temporary file and moved into place with
+  os.replace, so readers never see a partial file.
+  """
+
+  def __init__(self, shard_depth=2, shard_width=2, **kwargs):
+    super().__init__(**kwargs)
+    self.shard_depth = shard_depth
+    self.shard_width = shard_width
+
+  def _shards(self, filename):
+    """Return the subdirectories a file name is sharded into"""
+    digest = hashlib.md5(filename.encode(), usedforsecurity=False).hexdigest()
+    width = self.shard_width
+
+    return [
+      digest[index * width:(index + 1) * width]
+      for index in range(self.shard_depth)
+    ]
+
+  def shard(self, name):
+    """Return the sharded storage name for an unsharded name"""
+    directory, filename = posixpath.split(name)
+
+    return posixpath.join(directory, *self._shards(filename), filename)
+
+  def is_sharded(self, name):
+    """Return True if name already sits in its shard directories"""
+    parts = name.split('/')
+    depth = self.shard_depth
+
+    return (
+      len(parts) > depth
+      and parts[-depth - 1:-1] == self._shards(parts[-1])
+    )
+
+  def generate_filename(self, filename):
+    """Place the name produced by upload_to in its shard directories"""
+    return self.shard(super().generate_filename(filename))
+
+  def _save(self, name, content):
+    """Write content to a temporary file and atomically move it into place"""
+    full_path = self.path(name)
+    directory = os.path.dirname(full_path)
+
+    if self.directory_permissions_mode is not None:
+      old_umask = os.umask(0o777 & ~self.directory_permissions_mode)
+      try:
+        os.makedirs(directory, self.directory_permissions_mode, exist_ok=True)
+      finally:
+        os.umask(old_umask)
+    else:
+      os.makedirs(directory, exist_ok=True)
+
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+    try:
+      with os.fdopen(fd, 'wb') as temp:
+        for chunk in content.chunks():
+          temp.write(chunk)
+        temp.flush()
+        os.fsync(temp.fileno())
+
+      os.chmod(temp_path, self.file_permissions_mode or 0o644)
+      os.replace(temp_path, full_path)
+    except BaseException:
+      try:
+        os.remove(temp_path)
+      except FileNotFoundError:
+        pass
+      raise
+
+    return str(name).replace('\\', '/')
@@ -0,0 +1,157 @@
+"""
+Database backed queue for work that runs outside the request
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from core.models import Task
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+def task(name, on_failure=None):
+  """
+  Register the decorated function as a background task called name.
+
+  on_failure is called with the task payload once every attempt failed.
+  The decorated function gains an enqueue(**payload) shortcut.
+  """
+  def decorator(func):
+    registry[name] = (func, on_failure)
+    func.enqueue = lambda **payload: enqueue(name, **payload)
+    return func
+
+  return decorator
+
+def enqueue(name, **payload):
+  """
+  Queue a task unless the same one is already waiting to run.
+
+  The unique_pending_task constraint settles concurrent calls.
+  """
+  Task.objects.get_or_create(
+    name = name,
+    payload = payload,
+    status = Task.Status.PENDING,
+    defaults = {'max_attempts': settings.TASK_MAX_ATTEMPTS},
+  )
+
+def claim(worker):
+  """Lock and return the next due task, or None when the queue is idle"""
+  with transaction.atomic():
+    task = (
+      Task.objects
+      .select_for_update(skip_locked=True)
+      .filter(status = Task.Status.PENDING, run_after__lte = timezone.now())
+      .order_by('run_after', 'id')
+      .first()
+    )
+    if task is None:
+      return None
+
+    task.status = Task.Status.RUNNING
+    task.attempts += 1
+    task.started_at = timezone.now()
+    task.worker = worker
+    task.save(update_fields=[
+      'status', 'attempts', 'started_at', 'worker', 'updated_at',
+    ])
+
+  return task
+
+def _requeue(task):
+  """
+  Save task as pending again and return True.
+
+  Returns False when the same task was queued again meanwhile; that one
+  runs in its place.
+  """
+  task.status = Task.Status.PENDING
+  try:
+    with transaction.atomic():
+      task.save(update_fields=[
+        'status', 'run_after', 'last_error', 'updated_at',
+      ])
+  except IntegrityError:
+    return False
+
+  return True
+
+def _fail(task, on_failure):
+  """Save task as failed, calling on_failure with its payload"""
+  task.status = Task.Status.FAILED
+  task.save(update_fields=['status', 'last_error', 'updated_at'])
+  if on_failure is not None:
+    on_failure(**task.payload)
+
+def run(task):
+  """Run a claimed task, scheduling a retry with backoff when it fails"""
+  func, on_failure = registry.get(task.name, (None, None))
+
+  try:
+    if func is None:
+      raise LookupError(f'Unknown task {task.name!r}')
+    func(**task.payload)
+  except Exception:
+    logger.warning('Task %s %s failed', task.pk, task.name, exc_info=True)
+    task.last_error = traceback.format_exc()
+
+    if func is not None and task.attempts < task.max_attempts:
+      delay = settings.TASK_RETRY_DELAY * 2 ** (task.attempts - 1)
+      task.run_after = timezone.now() + timedelta(seconds=delay)
+      if _requeue(task):
+        return
+      # The same task is pending again and retries in place of this one
+      on_failure = None
+    _fail(task, on_failure)
+  else:
+    task.status = Task.Status.DONE
+    task.save(update_fields=['status', 'updated_at'])
+
+def run_pending(worker='inline'):
+  """Run due tasks until the queue is idle and return how many ran"""
+  count = 0
+  while (task := claim(worker)) is not None:
+    run(task)
+    count += 1
+
+  return count
+
+def cleanup():
+  """
+  Requeue tasks of crashed workers and drop old finished tasks.
+
+  A task that timed out on its last attempt is failed instead, so a task
+  that crashes its worker is not run forever.
+  """
+  now = timezone.now()
+
+  lost = Task.objects.filter(
+    status = Task.Status.RUNNING,
+    started_at__lt = now - timedelta(seconds=settings.TASK_TIMEOUT),
+  )
+  for task in lost:
+    task.last_error = (
+      f'Timed out after {settings.TASK_TIMEOUT} seconds '
+      f'on worker {task.worker!r}'
+    )
+    if task.attempts < task.max_attempts:
+      task.run_after = now
+      if _requeue(task):
+        continue
+      # The same task is pending again and retries in place of this one
+      on_failure = None
+    else:
+      _, on_failure = registry.get(task.name, (None, None))
+    _fail(task, on_failure)
+
+  Task.objects.filter(
+    status = Task.Status.DONE,
+    updated_at__lt = now - timedelta(seconds=settings.TASK_RETENTION),
+  ).delete()
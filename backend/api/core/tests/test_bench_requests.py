@@ -0,0 +1,49 @@
+"""
+Tests for the bench_requests management command
+"""
+import re
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TransactionTestCase
+
+from core.models import ApiToken, Smartphone
+
+class BenchRequestsCommandTests(TransactionTestCase):
+  """Test benchmarking requests through the handler."""
+
+  def test_reports_throughput(self):
+    """Test every request is sent, queries the database and is summarised"""
+    user = get_user_model().objects.create_user(
+      email = 'bench@example.com',
+      password = 'test123456',
+    )
+    Smartphone.objects.create(
+      user = user,
+      name = 'Bench phone',
+      price = Decimal('100.00'),
+    )
+    out = StringIO()
+
+    call_command(
+      'bench_requests',
+      requests = 4,
+      concurrency = 2,
+      stdout = out,
+    )
+
+    output = out.getvalue()
+    self.assertIn('200=4', output)
+    self.assertIn('Connections opened:', output)
+    self.assertIn('requests/s', output)
+    queries = int(re.search(r'Queries run: (\d+)', output).group(1))
+    self.assertGreaterEqual(queries, 4)
+    self.assertFalse(ApiToken.objects.exists())
+
+  def test_requires_a_smartphone(self):
+    """Test benchmarking without data fails"""
+    with self.assertRaisesMessage(CommandError, 'seed_data'):
+      call_command('bench_requests', stdout = StringIO())
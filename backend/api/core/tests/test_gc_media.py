@@ -0,0 +1,109 @@
+"""
+Tests for the gc_media management command
+"""
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core.models import (
+  Smartphone,
+  SmartphoneImage
+)
+
+class GcMediaTests(TestCase):
+  """Test removing orphaned media."""
+
+  def setUp(self):
+    self.media_root = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+    media = override_settings(MEDIA_ROOT = self.media_root)
+    media.enable()
+    self.addCleanup(media.disable)
+
+    self.user = get_user_model().objects.create_user(
+      email = 'gc@example.com',
+      password = 'test123456',
+    )
+    self.image = SmartphoneImage.objects.create(
+      user = self.user,
+      image = ContentFile(b'image', name = 'image.jpg'),
+    )
+    SmartphoneImage.objects.filter(pk = self.image.pk).update(
+      variants = [{'name': 'uploads/smartphone/image/kept_w320.jpg'}],
+    )
+    self.variant = self.write_file('uploads/smartphone/image/kept_w320.jpg')
+
+    smartphone = Smartphone.objects.create(
+      user = self.user,
+      name = 'Phone',
+      price = Decimal('100.00'),
+    )
+    smartphone.video.save('video.mp4', ContentFile(b'video'))
+    self.video = smartphone.video.path
+
+    self.orphans = [
+      self.write_file('uploads/smartphone/image/orphan.jpg'),
+      self.write_file('uploads/smartphone/video/orphan.mp4'),
+    ]
+
+  def write_file(self, name, content = b'content'):
+    """Write a file under the media root and return its path"""
+    path = os.path.join(self.media_root, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as media:
+      media.write(content)
+
+    return path
+
+  def _gc(self, *args):
+    """Run gc_media ignoring file age and return its output"""
+    out = StringIO()
+    call_command('gc_media', '--min-age', '-60', *args, stdout = out)
+
+    return out.getvalue()
+
+  def test_removes_orphans_only(self):
+    """Test unreferenced files are deleted and referenced ones kept"""
+    output = self._gc('--batch-size', '2')
+
+    for path in self.orphans:
+      self.assertFalse(os.path.exists(path))
+    self.assertTrue(os.path.exists(self.image.image.path))
+    self.assertTrue(os.path.exists(self.variant))
+    self.assertTrue(os.path.exists(self.video))
+    self.assertIn('Removed 2 orphaned files out of 5 checked.', output)
+
+  def test_dry_run_keeps_files(self):
+    """Test a dry run only reports orphans"""
+    output = self._gc('--dry-run')
+
+    for path in self.orphans:
+      self.assertTrue(os.path.exists(path))
+    self.assertIn('uploads/smartphone/image/orphan.jpg', output)
+
+  def test_quarantine_moves_orphans(self):
+    """Test orphans are moved aside when a quarantine is given"""
+    quarantine = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, quarantine, ignore_errors=True)
+
+    self._gc('--quarantine', quarantine)
+
+    self.assertFalse(os.path.exists(self.orphans[0]))
+    self.assertTrue(os.path.exists(
+      os.path.join(quarantine, 'uploads/smartphone/image/orphan.jpg')
+    ))
+
+  def test_recent_files_are_kept(self):
+    """Test files newer than the minimum age are left alone"""
+    out = StringIO()
+    call_command('gc_media', stdout = out)
+
+    for path in self.orphans:
+      self.assertTrue(os.path.exists(path))
@@ -0,0 +1,54 @@
+"""
+Tests for the configurable password hasher
+"""
+from io import StringIO
+
+from django.contrib.auth import authenticate, get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+class PasswordHasherTests(TestCase):
+  """Test hashing passwords at the configured cost."""
+
+  @override_settings(PASSWORD_HASH_ITERATIONS = 1000)
+  def test_configured_iterations_used(self):
+    """Test new hashes use PASSWORD_HASH_ITERATIONS"""
+    user = get_user_model().objects.create_user(
+      email = 'hash@example.com',
+      password = 'testpass123',
+    )
+
+    self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+
+  def test_rehashed_when_cost_changes(self):
+    """Test a login upgrades hashes made at a different cost"""
+    with override_settings(PASSWORD_HASH_ITERATIONS = 1000):
+      user = get_user_model().objects.create_user(
+        email = 'rehash@example.com',
+        password = 'testpass123',
+      )
+
+    with override_settings(PASSWORD_HASH_ITERATIONS = 2000):
+      self.assertIsNotNone(
+        authenticate(username = user.email, password = 'testpass123')
+      )
+
+    user.refresh_from_db()
+    self.assertTrue(user.password.startswith('pbkdf2_sha256$2000$'))
+
+  def test_bench_login_command(self):
+    """Test the login benchmark reports its results"""
+    out = StringIO()
+
+    call_command(
+      'bench_login',
+      requests = 3,
+      concurrency = 1,
+      iterations = 1000,
+      stdout = out,
+    )
+
+    self.assertIn('200=3', out.getvalue())
+    self.assertFalse(
+      get_user_model().objects.filter(email__startswith = 'bench-').exists()
+    )
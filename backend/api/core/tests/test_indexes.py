@@ -0,0 +1,133 @@
+"""
+Tests keeping the hot queries on their indexes
+"""
+import re
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import (
+  Smartphone,
+  Tag,
+  Task
+)
+from smartphone.filters import filter_by_tags
+
+class QueryPlanTests(TestCase):
+  """
+  Test hot queries are planned on the indexes added for them.
+
+  Rows are spread over many users, tags and task states and the tables
+  analyzed, and sequential scans are disabled for the test transaction,
+  so the planner weighs each index against the older ones. The tests fail
+  if the expected index is dropped or stops being the best fit.
+  """
+
+  @classmethod
+  def setUpTestData(cls):
+    user_model = get_user_model()
+    users = user_model.objects.bulk_create([
+      user_model(
+        email = f'plan{number}@example.com',
+        user_name = f'plan{number}',
+      )
+      for number in range(100)
+    ])
+    cls.user = users[0]
+    tags = Tag.objects.bulk_create([
+      Tag(user = user, name = f'tag{number}')
+      for user in users[:10]
+      for number in range(20)
+    ])
+    cls.tag = tags[0]
+    # The tested user owns 20 of the 1000 smartphones, the others share
+    # the rest, so an owner filter is selective as it is in production
+    smartphones = Smartphone.objects.bulk_create([
+      Smartphone(
+        user = users[0] if number % 50 == 0 else users[1 + number % 99],
+        name = f'Phone {number}',
+        price = Decimal('1.00'),
+        created_at = timezone.now() - timedelta(minutes = number),
+      )
+      for number in range(1000)
+    ])
+    SmartphoneTags = Smartphone.tags.through
+    SmartphoneTags.objects.bulk_create([
+      SmartphoneTags(
+        smartphone_id = smartphone.id,
+        tag_id = tags[1 + number % (len(tags) - 1)].id,
+      )
+      for number, smartphone in enumerate(smartphones)
+    ] + [
+      SmartphoneTags(smartphone_id = smartphone.id, tag_id = cls.tag.id)
+      for smartphone in smartphones[:5]
+    ])
+    Task.objects.bulk_create([
+      Task(
+        name = 'plan',
+        payload = {'number': number},
+        status = (
+          Task.Status.PENDING if number % 50 == 0 else Task.Status.DONE
+        ),
+        run_after = timezone.now() - timedelta(minutes = number),
+      )
+      for number in range(1000)
+    ])
+
+  def setUp(self):
+    with connection.cursor() as cursor:
+      cursor.execute(
+        'ANALYZE core_smartphone, core_tag, core_smartphone_tags, core_task'
+      )
+      cursor.execute('SET LOCAL enable_seqscan = off')
+
+  def assertUsesIndex(self, queryset, index):
+    """Assert the plan of queryset reads through index"""
+    plan = queryset.explain()
+    self.assertRegex(plan, rf'\b{re.escape(index)}\b')
+
+  def test_owner_smartphones(self):
+    """Test owner-filtered smartphones in id order"""
+    self.assertUsesIndex(
+      Smartphone.objects.filter(user = self.user).order_by('-id')[:20],
+      'smartphone_user_id',
+    )
+
+  def test_smartphones_newest_first(self):
+    """Test smartphones ordered by creation date"""
+    self.assertUsesIndex(
+      Smartphone.objects.order_by('-created_at')[:20],
+      'smartphone_created_at',
+    )
+
+  def test_tags_by_name(self):
+    """Test resolving a user's tags by name"""
+    self.assertUsesIndex(
+      Tag.objects.filter(user = self.user, name__in = ['tag1', 'tag2']),
+      'unique_tag_name_per_user',
+    )
+
+  def test_tags_ordered_by_name(self):
+    """Test the tag listing ordered by name"""
+    self.assertUsesIndex(Tag.objects.order_by('-name')[:20], 'tag_name')
+
+  def test_smartphones_by_tag(self):
+    """Test filtering smartphones by a rarely used tag"""
+    self.assertUsesIndex(
+      filter_by_tags(Smartphone.objects.all(), [self.tag.id]).order_by('-id')[:20],
+      'smartphone_tags_tag_smartphone',
+    )
+
+  def test_claim_due_task(self):
+    """Test a worker claiming the next due task"""
+    self.assertUsesIndex(
+      Task.objects.filter(
+        status = Task.Status.PENDING,
+        run_after__lte = timezone.now(),
+      ).order_by('run_after', 'id')[:1],
+      'task_pending_due',
+    )
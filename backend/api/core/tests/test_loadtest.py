@@ -0,0 +1,226 @@
+"""
+Tests for the seed_data and loadtest management commands
+"""
+import json
+import os
+import shutil
+import tempfile
+from collections import Counter
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import (
+  LiveServerTestCase,
+  SimpleTestCase,
+  TestCase,
+  override_settings
+)
+
+from core.loadtest import regressions, summarize
+from core.models import (
+  ApiToken,
+  Smartphone,
+  SmartphoneImage,
+  Tag
+)
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+def seed(**options):
+  """Seed a small data set"""
+  options = {
+    'users': 2,
+    'smartphones': 6,
+    'tags': 3,
+    'images': 2,
+    **options,
+  }
+  call_command('seed_data', stdout = StringIO(), **options)
+
+class SummaryTests(SimpleTestCase):
+  """Test the load test figures."""
+
+  def test_summarize(self):
+    """Test percentiles, throughput and errors are reported"""
+    latencies = [index / 1000 for index in range(1, 101)]
+    statuses = Counter({200: 99, 500: 1})
+
+    result = summarize(latencies, statuses, elapsed = 2)
+
+    self.assertEqual(result['requests'], 100)
+    self.assertEqual(result['errors'], 1)
+    self.assertEqual(result['rps'], 50)
+    self.assertEqual(result['p50_ms'], 51)
+    self.assertEqual(result['p95_ms'], 96)
+    self.assertEqual(result['p99_ms'], 100)
+    self.assertEqual(result['statuses'], {'200': 99, '500': 1})
+
+  def test_regressions(self):
+    """Test scenarios slower than the baseline beyond tolerance are found"""
+    baseline = {
+      'retrieve': {'p95_ms': 10, 'rps': 100, 'requests': 100, 'errors': 0},
+      'login': {'p95_ms': 10, 'rps': 100, 'requests': 100, 'errors': 0},
+    }
+    results = {
+      'retrieve': {'p95_ms': 11.5, 'rps': 85, 'requests': 100, 'errors': 0},
+      'login': {'p95_ms': 13, 'rps': 70, 'requests': 100, 'errors': 0},
+    }
+
+    found = regressions(results, baseline, tolerance = 0.2)
+
+    self.assertEqual(len(found), 2)
+    self.assertTrue(all(line.startswith('login:') for line in found))
+
+  def test_more_errors_are_regressions(self):
+    """Test failing faster than the baseline is not a pass"""
+    baseline = {
+      'create': {'p95_ms': 10, 'rps': 100, 'requests': 100, 'errors': 1},
+    }
+    results = {
+      'create': {
+        'p95_ms': 1,
+        'rps': 1000,
+        'requests': 100,
+        'errors': 40,
+        'statuses': {'201': 60, '429': 40},
+      },
+    }
+
+    found = regressions(results, baseline, tolerance = 0.2)
+
+    self.assertEqual(len(found), 1)
+    self.assertIn('40.0% errors', found[0])
+
+  def test_missing_scenario_reported(self):
+    """Test a scenario absent from the baseline is reported"""
+    results = {
+      'upload_image': {'p95_ms': 1, 'rps': 1, 'requests': 1, 'errors': 0},
+    }
+
+    found = regressions(results, {}, tolerance = 0.2)
+
+    self.assertEqual(found, ['upload_image: not in the baseline, save a new one'])
+
+@override_settings(MEDIA_ROOT = MEDIA_ROOT)
+class SeedDataTests(TestCase):
+  """Test seeding benchmark data."""
+
+  @classmethod
+  def tearDownClass(cls):
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+    super().tearDownClass()
+
+  def test_seed_data(self):
+    """Test users, tags, smartphones and images are created"""
+    seed()
+
+    users = get_user_model().objects.filter(email__startswith = 'seed-')
+    self.assertEqual(users.count(), 2)
+    self.assertEqual(Tag.objects.count(), 6)
+    self.assertEqual(Smartphone.objects.count(), 6)
+    for smartphone in Smartphone.objects.all():
+      self.assertEqual(smartphone.images.count(), 2)
+      self.assertFalse(
+        smartphone.tags.exclude(user = smartphone.user).exists()
+      )
+    self.assertTrue(users.first().check_password('seed-password-123'))
+
+  def test_seed_data_clear(self):
+    """Test seeding again with clear replaces the data"""
+    seed()
+    seed(clear = True)
+
+    self.assertEqual(
+      get_user_model().objects.filter(email__startswith = 'seed-').count(),
+      2,
+    )
+    self.assertEqual(Smartphone.objects.count(), 6)
+
+  def test_seed_data_images_share_files(self):
+    """Test image rows reuse a few stored files"""
+    seed(smartphones = 20)
+
+    files = set(SmartphoneImage.objects.values_list('image', flat=True))
+    self.assertEqual(SmartphoneImage.objects.count(), 16 + 20 * 2)
+    self.assertLess(len(files), SmartphoneImage.objects.count())
+    self.assertLessEqual(len(files), 16)
+
+@override_settings(
+  MEDIA_ROOT = MEDIA_ROOT,
+  LOGIN_RATE_LIMIT_IP = None,
+  LOGIN_RATE_LIMIT_EMAIL = None,
+)
+class LoadTestCommandTests(LiveServerTestCase):
+  """Test load testing a running server."""
+
+  @classmethod
+  def tearDownClass(cls):
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+    super().tearDownClass()
+
+  def test_loadtest(self):
+    """Test scenarios are run, saved as baseline and compared"""
+    seed(images = 1)
+    baseline = os.path.join(MEDIA_ROOT, 'benchmarks', 'baseline.json')
+    options = {
+      'base_url': self.live_server_url,
+      'scenario': [
+        'retrieve',
+        'list_by_tag',
+        'create',
+        'upload_image',
+        'login',
+      ],
+      'requests': 6,
+      'concurrency': 2,
+      'baseline': baseline,
+    }
+
+    out = StringIO()
+    call_command('loadtest', save_baseline = True, stdout = out, **options)
+
+    with open(baseline) as baseline_file:
+      results = json.load(baseline_file)
+    self.assertEqual(set(results), set(options['scenario']))
+    for name, result in results.items():
+      self.assertEqual(result['requests'], 6, name)
+      self.assertEqual(result['errors'], 0, (name, result['statuses']))
+    self.assertEqual(results['create']['statuses'], {'201': 6})
+    self.assertEqual(results['upload_image']['statuses'], {'200': 6})
+    self.assertFalse(ApiToken.objects.filter(name = 'loadtest').exists())
+
+    with open(baseline, 'w') as baseline_file:
+      json.dump({
+        name: {**result, 'p95_ms': 0.0001, 'rps': 10 ** 9}
+        for name, result in results.items()
+      }, baseline_file)
+    with self.assertRaisesMessage(CommandError, 'retrieve'):
+      call_command('loadtest', stdout = StringIO(), **options)
+
+  def test_missing_baseline_skipped(self):
+    """Test a run without a baseline reports and passes"""
+    seed(images = 1)
+    out = StringIO()
+
+    call_command(
+      'loadtest',
+      base_url = self.live_server_url,
+      scenario = ['retrieve'],
+      requests = 2,
+      concurrency = 1,
+      baseline = os.path.join(MEDIA_ROOT, 'missing', 'baseline.json'),
+      stdout = out,
+    )
+
+    self.assertIn('No baseline at', out.getvalue())
+
+  def test_requires_seeded_data(self):
+    """Test running without seeded data fails"""
+    with self.assertRaisesMessage(CommandError, 'seed_data'):
+      call_command(
+        'loadtest',
+        base_url = self.live_server_url,
+        stdout = StringIO(),
+      )
@@ -0,0 +1,62 @@
+"""
+Tests for streaming responses over ASGI
+"""
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from core.middleware import AsyncStreamingMiddleware, STREAM_BATCH_SIZE
+
+class AsyncStreamingMiddlewareTests(SimpleTestCase):
+  """Test sync streaming content is served lazily to ASGI."""
+
+  def setUp(self):
+    self.factory = RequestFactory()
+    self.produced = 0
+
+  def lines(self, count):
+    """Yield count lines, counting those produced"""
+    for number in range(count):
+      self.produced += 1
+      yield f'{number}\n'.encode()
+
+  async def test_streaming_content_read_in_batches(self):
+    """Test the iterator is read as the response is sent, not up front"""
+    count = STREAM_BATCH_SIZE * 3
+
+    async def get_response(request):
+      return StreamingHttpResponse(self.lines(count))
+
+    middleware = AsyncStreamingMiddleware(get_response)
+    response = await middleware(self.factory.get('/'))
+
+    self.assertTrue(response.is_async)
+    self.assertEqual(self.produced, 0)
+
+    chunks = []
+    async for chunk in response.streaming_content:
+      chunks.append(chunk)
+      if len(chunks) == 1:
+        self.assertEqual(self.produced, STREAM_BATCH_SIZE)
+
+    self.assertEqual(len(chunks), count)
+    self.assertEqual(chunks[-1], f'{count - 1}\n'.encode())
+
+  async def test_other_responses_untouched(self):
+    """Test regular responses pass through"""
+    async def get_response(request):
+      return HttpResponse(b'body')
+
+    middleware = AsyncStreamingMiddleware(get_response)
+    response = await middleware(self.factory.get('/'))
+
+    self.assertEqual(response.content, b'body')
+
+  def test_sync_passes_through(self):
+    """Test streaming content is left sync under WSGI"""
+    middleware = AsyncStreamingMiddleware(
+      lambda request: StreamingHttpResponse(self.lines(2)),
+    )
+    response = middleware(self.factory.get('/'))
+
+    self.assertFalse(response.is_async)
+    self.assertEqual(b''.join(response.streaming_content), b'0\n1\n')
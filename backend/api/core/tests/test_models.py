@@ -116,4 +116,14 @@ class ModelTests(TestCase):
     file_path = models.smartphone_image_file_path(None, 'example.jpg')
 
     exp_path = f'uploads/smartphone/image/{uuid}.jpg'
-    self.assertEqual(file_path, exp_path)
\ No newline at end of file
+    self.assertEqual(file_path, exp_path)
+
+  def test_smartphone_file_name_content_hash(self):
+    """Test hashed images are named by their content."""
+    smartphone_image = models.SmartphoneImage(content_hash = 'abc123')
+    file_path = models.smartphone_image_file_path(
+      smartphone_image,
+      'example.jpg',
+    )
+
+    self.assertEqual(file_path, 'uploads/smartphone/image/abc123.jpg')
@@ -0,0 +1,99 @@
+"""
+Tests for routing reads to the read replicas
+"""
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.middleware import PIN_COOKIE, ReplicaRoutingMiddleware
+from core.models import Smartphone
+from core.routers import ReplicaRouter, replica_reads
+
+@override_settings(REPLICA_DATABASES = ['replica_1'])
+class ReplicaRouterTests(SimpleTestCase):
+  """Test choosing databases for reads and writes."""
+
+  def setUp(self):
+    self.router = ReplicaRouter()
+
+  def test_reads_use_replica_when_enabled(self):
+    """Test reads only go to a replica inside replica_reads()"""
+    self.assertIsNone(self.router.db_for_read(Smartphone))
+
+    with replica_reads():
+      self.assertEqual(self.router.db_for_read(Smartphone), 'replica_1')
+      self.assertEqual(self.router.db_for_write(Smartphone), 'default')
+
+    self.assertIsNone(self.router.db_for_read(Smartphone))
+
+  @override_settings(REPLICA_DATABASES = [])
+  def test_without_replicas_reads_primary(self):
+    """Test nothing changes when no replica is configured"""
+    with replica_reads():
+      self.assertIsNone(self.router.db_for_read(Smartphone))
+
+  def test_migrations_skip_replicas(self):
+    """Test migrations only run on the primary"""
+    self.assertTrue(self.router.allow_migrate('default', 'core'))
+    self.assertFalse(self.router.allow_migrate('replica_1', 'core'))
+
+@override_settings(REPLICA_DATABASES = ['replica_1'], REPLICA_PIN_SECONDS = 5)
+class ReplicaRoutingMiddlewareTests(SimpleTestCase):
+  """Test per request routing and read-your-writes pinning."""
+
+  def setUp(self):
+    self.factory = RequestFactory()
+    self.routed = []
+    self.status = 200
+
+    def get_response(request):
+      self.routed.append(ReplicaRouter().db_for_read(Smartphone))
+      return HttpResponse(status = self.status)
+
+    self.middleware = ReplicaRoutingMiddleware(get_response)
+
+  def test_safe_request_reads_replica(self):
+    """Test a GET reads from the replica"""
+    self.middleware(self.factory.get('/', REMOTE_ADDR = '10.0.0.1'))
+
+    self.assertEqual(self.routed, ['replica_1'])
+
+  def test_write_pins_client_to_primary(self):
+    """Test reads after a write from the same client use the primary"""
+    response = self.middleware(
+      self.factory.post('/', HTTP_AUTHORIZATION = 'Token writer')
+    )
+    self.middleware(self.factory.get('/', HTTP_AUTHORIZATION = 'Token writer'))
+    self.middleware(self.factory.get('/', HTTP_AUTHORIZATION = 'Token other'))
+
+    self.assertIn(PIN_COOKIE, response.cookies)
+    self.assertEqual(self.routed, [None, None, 'replica_1'])
+
+  def test_failed_write_not_pinned(self):
+    """Test a rejected write leaves the client on the replica"""
+    self.status = 400
+    response = self.middleware(
+      self.factory.post('/', HTTP_AUTHORIZATION = 'Token failed')
+    )
+    self.middleware(self.factory.get('/', HTTP_AUTHORIZATION = 'Token failed'))
+
+    self.assertNotIn(PIN_COOKIE, response.cookies)
+    self.assertEqual(self.routed, [None, 'replica_1'])
+
+  def test_anonymous_write_not_pinned_by_address(self):
+    """Test an anonymous write only pins the client through its cookie"""
+    response = self.middleware(
+      self.factory.post('/', REMOTE_ADDR = '10.0.0.2')
+    )
+    self.middleware(self.factory.get('/', REMOTE_ADDR = '10.0.0.2'))
+
+    self.assertIn(PIN_COOKIE, response.cookies)
+    self.assertEqual(self.routed, [None, 'replica_1'])
+
+  def test_pin_cookie_reads_primary(self):
+    """Test a client sending the pin cookie reads from the primary"""
+    request = self.factory.get('/', REMOTE_ADDR = '10.0.0.4')
+    request.COOKIES[PIN_COOKIE] = '1'
+
+    self.middleware(request)
+
+    self.assertEqual(self.routed, [None])
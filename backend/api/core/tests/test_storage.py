@@ -0,0 +1,97 @@
+"""
+Tests for the sharded media storage
+"""
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.models import SmartphoneImage
+from core.storage import ShardedFileSystemStorage
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+class ShardedStorageTests(SimpleTestCase):
+  """Test placing files in shard directories."""
+
+  def setUp(self):
+    self.location = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, self.location, ignore_errors=True)
+    self.storage = ShardedFileSystemStorage(location = self.location)
+
+  def test_shard_is_stable(self):
+    """Test a name always maps to the same shard directories"""
+    name = self.storage.shard('uploads/smartphone/image/photo.jpg')
+    parts = name.split('/')
+
+    self.assertEqual(name, self.storage.shard('uploads/smartphone/image/photo.jpg'))
+    self.assertEqual(parts[:3], ['uploads', 'smartphone', 'image'])
+    self.assertEqual([len(part) for part in parts[3:5]], [2, 2])
+    self.assertEqual(parts[-1], 'photo.jpg')
+    self.assertTrue(self.storage.is_sharded(name))
+    self.assertFalse(self.storage.is_sharded('uploads/smartphone/image/photo.jpg'))
+
+  def test_generate_filename_shards(self):
+    """Test new uploads are named inside their shard directories"""
+    name = self.storage.generate_filename('uploads/smartphone/video/clip.mp4')
+
+    self.assertEqual(name, self.storage.shard('uploads/smartphone/video/clip.mp4'))
+
+  def test_save_leaves_no_temporary_file(self):
+    """Test saving writes the content and cleans up the temporary file"""
+    name = self.storage.save(
+      self.storage.generate_filename('uploads/file.txt'),
+      ContentFile(b'content'),
+    )
+
+    with self.storage.open(name) as saved:
+      self.assertEqual(saved.read(), b'content')
+    directory = os.path.dirname(self.storage.path(name))
+    self.assertEqual(os.listdir(directory), ['file.txt'])
+
+@override_settings(MEDIA_ROOT = MEDIA_ROOT)
+class ShardMediaCommandTests(TestCase):
+  """Test relocating existing uploads."""
+
+  @classmethod
+  def tearDownClass(cls):
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+    super().tearDownClass()
+
+  def test_relocates_legacy_image(self):
+    """Test an unsharded image and its variants move into shards"""
+    legacy = 'uploads/smartphone/image/legacy.jpg'
+    variant = 'uploads/smartphone/image/legacy_w320.jpg'
+    for name in (legacy, variant):
+      path = os.path.join(MEDIA_ROOT, name)
+      os.makedirs(os.path.dirname(path), exist_ok=True)
+      with open(path, 'wb') as media:
+        media.write(b'image')
+
+    user = get_user_model().objects.create_user(
+      email = 'shard@example.com',
+      password = 'test123456',
+    )
+    image = SmartphoneImage.objects.create(user = user, image = legacy)
+    SmartphoneImage.objects.filter(pk = image.pk).update(
+      variants = [{'name': variant}],
+    )
+
+    call_command('shard_media', stdout = StringIO())
+
+    image.refresh_from_db()
+    self.assertTrue(image.image.storage.is_sharded(image.image.name))
+    self.assertTrue(os.path.exists(image.image.path))
+    self.assertFalse(os.path.exists(os.path.join(MEDIA_ROOT, legacy)))
+    self.assertEqual(
+      os.path.dirname(image.variants[0]['name']),
+      os.path.dirname(image.image.name),
+    )
+    self.assertTrue(os.path.exists(
+      os.path.join(MEDIA_ROOT, image.variants[0]['name'])
+    ))
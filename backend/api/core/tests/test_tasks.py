@@ -0,0 +1,154 @@
+"""
+Tests for the background task queue
+"""
+from datetime import timedelta
+from unittest.mock import MagicMock
+
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core import tasks
+from core.models import Task
+
+@override_settings(TASK_MAX_ATTEMPTS=2, TASK_RETRY_DELAY=30)
+class TaskQueueTests(TestCase):
+  """Test queuing and running tasks."""
+
+  def setUp(self):
+    self.func = MagicMock()
+    self.on_failure = MagicMock()
+    tasks.task('test.task', on_failure=self.on_failure)(self.func)
+
+  def tearDown(self):
+    tasks.registry.pop('test.task', None)
+
+  def test_enqueue_skips_duplicate_pending_task(self):
+    """Test the same pending task is only queued once"""
+    tasks.enqueue('test.task', item_id=1)
+    tasks.enqueue('test.task', item_id=1)
+    tasks.enqueue('test.task', item_id=2)
+
+    self.assertEqual(Task.objects.count(), 2)
+
+  def test_duplicate_pending_task_rejected(self):
+    """Test the database refuses a second pending copy of a task"""
+    Task.objects.create(name='test.task', payload={'item_id': 1})
+
+    with self.assertRaises(IntegrityError), transaction.atomic():
+      Task.objects.create(name='test.task', payload={'item_id': 1})
+    Task.objects.create(
+      name='test.task',
+      payload={'item_id': 1},
+      status=Task.Status.DONE,
+    )
+
+    self.assertEqual(Task.objects.count(), 2)
+
+  def test_retry_replaced_by_pending_copy(self):
+    """Test a failed attempt is not requeued next to a pending copy"""
+    def fail(**payload):
+      tasks.enqueue('test.task', **payload)
+      raise RuntimeError('boom')
+
+    self.func.side_effect = fail
+    tasks.enqueue('test.task', item_id=1)
+
+    tasks.run(tasks.claim('test'))
+
+    self.assertEqual(
+      sorted(Task.objects.values_list('status', flat=True)),
+      [Task.Status.FAILED, Task.Status.PENDING],
+    )
+    self.on_failure.assert_not_called()
+
+  def test_run_pending_runs_task(self):
+    """Test a queued task is run with its payload"""
+    self.func.enqueue(item_id=1)
+
+    self.assertEqual(tasks.run_pending(), 1)
+
+    self.func.assert_called_once_with(item_id=1)
+    task = Task.objects.get()
+    self.assertEqual(task.status, Task.Status.DONE)
+    self.assertEqual(task.attempts, 1)
+
+  def test_failed_task_is_retried_later(self):
+    """Test a failing task is rescheduled with a delay"""
+    self.func.side_effect = RuntimeError('boom')
+    tasks.enqueue('test.task', item_id=1)
+
+    tasks.run_pending()
+
+    task = Task.objects.get()
+    self.assertEqual(task.status, Task.Status.PENDING)
+    self.assertIn('boom', task.last_error)
+    self.assertGreater(task.run_after, timezone.now() + timedelta(seconds=20))
+    self.on_failure.assert_not_called()
+
+  def test_task_fails_after_max_attempts(self):
+    """Test a task gives up once it used all its attempts"""
+    self.func.side_effect = RuntimeError('boom')
+    tasks.enqueue('test.task', item_id=1)
+
+    tasks.run_pending()
+    Task.objects.update(run_after=timezone.now())
+    tasks.run_pending()
+
+    task = Task.objects.get()
+    self.assertEqual(task.status, Task.Status.FAILED)
+    self.assertEqual(task.attempts, 2)
+    self.on_failure.assert_called_once_with(item_id=1)
+
+  def test_unknown_task_fails(self):
+    """Test a task without a registered function is not retried"""
+    tasks.enqueue('test.missing')
+
+    tasks.run_pending()
+
+    self.assertEqual(Task.objects.get().status, Task.Status.FAILED)
+
+  def test_cleanup_requeues_lost_tasks(self):
+    """Test tasks left running by a crashed worker are queued again"""
+    Task.objects.create(
+      name='test.task',
+      status=Task.Status.RUNNING,
+      attempts=1,
+      max_attempts=2,
+      started_at=timezone.now() - timedelta(days=1),
+    )
+
+    tasks.cleanup()
+
+    task = Task.objects.get()
+    self.assertEqual(task.status, Task.Status.PENDING)
+    self.assertIn('Timed out', task.last_error)
+
+  def test_cleanup_fails_lost_tasks_out_of_attempts(self):
+    """Test a task lost on its last attempt is failed, not requeued"""
+    Task.objects.create(
+      name='test.task',
+      payload={'item_id': 1},
+      status=Task.Status.RUNNING,
+      attempts=2,
+      max_attempts=2,
+      worker='worker-1',
+      started_at=timezone.now() - timedelta(days=1),
+    )
+
+    tasks.cleanup()
+
+    task = Task.objects.get()
+    self.assertEqual(task.status, Task.Status.FAILED)
+    self.assertIn('worker-1', task.last_error)
+    self.on_failure.assert_called_once_with(item_id=1)
+
+  def test_process_tasks_command_drains_queue(self):
+    """Test the worker command runs the queued tasks"""
+    tasks.enqueue('test.task', item_id=1)
+
+    call_command('process_tasks', '--once', '--concurrency', '1')
+
+    self.func.assert_called_once_with(item_id=1)
+    self.assertEqual(Task.objects.get().status, Task.Status.DONE)
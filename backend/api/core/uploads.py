@@ -0,0 +1,64 @@
+"""
+Resumable video uploads written to disk chunk by chunk
+"""
+import os
+
+from django.conf import settings
+
+from core.models import Smartphone
+
+COPY_BUFFER_SIZE = 64 * 1024
+
+def temp_path(upload):
+  """Return the path of the partial file of an upload"""
+  return os.path.join(settings.VIDEO_UPLOAD_TEMP_DIR, f'{upload.pk}.part')
+
+def append_chunk(upload, stream, length):
+  """
+  Write up to length bytes from stream at the upload offset.
+
+  Bytes past the recorded offset, left by an interrupted request, are
+  dropped first. Only COPY_BUFFER_SIZE bytes are held in memory at a
+  time. Returns the number of bytes written.
+  """
+  path = temp_path(upload)
+  os.makedirs(os.path.dirname(path), exist_ok=True)
+
+  written = 0
+  fd = os.open(path, os.O_WRONLY | os.O_CREAT, 0o644)
+  with os.fdopen(fd, 'wb') as part:
+    part.truncate(upload.offset)
+    part.seek(upload.offset)
+
+    while written < length:
+      data = stream.read(min(COPY_BUFFER_SIZE, length - written))
+      if not data:
+        break
+      part.write(data)
+      written += len(data)
+
+    part.flush()
+    os.fsync(part.fileno())
+
+  return written
+
+def finalize(upload):
+  """Move a complete upload into video storage and return its name"""
+  field = Smartphone._meta.get_field('video')
+  storage = field.storage
+  name = storage.get_available_name(
+    field.generate_filename(upload.smartphone, upload.filename)
+  )
+
+  target = storage.path(name)
+  os.makedirs(os.path.dirname(target), exist_ok=True)
+  os.replace(temp_path(upload), target)
+
+  return name
+
+def discard(upload):
+  """Remove the partial file of an abandoned upload"""
+  try:
+    os.remove(temp_path(upload))
+  except FileNotFoundError:
+    pass
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
 from pathlib import Path
+import copy
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,6 +44,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     'core',
     'user',
@@ -54,7 +56,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.AsyncStreamingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -87,6 +91,19 @@ WSGI_APPLICATION = 'ecarrot.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# How scripts/run.sh serves the app: uwsgi (WSGI) or asgi (uvicorn)
+APP_SERVER = os.environ.get('APP_SERVER', 'uwsgi')
+
+# Serve the hot public reads with async views, on by default under ASGI
+ASYNC_READ_VIEWS = bool(
+  int(os.environ.get('ASYNC_READ_VIEWS', APP_SERVER == 'asgi'))
+)
+
+# Connections are either kept open per thread for DB_CONN_MAX_AGE seconds,
+# or, with DB_POOL=1, borrowed from a psycopg pool bounded per process.
+# ASGI runs each request in a new thread, so it defaults to no persistence.
+DB_POOL = bool(int(os.environ.get('DB_POOL', 0)))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -94,6 +111,63 @@ DATABASES = {
         'NAME':os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        # Pooled connections are returned after each request instead
+        'CONN_MAX_AGE': 0 if DB_POOL else int(
+          os.environ.get('DB_CONN_MAX_AGE')
+          or (0 if APP_SERVER == 'asgi' else 60)
+        ),
+        'CONN_HEALTH_CHECKS': bool(
+          int(os.environ.get('DB_CONN_HEALTH_CHECKS', 1))
+        ),
+    }
+}
+
+if DB_POOL:
+    from psycopg_pool import ConnectionPool # type: ignore
+
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 1)),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 4)),
+            'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            'max_idle': int(os.environ.get('DB_POOL_MAX_IDLE', 300)),
+            # Test a connection before handing it out
+            'check': ConnectionPool.check_connection,
+        },
+    }
+
+# Read replicas kept in sync by Postgres streaming replication, given as
+# DB_REPLICA_HOSTS=host1,host2 and sharing the primary's credentials.
+REPLICA_DATABASES = []
+for number, host in enumerate(
+  filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')),
+  start=1,
+):
+    alias = f'replica_{number}'
+    DATABASES[alias] = {
+        **copy.deepcopy(DATABASES['default']),
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Seconds a client reads from the primary after a write
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
+REPLICA_PIN_CACHE_ALIAS = 'default'
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+          'CACHE_BACKEND',
+          'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
     }
 }
 
@@ -116,6 +190,18 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+PASSWORD_HASHERS = [
+    'core.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# PBKDF2 rounds per password check, Django's default when unset.
+# Size it with `manage.py bench_login` against the uwsgi worker count.
+PASSWORD_HASH_ITERATIONS = int(os.environ.get('PASSWORD_HASH_ITERATIONS', 0))
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.0/topics/i18n/
@@ -133,11 +219,63 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.0/howto/static-files/
 
 STATIC_URL = '/static/static/'
-MEDIA_URL = '/static/media/'
+MEDIA_URL = '/media/'
 
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# Uploads are spread over hashed subdirectories, see core.storage
+STORAGES = {
+  'default': {
+    'BACKEND': 'core.storage.ShardedFileSystemStorage',
+    'OPTIONS': {
+      'shard_depth': int(os.environ.get('MEDIA_SHARD_DEPTH', 2)),
+    },
+  },
+  'staticfiles': {
+    'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+  },
+}
+
+# Media goes through a Django view that checks access, then hands the
+# transfer (including Range requests) to nginx when this is enabled
+MEDIA_ACCEL_REDIRECT = bool(int(os.environ.get('MEDIA_ACCEL_REDIRECT', 0)))
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+
+# Resumable video uploads, assembled next to the media they end up in
+VIDEO_UPLOAD_TEMP_DIR = os.path.join(MEDIA_ROOT, 'uploads', 'tmp')
+# Largest chunk accepted per request, kept below nginx client_max_body_size
+VIDEO_UPLOAD_CHUNK_SIZE = int(
+  os.environ.get('VIDEO_UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024)
+)
+VIDEO_UPLOAD_MAX_SIZE = int(
+  os.environ.get('VIDEO_UPLOAD_MAX_SIZE', 2 * 1024 * 1024 * 1024)
+)
+# Seconds an unfinished upload is kept before `manage.py gc_media` drops it
+VIDEO_UPLOAD_EXPIRY = int(os.environ.get('VIDEO_UPLOAD_EXPIRY', 7 * 24 * 3600))
+
+# Responsive variants generated for uploaded smartphone images
+IMAGE_VARIANT_WIDTHS = [
+  int(width)
+  for width in os.environ.get('IMAGE_VARIANT_WIDTHS', '320,640,1280').split(',')
+]
+IMAGE_VARIANT_FORMATS = os.environ.get(
+  'IMAGE_VARIANT_FORMATS',
+  'JPEG,WEBP,AVIF',
+).split(',')
+IMAGE_VARIANT_QUALITY = int(os.environ.get('IMAGE_VARIANT_QUALITY', 80))
+
+# Background task queue run by `manage.py process_tasks`
+TASK_WORKER_CONCURRENCY = int(os.environ.get('TASK_WORKER_CONCURRENCY', 2))
+TASK_POLL_INTERVAL = float(os.environ.get('TASK_POLL_INTERVAL', 1))
+TASK_MAX_ATTEMPTS = int(os.environ.get('TASK_MAX_ATTEMPTS', 3))
+# Seconds before the first retry, doubled on every further attempt
+TASK_RETRY_DELAY = int(os.environ.get('TASK_RETRY_DELAY', 30))
+# Seconds after which a running task is assumed lost and requeued
+TASK_TIMEOUT = int(os.environ.get('TASK_TIMEOUT', 600))
+# Seconds finished tasks are kept for inspection
+TASK_RETENTION = int(os.environ.get('TASK_RETENTION', 7 * 24 * 3600))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -146,8 +284,57 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'core.User'
 REST_FRAMEWORK = {
   'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+  'DEFAULT_AUTHENTICATION_CLASSES': [
+    'user.authentication.CachedTokenAuthentication',
+  ],
+  # uwsgi passes the client address from nginx as REMOTE_ADDR
+  'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
 }
 
+# Login attempts allowed per client address and per email, checked before
+# hashing. Counters live in this cache; a per-process cache such as locmem
+# multiplies the limits by the number of workers.
+LOGIN_RATE_LIMIT_CACHE_ALIAS = 'default'
+LOGIN_RATE_LIMIT_IP = os.environ.get('LOGIN_RATE_LIMIT_IP', '30/min') or None
+LOGIN_RATE_LIMIT_EMAIL = (
+  os.environ.get('LOGIN_RATE_LIMIT_EMAIL', '10/min') or None
+)
+
+# API tokens issued at login, in seconds
+API_TOKEN_LIFETIME = int(os.environ.get('API_TOKEN_LIFETIME', 30 * 24 * 3600))
+# Token last-used timestamps are written back at most this often per worker
+API_TOKEN_LAST_USED_INTERVAL = int(
+  os.environ.get('API_TOKEN_LAST_USED_INTERVAL', 60)
+)
+
+# Cursor pagination for list endpoints
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 20))
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 100))
+
+# Rows fetched per round trip when streaming list responses
+API_STREAM_CHUNK_SIZE = int(os.environ.get('API_STREAM_CHUNK_SIZE', 500))
+
+# Maximum number of items accepted by bulk endpoints
+API_BULK_MAX_ITEMS = int(os.environ.get('API_BULK_MAX_ITEMS', 1000))
+
+# Response cache for public read endpoints, 0 disables it. Invalidation
+# bumps a generation kept in the cache itself, so it only reaches the
+# processes sharing the backend: locmem is private to each worker, fine for
+# a single process such as runserver. With several workers use a shared
+# backend, e.g. FileBasedCache on one host, as the compose files do.
+API_CACHE_ALIAS = 'default'
+API_CACHE_TIMEOUT = int(os.environ.get('API_CACHE_TIMEOUT', 60))
+
+# Resolved API tokens, kept in process and in the shared cache
+AUTH_TOKEN_CACHE_ALIAS = 'default'
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.environ.get('AUTH_TOKEN_CACHE_TIMEOUT', 300))
+AUTH_TOKEN_LOCAL_TIMEOUT = int(os.environ.get('AUTH_TOKEN_LOCAL_TIMEOUT', 10))
+AUTH_TOKEN_LOCAL_SIZE = int(os.environ.get('AUTH_TOKEN_LOCAL_SIZE', 1024))
+
+# Typeahead suggestions
+SUGGEST_LIMIT = int(os.environ.get('SUGGEST_LIMIT', 10))
+SUGGEST_CACHE_TIMEOUT = int(os.environ.get('SUGGEST_CACHE_TIMEOUT', 30))
+
 SPECTACULAR_SETTINGS = {
   'COMPONENT_SPLIT_REQUEST': True
 }
\ No newline at end of file
@@ -8,9 +8,10 @@ from drf_spectacular.views import ( # type: ignore
 
 from django.contrib import admin
 from django.urls import path, include
-from django.conf.urls.static import static
 from django.conf import settings
 
+from smartphone.views import MediaView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),
@@ -22,10 +23,9 @@ urlpatterns = [
     path('api/user/', include('user.urls')),
 
     path('api/smartphones/', include('smartphone.urls')),
-]
-
-if settings.DEBUG:
-  urlpatterns += static(
-    settings.MEDIA_URL,
-    document_root = settings.MEDIA_ROOT
-  )
\ No newline at end of file
+    path(
+      f'{settings.MEDIA_URL.lstrip("/")}<path:name>',
+      MediaView.as_view(),
+      name='media',
+    ),
+]
\ No newline at end of file
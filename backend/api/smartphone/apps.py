@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SmartphoneConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'smartphone'
+
+    def ready(self):
+        from smartphone import signals # noqa: F401
@@ -0,0 +1,272 @@
+"""
+Async views for the hot public read endpoints, used when served over ASGI
+
+Anonymous JSON reads of the smartphone list and detail, the tag list and
+suggestions are answered with the async ORM, so a single process can wait
+on many slow clients. Every other request goes to the regular DRF view,
+and both produce the same responses and share the response cache.
+"""
+import functools
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Prefetch
+from django.template.response import SimpleTemplateResponse
+from django.urls import URLPattern
+from django.utils.cache import patch_vary_headers
+
+from rest_framework import status # type: ignore
+from rest_framework.renderers import JSONRenderer # type: ignore
+from rest_framework.request import Request # type: ignore
+from rest_framework.response import Response # type: ignore
+
+from core.models import (
+  Smartphone,
+  SmartphoneImage,
+  Tag
+)
+from smartphone import serializers
+from smartphone.cache import acached_response, acatalog_version
+from smartphone.conditional import aconditional_response
+from smartphone.filters import (
+  asuggest_names,
+  filter_by_tags,
+  TAGS_MODE_ANY,
+  TAGS_MODES,
+)
+from smartphone.pagination import IdCursorPagination
+
+JSON_MEDIA_TYPES = ('*/*', 'application/*', 'application/json')
+
+def async_read(*query_params):
+  """Declare the query params an async read understands"""
+  def decorator(read):
+    read.query_params = frozenset(query_params)
+    return read
+
+  return decorator
+
+def _accepts_json(request):
+  """Return True if DRF would negotiate plain JSON for request"""
+  accept = request.headers.get('Accept') or '*/*'
+  media_types = (
+    media_type.split(';')[0].strip() for media_type in accept.split(',')
+  )
+
+  return all(media_type in JSON_MEDIA_TYPES for media_type in media_types)
+
+def _is_async_read(request, read, kwargs):
+  """Return True if read can answer request instead of the DRF view"""
+  return (
+    request.method == 'GET'
+    and 'HTTP_AUTHORIZATION' not in request.META
+    and not kwargs.get('format')
+    and set(request.GET) <= read.query_params
+    and _accepts_json(request)
+  )
+
+def _api_request(request):
+  """Wrap request for the DRF helpers, negotiated as JSON"""
+  api_request = Request(request)
+  api_request.accepted_renderer = JSONRenderer()
+  api_request.accepted_media_type = JSONRenderer.media_type
+
+  return api_request
+
+def _render(response):
+  """Render a Response as the DRF view would for a JSON client"""
+  if isinstance(response, Response):
+    response.accepted_renderer = JSONRenderer()
+    response.accepted_media_type = JSONRenderer.media_type
+    response.renderer_context = {}
+    response.render()
+  patch_vary_headers(response, ('Accept',))
+
+  return response
+
+@sync_to_async
+def _delegate(view, request, *args, **kwargs):
+  """Answer request with the DRF view in a worker thread"""
+  response = view(request, *args, **kwargs)
+  if isinstance(response, SimpleTemplateResponse):
+    response.render()
+
+  return response
+
+def async_read_view(read, view):
+  """Return a view answering async reads with read, the rest with view"""
+  @functools.wraps(view)
+  async def async_view(request, *args, **kwargs):
+    if _is_async_read(request, read, kwargs):
+      response = await read(request, *args, **kwargs)
+      if response is not None:
+        return _render(response)
+
+    return await _delegate(view, request, *args, **kwargs)
+
+  return async_view
+
+def _smartphones():
+  """Return smartphones with the relations the serializer renders"""
+  return Smartphone.objects.prefetch_related(
+    'tags',
+    Prefetch(
+      'images',
+      queryset = SmartphoneImage.objects.select_related('user'),
+    ),
+  )
+
+async def _object_state(pk):
+  """Async SmartphoneViewSet.get_object_state"""
+  return await Smartphone.objects.filter(pk = pk).aaggregate(
+    updated_at = Max('updated_at'),
+    count = Count('pk', distinct=True),
+    tags_updated_at = Max('tags__updated_at'),
+    tags_count = Count('tags', distinct=True),
+    images_updated_at = Max('images__updated_at'),
+    images_count = Count('images', distinct=True),
+  )
+
+@async_read('cursor', 'page_size', 'tags', 'tags_mode')
+async def read_smartphone_list(request):
+  """List a page of smartphones, optionally filtered by tags"""
+  queryset = _smartphones()
+  tags = request.GET.get('tags')
+
+  if tags:
+    try:
+      tag_ids = [int(tag_id) for tag_id in tags.split(',')]
+    except ValueError:
+      return None
+
+    tags_mode = request.GET.get('tags_mode', TAGS_MODE_ANY)
+    if tags_mode not in TAGS_MODES:
+      return None
+
+    queryset = filter_by_tags(queryset, tag_ids, tags_mode)
+
+  api_request = _api_request(request)
+  paginator = IdCursorPagination()
+  if not paginator.is_forward(api_request):
+    return None
+
+  async def get_page():
+    page = await paginator.apaginate_queryset(queryset, api_request)
+    serializer = serializers.SmartphoneSerializer(
+      page,
+      many = True,
+      context = {'request': api_request},
+    )
+    return paginator.get_paginated_response(serializer.data)
+
+  async def get_response():
+    state = {'catalog': await acatalog_version()}
+    return await aconditional_response(
+      api_request,
+      state,
+      get_page,
+      with_last_modified = False,
+    )
+
+  return await acached_response(api_request, get_response)
+
+def _not_found():
+  """Return the 404 DRF answers for a missing smartphone"""
+  return Response(
+    {'detail': 'No Smartphone matches the given query.'},
+    status = status.HTTP_404_NOT_FOUND,
+  )
+
+@async_read()
+async def read_smartphone_detail(request, pk):
+  """Retrieve a smartphone"""
+  if not str(pk).isdigit():
+    return None
+
+  api_request = _api_request(request)
+
+  async def get_smartphone():
+    smartphone = await _smartphones().filter(pk = pk).afirst()
+    if smartphone is None:
+      return _not_found()
+
+    serializer = serializers.SmartphoneSerializer(
+      smartphone,
+      context = {'request': api_request},
+    )
+    return Response(serializer.data)
+
+  async def get_response():
+    state = await _object_state(pk)
+    if not state['count']:
+      return _not_found()
+
+    return await aconditional_response(api_request, state, get_smartphone)
+
+  return await acached_response(api_request, get_response)
+
+@async_read()
+async def read_tag_list(request):
+  """List every tag by name"""
+  api_request = _api_request(request)
+
+  async def get_response():
+    tags = [tag async for tag in Tag.objects.order_by('-name')]
+    serializer = serializers.TagSerializer(
+      tags,
+      many = True,
+      context = {'request': api_request},
+    )
+    return Response(serializer.data)
+
+  return await acached_response(api_request, get_response)
+
+@async_read('prefix')
+async def read_suggest(request):
+  """Suggest smartphone and tag names for typeahead"""
+  prefix = request.GET.get('prefix', '').strip()
+
+  if not prefix:
+    return Response({'smartphones': [], 'tags': []})
+
+  key = f'suggest:{prefix.lower()}'
+  suggestions = await cache.aget(key)
+
+  if suggestions is None:
+    suggestions = {
+      'smartphones': await asuggest_names(
+        Smartphone.objects.all(),
+        prefix,
+        settings.SUGGEST_LIMIT,
+      ),
+      'tags': await asuggest_names(
+        Tag.objects.all(),
+        prefix,
+        settings.SUGGEST_LIMIT,
+      ),
+    }
+    await cache.aset(key, suggestions, settings.SUGGEST_CACHE_TIMEOUT)
+
+  return Response(suggestions)
+
+ASYNC_READS = {
+  'smartphone-list': read_smartphone_list,
+  'smartphone-detail': read_smartphone_detail,
+  'tag-list': read_tag_list,
+  'suggest': read_suggest,
+}
+
+def with_async_reads(patterns):
+  """Return patterns with the hot read endpoints served by async views"""
+  return [
+    URLPattern(
+      pattern.pattern,
+      async_read_view(ASYNC_READS[pattern.name], pattern.callback),
+      pattern.default_args,
+      pattern.name,
+    )
+    if isinstance(pattern, URLPattern) and pattern.name in ASYNC_READS
+    else pattern
+    for pattern in patterns
+  ]
@@ -0,0 +1,228 @@
+"""
+Response cache for public read endpoints
+"""
+import hashlib
+import time
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response
+
+from rest_framework.response import Response # type: ignore
+
+from core.routers import replica_reads
+
+VERSION_KEY = 'api-response:version'
+HITS_KEY = 'api-response:hits'
+MISSES_KEY = 'api-response:misses'
+RECENT_WRITE_KEY = 'api-response:recent-write'
+CACHED_HEADERS = ('ETag', 'Last-Modified')
+
+def _get_cache():
+  """Return the cache backend configured for API responses"""
+  return caches[settings.API_CACHE_ALIAS]
+
+def _incr(key):
+  """Increment a counter, creating it if needed"""
+  cache = _get_cache()
+  cache.add(key, 0, timeout=None)
+  try:
+    return cache.incr(key)
+  except ValueError:
+    cache.set(key, 1, timeout=None)
+    return 1
+
+def _version():
+  """
+  Return the current cache generation.
+
+  It starts from the clock rather than 1, so a cache that was cleared or
+  restarted does not hand out generations, and ETags, seen before.
+  """
+  return _get_cache().get_or_set(VERSION_KEY, time.time_ns, timeout=None)
+
+async def _aincr(key):
+  """Async counterpart of _incr"""
+  cache = _get_cache()
+  await cache.aadd(key, 0, timeout=None)
+  try:
+    return await cache.aincr(key)
+  except ValueError:
+    await cache.aset(key, 1, timeout=None)
+    return 1
+
+async def _aversion():
+  """Async counterpart of _version"""
+  return await _get_cache().aget_or_set(
+    VERSION_KEY,
+    time.time_ns,
+    timeout=None,
+  )
+
+def invalidate():
+  """
+  Invalidate every cached response.
+
+  Keys embed a generation number, so bumping it orphans all previous
+  entries at once; they expire on their own timeout. With read replicas,
+  misses read the primary for REPLICA_PIN_SECONDS afterwards so a lagging
+  replica cannot refill the cache with the data from before the write.
+  """
+  _incr(VERSION_KEY)
+  if settings.REPLICA_DATABASES:
+    _get_cache().set(RECENT_WRITE_KEY, True, settings.REPLICA_PIN_SECONDS)
+
+def catalog_version():
+  """
+  Return a number that changes whenever a smartphone, tag or image does.
+
+  It is the cache generation, so it reads one cache key instead of
+  aggregating the tables. Like the cache it is per process with locmem.
+  """
+  return _version()
+
+async def acatalog_version():
+  """Async catalog_version"""
+  return await _aversion()
+
+def _miss_reads(written_recently):
+  """Return the context a cache miss renders in"""
+  return replica_reads(False) if written_recently else nullcontext()
+
+def _digest(request):
+  """Hash the path and query params of request"""
+  uri = request.build_absolute_uri().encode()
+
+  return hashlib.md5(uri, usedforsecurity=False).hexdigest()
+
+def response_cache_key(request):
+  """Build the cache key for a request from its path and query params"""
+  return f'api-response:{_version()}:{_digest(request)}'
+
+def is_enabled():
+  """Return True unless the response cache is turned off"""
+  return settings.API_CACHE_TIMEOUT > 0
+
+def is_cacheable(request):
+  """Return True if the response for request may be shared"""
+  return (
+    request.method == 'GET'
+    and not request.user.is_authenticated
+    and is_enabled()
+  )
+
+def cached_response(request, get_response):
+  """Return the cached response for request, rendering it on a miss"""
+  if not is_cacheable(request):
+    return get_response()
+
+  cache = _get_cache()
+  key = response_cache_key(request)
+  entry = cache.get(key)
+
+  if entry is not None:
+    _incr(HITS_KEY)
+    etag = entry['headers'].get('ETag')
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+      response = Response(entry['data'])
+    for header, value in entry['headers'].items():
+      response[header] = value
+    response['X-Cache'] = 'HIT'
+    return response
+
+  _incr(MISSES_KEY)
+  with _miss_reads(cache.get(RECENT_WRITE_KEY, False)):
+    response = get_response()
+
+  if response.status_code == 200:
+    entry = {
+      'data': response.data,
+      'headers': {
+        header: response[header] for header in CACHED_HEADERS
+        if header in response
+      },
+    }
+    cache.set(key, entry, settings.API_CACHE_TIMEOUT)
+  response['X-Cache'] = 'MISS'
+
+  return response
+
+async def acached_response(request, get_response):
+  """
+  Async cached_response for requests known to be cacheable.
+
+  get_response is awaited on a miss; the returned Response is left for
+  the caller to render.
+  """
+  if not is_enabled():
+    return await get_response()
+
+  cache = _get_cache()
+  key = f'api-response:{await _aversion()}:{_digest(request)}'
+  entry = await cache.aget(key)
+
+  if entry is not None:
+    await _aincr(HITS_KEY)
+    etag = entry['headers'].get('ETag')
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+      response = Response(entry['data'])
+    for header, value in entry['headers'].items():
+      response[header] = value
+    response['X-Cache'] = 'HIT'
+    return response
+
+  await _aincr(MISSES_KEY)
+  with _miss_reads(await cache.aget(RECENT_WRITE_KEY, False)):
+    response = await get_response()
+
+  if response.status_code == 200:
+    entry = {
+      'data': response.data,
+      'headers': {
+        header: response[header] for header in CACHED_HEADERS
+        if header in response
+      },
+    }
+    await cache.aset(key, entry, settings.API_CACHE_TIMEOUT)
+  response['X-Cache'] = 'MISS'
+
+  return response
+
+def stats():
+  """Return the hit and miss counters"""
+  cache = _get_cache()
+
+  return {
+    'hits': cache.get(HITS_KEY, 0),
+    'misses': cache.get(MISSES_KEY, 0),
+  }
+
+class CachedReadMixin:
+  """Serve list for anonymous users from the response cache"""
+
+  def list(self, request, *args, **kwargs):
+    return cached_response(
+      request,
+      lambda: super(CachedReadMixin, self).list(request, *args, **kwargs),
+    )
+
+class CachedRetrieveMixin:
+  """
+  Serve retrieve for anonymous users from the response cache.
+
+  Kept apart from CachedReadMixin: the router routes a detail GET for any
+  viewset with a retrieve method, so only viewsets that retrieve use it.
+  """
+
+  def retrieve(self, request, *args, **kwargs):
+    return cached_response(
+      request,
+      lambda: super(CachedRetrieveMixin, self).retrieve(
+        request,
+        *args,
+        **kwargs,
+      ),
+    )
@@ -0,0 +1,141 @@
+"""
+Conditional GET support for read endpoints
+"""
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+def _etag(request, state):
+  """Build a strong ETag from the request and the data state"""
+  parts = [request.get_full_path(), str(request.accepted_media_type)]
+  parts.extend(f'{key}={value!r}' for key, value in sorted(state.items()))
+  digest = hashlib.md5(
+    '|'.join(parts).encode(),
+    usedforsecurity=False,
+  ).hexdigest()
+
+  return f'"{digest}"'
+
+def _last_modified(state):
+  """Return the latest timestamp in state as seconds, if any"""
+  timestamps = [
+    value.timestamp() for key, value in state.items()
+    if key.endswith('updated_at') and value is not None
+  ]
+
+  return int(max(timestamps)) if timestamps else None
+
+def conditional_response(
+  request,
+  state,
+  get_response,
+  with_last_modified = True,
+):
+  """
+  Return 304 if the validators match, otherwise the full response.
+
+  Last-Modified comes from the latest updated_at, which a delete never
+  moves forward; with_last_modified=False leaves it out for lists.
+  """
+  etag = _etag(request, state)
+  last_modified = _last_modified(state) if with_last_modified else None
+
+  response = get_conditional_response(
+    request,
+    etag = etag,
+    last_modified = last_modified,
+  )
+  if response is None:
+    response = get_response()
+    if response.status_code != 200:
+      return response
+
+  return _add_validators(response, etag, last_modified)
+
+async def aconditional_response(
+  request,
+  state,
+  get_response,
+  with_last_modified = True,
+):
+  """Async conditional_response, awaiting get_response"""
+  etag = _etag(request, state)
+  last_modified = _last_modified(state) if with_last_modified else None
+
+  response = get_conditional_response(
+    request,
+    etag = etag,
+    last_modified = last_modified,
+  )
+  if response is None:
+    response = await get_response()
+    if response.status_code != 200:
+      return response
+
+  return _add_validators(response, etag, last_modified)
+
+def _add_validators(response, etag, last_modified):
+  """Set the ETag and Last-Modified headers of response"""
+  response['ETag'] = etag
+  if last_modified is not None:
+    response['Last-Modified'] = http_date(last_modified)
+
+  return response
+
+class ConditionalReadMixin:
+  """
+  Answer list and retrieve with 304 Not Modified when the client copy is
+  current.
+
+  Validators are derived from cheap aggregates (latest updated_at and row
+  count) so unchanged data is never serialized. Lists only get an ETag:
+  the row count catches deletes, the latest updated_at does not.
+  """
+
+  def get_list_state(self):
+    """Return aggregates that change whenever the list changes"""
+    queryset = self.filter_queryset(self.get_queryset()).order_by()
+
+    return queryset.aggregate(
+      updated_at = Max('updated_at'),
+      count = Count('pk'),
+    )
+
+  def get_object_state(self):
+    """Return aggregates that change whenever the object changes"""
+    lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+    queryset = self.get_queryset().filter(
+      **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+    ).order_by()
+
+    return queryset.aggregate(
+      updated_at = Max('updated_at'),
+      count = Count('pk'),
+    )
+
+  def list(self, request, *args, **kwargs):
+    return conditional_response(
+      request,
+      self.get_list_state(),
+      lambda: super(ConditionalReadMixin, self).list(request, *args, **kwargs),
+      with_last_modified = False,
+    )
+
+  def retrieve(self, request, *args, **kwargs):
+    try:
+      state = self.get_object_state()
+    except (TypeError, ValueError, ValidationError):
+      # A malformed lookup value, get_object answers it with 404
+      return super().retrieve(request, *args, **kwargs)
+
+    if not state['count']:
+      return super().retrieve(request, *args, **kwargs)
+
+    return conditional_response(
+      request,
+      state,
+      lambda: super(ConditionalReadMixin, self).retrieve(request, *args, **kwargs),
+    )
@@ -0,0 +1,71 @@
+"""
+Query filters for smartphone APIs
+"""
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Exists, F, FloatField, OuterRef
+from django.db.models.functions import Cast
+
+from core.models import Smartphone
+
+TAGS_MODE_ANY = 'any'
+TAGS_MODE_ALL = 'all'
+TAGS_MODES = (TAGS_MODE_ANY, TAGS_MODE_ALL)
+
+def _tag_exists(tag_ids):
+  """Return a semi-join matching smartphones tagged with any of tag_ids"""
+  smartphone_tags = Smartphone.tags.through.objects.filter(
+    smartphone_id = OuterRef('pk'),
+    tag_id__in = tag_ids,
+  )
+  return Exists(smartphone_tags)
+
+def filter_by_tags(queryset, tag_ids, mode = TAGS_MODE_ANY):
+  """
+  Filter smartphones by tag ids using EXISTS subqueries.
+
+  Each subquery is a lookup on the smartphone_tags index, so no join
+  rows are produced and the result needs no DISTINCT.
+  """
+  if mode == TAGS_MODE_ALL:
+    for tag_id in set(tag_ids):
+      queryset = queryset.filter(_tag_exists([tag_id]))
+    return queryset
+
+  return queryset.filter(_tag_exists(tag_ids))
+
+def search(queryset, text):
+  """
+  Full-text search over the stored smartphone search vector.
+
+  Matches go through the GIN index and are annotated with a `rank`,
+  cast to double precision so it round-trips exactly through a cursor.
+  """
+  query = SearchQuery(text, config='english', search_type='websearch')
+  rank = SearchRank(F('search_vector'), query)
+
+  return queryset.filter(search_vector=query).annotate(
+    rank = Cast(rank, FloatField()),
+  )
+
+def suggest_names(queryset, prefix, limit):
+  """
+  Return up to `limit` distinct names starting with prefix.
+
+  The case-insensitive prefix match is served by the trigram GIN index
+  on UPPER(name), and only the name column is fetched.
+  """
+  names = queryset.filter(name__istartswith=prefix).values_list(
+    'name',
+    flat=True,
+  )
+
+  return list(names.order_by('name').distinct()[:limit])
+
+async def asuggest_names(queryset, prefix, limit):
+  """Async suggest_names"""
+  names = queryset.filter(name__istartswith=prefix).values_list(
+    'name',
+    flat=True,
+  )
+
+  return [name async for name in names.order_by('name').distinct()[:limit]]
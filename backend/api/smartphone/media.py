@@ -0,0 +1,142 @@
+"""
+Access checked media downloads with HTTP Range support
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.http import (
+  FileResponse,
+  Http404,
+  HttpResponse,
+  StreamingHttpResponse
+)
+
+from core.models import (
+  Smartphone,
+  SmartphoneImage,
+  ProcessingStatus
+)
+
+IMAGE_DIR = 'uploads/smartphone/image/'
+VIDEO_DIR = 'uploads/smartphone/video/'
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+READ_BLOCK_SIZE = 64 * 1024
+
+def normalize_name(name):
+  """Return the storage name for a URL path, or None if it escapes MEDIA_ROOT"""
+  name = posixpath.normpath(name)
+  if name.startswith(('/', '../')) or name in ('.', '..'):
+    return None
+
+  return name
+
+def can_read(user, name):
+  """
+  Return True if user may download the media file called name.
+
+  Images attached to the catalog are public. Videos are public once
+  processed and visible to their owner before that. Anything else, such
+  as partial uploads, is only served to staff.
+  """
+  if user.is_staff:
+    return True
+
+  if name.startswith(IMAGE_DIR):
+    return SmartphoneImage.objects.filter(
+      Q(image = name) | Q(variants__contains = [{'name': name}])
+    ).exists()
+
+  if name.startswith(VIDEO_DIR):
+    visible = Q(video_status__in = ('', ProcessingStatus.READY))
+    if user.is_authenticated:
+      visible |= Q(user = user)
+    return Smartphone.objects.filter(visible, video = name).exists()
+
+  return False
+
+def parse_range(header, size):
+  """
+  Return the (start, end) bytes requested by a Range header.
+
+  None means the whole file: no header, or one this parser does not
+  handle such as several ranges, which RFC 9110 lets servers ignore.
+  Raises ValueError when the range cannot be satisfied.
+  """
+  match = RANGE_RE.match(header.strip())
+  if match is None:
+    return None
+
+  first, last = match.groups()
+  if first:
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+  elif last:
+    if int(last) == 0:
+      raise ValueError('Empty suffix range')
+    start = max(size - int(last), 0)
+    end = size - 1
+  else:
+    return None
+
+  if start >= size or start > end:
+    raise ValueError('Range outside the file')
+
+  return start, end
+
+def _read_span(path, start, length):
+  """Yield length bytes of the file at path from start, in blocks"""
+  with open(path, 'rb') as media:
+    media.seek(start)
+    while length > 0:
+      data = media.read(min(READ_BLOCK_SIZE, length))
+      if not data:
+        break
+      length -= len(data)
+      yield data
+
+def serve(request, name):
+  """
+  Return a response sending the media file called name.
+
+  With MEDIA_ACCEL_REDIRECT nginx sends the file itself, including Range
+  requests. Otherwise Python sends it, honouring a single byte range.
+  """
+  content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+  if settings.MEDIA_ACCEL_REDIRECT:
+    response = HttpResponse(content_type = content_type)
+    response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(name)
+    return response
+
+  path = default_storage.path(name)
+  if not os.path.isfile(path):
+    raise Http404('Media file not found.')
+  size = os.path.getsize(path)
+
+  try:
+    span = parse_range(request.headers.get('Range', ''), size)
+  except ValueError:
+    response = HttpResponse(status = 416)
+    response['Content-Range'] = f'bytes */{size}'
+    return response
+
+  if span is None:
+    response = FileResponse(open(path, 'rb'), content_type = content_type)
+  else:
+    start, end = span
+    response = StreamingHttpResponse(
+      _read_span(path, start, end - start + 1),
+      status = 206,
+      content_type = content_type,
+    )
+    response['Content-Length'] = str(end - start + 1)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+  response['Accept-Ranges'] = 'bytes'
+  return response
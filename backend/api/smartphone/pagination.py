@@ -0,0 +1,81 @@
+"""
+Pagination classes for smartphone APIs
+"""
+from django.conf import settings
+
+from rest_framework.exceptions import NotFound # type: ignore
+from rest_framework.pagination import CursorPagination # type: ignore
+
+class IdCursorPagination(CursorPagination):
+  """
+  Keyset pagination ordered on the primary key.
+
+  Every page is fetched with an indexed `id < cursor` seek instead of an
+  OFFSET, so deep pages cost the same as the first one. Ids are assigned
+  in insertion order, which keeps the ordering aligned with `created_at`.
+  """
+  ordering = '-id'
+  page_size = settings.API_PAGE_SIZE
+  page_size_query_param = 'page_size'
+  max_page_size = settings.API_MAX_PAGE_SIZE
+
+  def get_ordering(self, request, queryset, view):
+    """Use the ordering requested by the view, e.g. search rank"""
+    ordering = getattr(view, 'cursor_ordering', None)
+    if ordering:
+      return ordering
+
+    return super().get_ordering(request, queryset, view)
+
+  def is_forward(self, request):
+    """Return True if request asks for the first page or a following one"""
+    try:
+      cursor = self.decode_cursor(request)
+    except NotFound:
+      return False
+
+    if cursor is None:
+      return True
+
+    return (
+      not cursor.reverse
+      and not cursor.offset
+      and str(cursor.position).isdigit()
+    )
+
+  async def apaginate_queryset(self, queryset, request, view=None):
+    """
+    Async paginate_queryset for the pages accepted by is_forward().
+
+    Those pages are a single seek past the cursor position, fetched with
+    the async ORM; links are then built by the regular helpers.
+    """
+    self.request = request
+    self.page_size = self.get_page_size(request)
+    self.base_url = request.build_absolute_uri()
+    self.ordering = self.get_ordering(request, queryset, view)
+    self.cursor = self.decode_cursor(request)
+    current_position = self.cursor.position if self.cursor else None
+
+    queryset = queryset.order_by(*self.ordering)
+    if current_position is not None:
+      order = self.ordering[0]
+      lookup = 'lt' if order.startswith('-') else 'gt'
+      queryset = queryset.filter(
+        **{f'{order.lstrip("-")}__{lookup}': current_position}
+      )
+
+    results = [item async for item in queryset[:self.page_size + 1]]
+    self.page = results[:self.page_size]
+
+    self.has_next = len(results) > len(self.page)
+    if self.has_next:
+      self.next_position = self._get_position_from_instance(
+        results[-1],
+        self.ordering,
+      )
+    self.has_previous = current_position is not None
+    if self.has_previous:
+      self.previous_position = current_position
+
+    return self.page
@@ -0,0 +1,25 @@
+"""
+Renderers for smartphone APIs
+"""
+import json
+
+from rest_framework import renderers # type: ignore
+from rest_framework.utils import encoders # type: ignore
+
+def to_ndjson_line(item):
+  """Encode a single item as one newline-terminated JSON line"""
+  return json.dumps(item, cls=encoders.JSONEncoder).encode() + b'\n'
+
+class NDJSONRenderer(renderers.BaseRenderer):
+  """Render a list as newline delimited JSON, one item per line"""
+
+  media_type = 'application/x-ndjson'
+  format = 'ndjson'
+  charset = None
+
+  def render(self, data, accepted_media_type=None, renderer_context=None):
+    if data is None:
+      return b''
+
+    items = data if isinstance(data, list) else [data]
+    return b''.join(to_ndjson_line(item) for item in items)
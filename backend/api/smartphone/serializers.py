@@ -2,12 +2,60 @@
 Serializers for smartphone APIs
 """
 
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from drf_spectacular.utils import extend_schema_field # type: ignore
 from rest_framework import serializers # type: ignore
 from core.models import (
     Smartphone,
     Tag,
-    SmartphoneImage
+    SmartphoneImage,
+    VideoUpload,
+    ProcessingStatus
 )
+from core.images import content_hash, deduplicate
+from smartphone import cache, tasks
+
+def resolve_tags(user, names):
+    """
+    Return the user's tags by name, creating the missing ones.
+
+    Existing tags are read in one query and missing ones are inserted in
+    one more; concurrent inserts of the same name are absorbed by the
+    unique (user, name) constraint.
+    """
+    names = set(names)
+    tags = {
+        tag.name: tag
+        for tag in Tag.objects.filter(user=user, name__in=names)
+    }
+
+    missing = names - tags.keys()
+    if missing:
+        Tag.objects.bulk_create(
+            [Tag(user=user, name=name) for name in missing],
+            ignore_conflicts=True,
+        )
+        tags.update(
+            (tag.name, tag)
+            for tag in Tag.objects.filter(user=user, name__in=missing)
+        )
+
+    return tags
+
+def delete_detached_images(image_ids):
+    """
+    Delete the images among image_ids no smartphone uses any more.
+
+    Rows are deleted one by one through the ORM, so the post_delete signal
+    releases their files once nothing else references them.
+    """
+    SmartphoneImage.objects.filter(
+        pk__in=image_ids,
+        smartphone__isnull=True,
+    ).delete()
 
 class TagSerializer(serializers.ModelSerializer):
     """Serializer for tag objects"""
@@ -17,15 +65,46 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ('id', 'name',)
         read_only_fields = ('id',)
 
+class SmartphoneImageVariantSerializer(serializers.Serializer):
+    """Serializer for a responsive image variant"""
+
+    url = serializers.URLField()
+    format = serializers.CharField()
+    width = serializers.IntegerField()
+    height = serializers.IntegerField()
+
 class SmartphoneImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to smartphones"""
 
+    variants = serializers.SerializerMethodField()
+
     class Meta:
         model = SmartphoneImage
-        fields = ('id', 'user', 'image', )
-        read_only_fields = ('id',)
+        fields = ('id', 'user', 'image', 'variants', 'processing_status', )
+        # The owner is always the requesting user, set by the views
+        read_only_fields = ('id', 'user', 'variants', 'processing_status', )
         extra_kwargs = {'image': {'required': True}}
 
+    @extend_schema_field(SmartphoneImageVariantSerializer(many=True))
+    def get_variants(self, obj):
+        """Return the responsive variants with their URLs"""
+        storage = obj.image.storage
+        request = self.context.get('request')
+
+        variants = []
+        for variant in obj.variants:
+            url = storage.url(variant['name'])
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            variants.append({
+                'url': url,
+                'format': variant['format'],
+                'width': variant['width'],
+                'height': variant['height'],
+            })
+
+        return variants
+
     def _create_image(self, validated_data, smartphone):
         """Create a new SmartphoneImage"""
 
@@ -34,6 +113,142 @@ class SmartphoneImageSerializer(serializers.ModelSerializer):
 
         return image
 
+class SmartphoneListSerializer(serializers.ListSerializer):
+    """Create and update many smartphones with set-based queries"""
+
+    def run_child_validation(self, data):
+        """Validate an item against the smartphone it updates, if any"""
+        if self.instance is None:
+            return super().run_child_validation(data)
+
+        if not hasattr(self, '_instances'):
+            self._instances = {str(obj.pk): obj for obj in self.instance}
+
+        pk = data.get('id') if isinstance(data, dict) else None
+        instance = self._instances.get(str(pk))
+        if instance is None:
+            raise serializers.ValidationError({'id': ['Not found.']})
+
+        self.child.instance = instance
+        validated = super().run_child_validation(data)
+        validated['instance'] = instance
+
+        return validated
+
+    def _add_relations(self, user, pairs):
+        """Attach tags and images to (smartphone, item) pairs in bulk"""
+        tags = resolve_tags(user, [
+            tag['name']
+            for _, item in pairs
+            for tag in item.get('tags') or []
+        ])
+
+        images = []
+        image_owners = []
+        for smartphone, item in pairs:
+            for image in item.get('images') or []:
+                images.append(SmartphoneImage(user=user, **image))
+                image_owners.append(smartphone)
+        # bulk_create skips the signals that deduplicate and queue images
+        for image in images:
+            deduplicate(image)
+        SmartphoneImage.objects.bulk_create(images)
+        for image in images:
+            if image.processing_status == ProcessingStatus.PENDING:
+                tasks.process_smartphone_image.enqueue(image_id=image.pk)
+
+        SmartphoneTags = Smartphone.tags.through
+        SmartphoneImages = Smartphone.images.through
+
+        SmartphoneTags.objects.bulk_create(
+            [
+                SmartphoneTags(smartphone=smartphone, tag=tags[tag['name']])
+                for smartphone, item in pairs
+                for tag in item.get('tags') or []
+            ],
+            ignore_conflicts=True,
+        )
+        SmartphoneImages.objects.bulk_create([
+            SmartphoneImages(smartphone=smartphone, smartphoneimage=image)
+            for smartphone, image in zip(image_owners, images)
+        ])
+
+    def create(self, validated_data):
+        """Create and return many smartphones in one transaction"""
+        auth_user = self.context['request'].user
+        relations = ('tags', 'images')
+
+        smartphones = [
+            Smartphone(**{
+                key: value for key, value in item.items()
+                if key not in relations
+            })
+            for item in validated_data
+        ]
+        # bulk_create skips the signals that queue video processing
+        for smartphone in smartphones:
+            if smartphone.video:
+                smartphone.video_status = ProcessingStatus.PENDING
+
+        with transaction.atomic():
+            Smartphone.objects.bulk_create(smartphones)
+            self._add_relations(auth_user, list(zip(smartphones, validated_data)))
+            for smartphone in smartphones:
+                if smartphone.video:
+                    tasks.process_smartphone_video.enqueue(
+                        smartphone_id=smartphone.pk,
+                    )
+            transaction.on_commit(cache.invalidate)
+
+        return smartphones
+
+    def update(self, instance, validated_data):
+        """Update and return many smartphones in one transaction"""
+        auth_user = self.context['request'].user
+        now = timezone.now()
+
+        fields = {'updated_at'}
+        smartphones = []
+        pairs = []
+
+        for item in validated_data:
+            smartphone = item.pop('instance')
+            tags = item.pop('tags', None)
+            images = item.pop('images', None)
+
+            for attr, value in item.items():
+                setattr(smartphone, attr, value)
+                fields.add(attr)
+            smartphone.updated_at = now
+            smartphones.append(smartphone)
+
+            if tags is not None or images is not None:
+                pairs.append((smartphone, {'tags': tags, 'images': images}))
+
+        with transaction.atomic():
+            Smartphone.objects.bulk_update(smartphones, sorted(fields))
+
+            Smartphone.tags.through.objects.filter(smartphone__in=[
+                smartphone for smartphone, item in pairs
+                if item['tags'] is not None
+            ]).delete()
+            replaced_images = Smartphone.images.through.objects.filter(
+                smartphone__in=[
+                    smartphone for smartphone, item in pairs
+                    if item['images'] is not None
+                ],
+            )
+            replaced_image_ids = list(
+                replaced_images.values_list('smartphoneimage_id', flat=True)
+            )
+            replaced_images.delete()
+
+            self._add_relations(auth_user, pairs)
+            delete_detached_images(replaced_image_ids)
+            transaction.on_commit(cache.invalidate)
+
+        return smartphones
+
 class SmartphoneSerializer(serializers.ModelSerializer):
     """Serializer for smartphone objects"""
 
@@ -42,19 +257,48 @@ class SmartphoneSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Smartphone
-        fields = ('id', 'name', 'price','tags', 'description', 'images', 'video', )
-        read_only_fields = ('id',)
+        fields = (
+            'id', 'name', 'price','tags', 'description', 'images', 'video',
+            'video_status',
+        )
+        read_only_fields = ('id', 'video_status',)
+        list_serializer_class = SmartphoneListSerializer
 
     def _get_or_create_tags(self, tags, instance):
         """Handle getting or creating tags as needed"""
         auth_user = self.context['request'].user
 
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user = auth_user,
-                **tag,
-            )
-            instance.tags.add(tag_obj)
+        tag_objs = resolve_tags(auth_user, [tag['name'] for tag in tags])
+        instance.tags.set(tag_objs.values())
+
+    def _set_images(self, images, instance):
+        """
+        Replace the images of instance with the uploaded ones.
+
+        An upload with the content of an image instance already has keeps
+        that row, with its file and variants. Images left unused are
+        deleted.
+        """
+        auth_user = self.context['request'].user
+        current = {}
+        for image in instance.images.all():
+            current.setdefault(image.content_hash, []).append(image)
+
+        kept = []
+        for image in images:
+            same = current.get(content_hash(image['image']))
+            if same:
+                kept.append(same.pop())
+            else:
+                kept.append(SmartphoneImage.objects.create(
+                    user = auth_user,
+                    image = image['image'],
+                ))
+
+        instance.images.set(kept)
+        delete_detached_images([
+            image.pk for same in current.values() for image in same
+        ])
 
     def create(self, validated_data):
         """Create and return a new smartphone"""
@@ -82,22 +326,50 @@ class SmartphoneSerializer(serializers.ModelSerializer):
         images = validated_data.pop('images', None)
 
         if tags is not None:
-            instance.tags.clear()
             self._get_or_create_tags(tags, instance)
 
         if images is not None:
-            instance.images.clear()
-            # Make function
-            auth_user = self.context['request'].user
-            for image in images:
-                new_smartphone_image = SmartphoneImage.objects.create(
-                    user = auth_user,
-                    image = image
-                )
-                instance.images.add(new_smartphone_image)
+            self._set_images(images, instance)
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
 
         instance.save()
         return instance
+
+class VideoUploadSerializer(serializers.ModelSerializer):
+    """Serializer for resumable video uploads"""
+
+    class Meta:
+        model = VideoUpload
+        fields = ('id', 'filename', 'size', 'offset', )
+        read_only_fields = ('id', 'offset', )
+
+    def validate_size(self, value):
+        """Reject empty videos and videos above the upload limit"""
+        if not 0 < value <= settings.VIDEO_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f'Must be between 1 and {settings.VIDEO_UPLOAD_MAX_SIZE} bytes.'
+            )
+
+        return value
+
+class SmartphoneBulkDeleteSerializer(serializers.Serializer):
+    """Serializer for deleting many smartphones"""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+    )
+
+class SuggestSerializer(serializers.Serializer):
+    """Serializer for typeahead suggestions"""
+
+    smartphones = serializers.ListField(child=serializers.CharField())
+    tags = serializers.ListField(child=serializers.CharField())
+
+class CacheStatsSerializer(serializers.Serializer):
+    """Serializer for response cache counters"""
+
+    hits = serializers.IntegerField()
+    misses = serializers.IntegerField()
@@ -0,0 +1,87 @@
+"""
+Signal handlers for smartphone APIs
+"""
+from django.db.models.signals import (
+  pre_save,
+  post_save,
+  post_delete,
+  m2m_changed,
+)
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import (
+  Smartphone,
+  Tag,
+  SmartphoneImage,
+  ProcessingStatus
+)
+from core import images
+from smartphone import cache, tasks
+
+@receiver(post_save, sender=Smartphone)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=SmartphoneImage)
+@receiver(post_delete, sender=Smartphone)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=SmartphoneImage)
+def invalidate_on_change(sender, **kwargs):
+  """Drop cached responses when a catalog object changes"""
+  cache.invalidate()
+
+@receiver(m2m_changed, sender=Smartphone.tags.through)
+@receiver(m2m_changed, sender=Smartphone.images.through)
+def invalidate_on_relation_change(sender, action, **kwargs):
+  """Drop cached responses when smartphone tags or images change"""
+  if action.startswith('post_'):
+    cache.invalidate()
+
+@receiver(m2m_changed, sender=Smartphone.tags.through)
+@receiver(m2m_changed, sender=Smartphone.images.through)
+def touch_on_relation_change(sender, instance, action, reverse, pk_set, **kwargs):
+  """Bump updated_at on smartphones whose tags or images changed"""
+  if action not in ('post_add', 'post_remove', 'post_clear'):
+    return
+
+  if not reverse:
+    smartphones = Smartphone.objects.filter(pk = instance.pk)
+  elif pk_set:
+    smartphones = Smartphone.objects.filter(pk__in = pk_set)
+  else:
+    return
+
+  smartphones.update(updated_at = timezone.now())
+
+@receiver(pre_save, sender=SmartphoneImage)
+def prepare_image(sender, instance, **kwargs):
+  """Deduplicate a newly uploaded image file and flag it for processing"""
+  if instance.image and not instance.image._committed:
+    instance.processing_status = ProcessingStatus.PENDING
+    images.deduplicate(instance)
+
+@receiver(post_delete, sender=SmartphoneImage)
+def release_image_file(sender, instance, **kwargs):
+  """Delete the stored file once the last image using it is gone"""
+  if instance.image:
+    transaction.on_commit(lambda: images.release(instance))
+
+@receiver(pre_save, sender=Smartphone)
+def mark_video_pending(sender, instance, **kwargs):
+  """Flag a newly uploaded video file for processing"""
+  if instance.video and not instance.video._committed:
+    instance.video_status = ProcessingStatus.PENDING
+  elif not instance.video:
+    instance.video_status = ''
+
+@receiver(post_save, sender=SmartphoneImage)
+def enqueue_image_processing(sender, instance, **kwargs):
+  """Queue the processing of a pending image"""
+  if instance.processing_status == ProcessingStatus.PENDING:
+    tasks.process_smartphone_image.enqueue(image_id = instance.pk)
+
+@receiver(post_save, sender=Smartphone)
+def enqueue_video_processing(sender, instance, **kwargs):
+  """Queue the processing of a pending video"""
+  if instance.video_status == ProcessingStatus.PENDING:
+    tasks.process_smartphone_video.enqueue(smartphone_id = instance.pk)
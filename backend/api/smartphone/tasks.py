@@ -0,0 +1,69 @@
+"""
+Background tasks for smartphone uploads
+"""
+from django.utils import timezone
+
+from core.images import process_image
+from core.models import (
+  Smartphone,
+  SmartphoneImage,
+  ProcessingStatus
+)
+from core.tasks import task
+from smartphone import cache
+
+def _image_failed(image_id):
+  """Flag an image whose processing gave up"""
+  SmartphoneImage.objects.filter(pk = image_id).update(
+    processing_status = ProcessingStatus.FAILED,
+    updated_at = timezone.now(),
+  )
+  cache.invalidate()
+
+def _video_failed(smartphone_id):
+  """Flag a video whose processing gave up"""
+  Smartphone.objects.filter(pk = smartphone_id).update(
+    video_status = ProcessingStatus.FAILED,
+    updated_at = timezone.now(),
+  )
+  cache.invalidate()
+
+@task('smartphone.process_image', on_failure=_image_failed)
+def process_smartphone_image(image_id):
+  """Generate the responsive variants of an uploaded image"""
+  images = SmartphoneImage.objects.filter(pk = image_id)
+  image = images.first()
+  if image is None:
+    return
+
+  images.update(processing_status = ProcessingStatus.PROCESSING)
+  variants = process_image(image)
+
+  images.update(
+    variants = variants,
+    processing_status = (
+      ProcessingStatus.READY if variants else ProcessingStatus.FAILED
+    ),
+    updated_at = timezone.now(),
+  )
+  cache.invalidate()
+
+@task('smartphone.process_video', on_failure=_video_failed)
+def process_smartphone_video(smartphone_id):
+  """Check an uploaded video landed in storage before serving it"""
+  smartphones = Smartphone.objects.filter(pk = smartphone_id)
+  smartphone = smartphones.first()
+  if smartphone is None or not smartphone.video:
+    return
+
+  smartphones.update(video_status = ProcessingStatus.PROCESSING)
+  video = smartphone.video
+  stored = video.storage.exists(video.name) and video.size > 0
+
+  smartphones.update(
+    video_status = (
+      ProcessingStatus.READY if stored else ProcessingStatus.FAILED
+    ),
+    updated_at = timezone.now(),
+  )
+  cache.invalidate()
@@ -0,0 +1,173 @@
+"""
+Tests for the async read views
+"""
+import json
+from decimal import Decimal
+from urllib.parse import parse_qs, urlparse
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, TestCase
+from django.urls import reverse
+
+from core.models import (
+  Smartphone,
+  Tag
+)
+from smartphone.async_views import (
+  async_read_view,
+  read_smartphone_detail,
+  read_smartphone_list,
+  read_suggest,
+  read_tag_list,
+)
+
+SMARTPHONE_URLS = reverse('smartphone:smartphone-list')
+TAGS_URL = reverse('smartphone:tag-list')
+SUGGEST_URL = reverse('smartphone:suggest')
+
+def detail_url(smartphone_id):
+  """Create and return a smartphone detail URL"""
+  return reverse('smartphone:smartphone-detail', args=[smartphone_id])
+
+def cursor_of(link):
+  """Return the cursor query param of a pagination link"""
+  return parse_qs(urlparse(link).query)['cursor'][0]
+
+def not_delegated(request, *args, **kwargs):
+  """Stand in for the DRF view where the async read must answer"""
+  raise AssertionError('Request was delegated to the DRF view')
+
+class AsyncReadViewTests(TestCase):
+  """Test the async reads answer exactly like the DRF views"""
+
+  def setUp(self):
+    cache.clear()
+    self.factory = AsyncRequestFactory()
+    user = get_user_model().objects.create_user(
+      email = 'async@example.com',
+      password = 'test123456',
+    )
+    tag = Tag.objects.create(user = user, name = 'Android')
+    self.smartphones = []
+    for number in range(3):
+      smartphone = Smartphone.objects.create(
+        user = user,
+        name = f'Phone {number}',
+        price = Decimal('100.00'),
+      )
+      smartphone.tags.add(tag)
+      self.smartphones.append(smartphone)
+
+  async def assertSameAsDRF(self, read, path, data = None, **kwargs):
+    """Assert read answers path like the DRF view, returning its body"""
+    view = async_read_view(read, not_delegated)
+    response = await view(self.factory.get(path, data), **kwargs)
+    cache.clear()
+    expected = await self.async_client.get(path, data)
+
+    self.assertEqual(response.status_code, expected.status_code)
+    body = json.loads(response.content)
+    self.assertEqual(body, json.loads(expected.content))
+
+    return body
+
+  async def test_list_pages(self):
+    """Test the first and following pages match"""
+    body = await self.assertSameAsDRF(
+      read_smartphone_list,
+      SMARTPHONE_URLS,
+      {'page_size': 2},
+    )
+    self.assertEqual(len(body['results']), 2)
+
+    body = await self.assertSameAsDRF(
+      read_smartphone_list,
+      SMARTPHONE_URLS,
+      {'page_size': 2, 'cursor': cursor_of(body['next'])},
+    )
+    self.assertEqual(len(body['results']), 1)
+    self.assertIsNotNone(body['previous'])
+
+  async def test_list_filtered_by_tags(self):
+    """Test tag filters match"""
+    tag = await Tag.objects.afirst()
+
+    await self.assertSameAsDRF(
+      read_smartphone_list,
+      SMARTPHONE_URLS,
+      {'tags': str(tag.id), 'tags_mode': 'all'},
+    )
+
+  async def test_previous_page_left_to_drf(self):
+    """Test reverse cursors are declined"""
+    body = json.loads((await self.async_client.get(
+      SMARTPHONE_URLS,
+      {'page_size': 2},
+    )).content)
+    next_page = json.loads((await self.async_client.get(body['next'])).content)
+    response = await read_smartphone_list(self.factory.get(
+      SMARTPHONE_URLS,
+      {'cursor': cursor_of(next_page['previous'])},
+    ))
+
+    self.assertIsNone(response)
+
+  async def test_detail(self):
+    """Test a smartphone and a missing one match"""
+    smartphone = self.smartphones[0]
+
+    await self.assertSameAsDRF(
+      read_smartphone_detail,
+      detail_url(smartphone.id),
+      pk = str(smartphone.id),
+    )
+    await self.assertSameAsDRF(
+      read_smartphone_detail,
+      detail_url(0),
+      pk = '0',
+    )
+
+  async def test_tag_list(self):
+    """Test the tag list matches"""
+    await self.assertSameAsDRF(read_tag_list, TAGS_URL)
+
+  async def test_suggest(self):
+    """Test suggestions match"""
+    await self.assertSameAsDRF(read_suggest, SUGGEST_URL, {'prefix': 'pho'})
+
+  async def test_conditional_get(self):
+    """Test a current ETag is answered with 304"""
+    view = async_read_view(read_smartphone_list, not_delegated)
+    response = await view(self.factory.get(SMARTPHONE_URLS))
+
+    response = await view(self.factory.get(
+      SMARTPHONE_URLS,
+      headers = {'If-None-Match': response['ETag']},
+    ))
+
+    self.assertEqual(response.status_code, 304)
+
+  async def test_other_requests_delegated(self):
+    """Test authenticated, non-JSON and write requests reach DRF"""
+    view = async_read_view(
+      read_tag_list,
+      lambda request: HttpResponse(b'drf'),
+    )
+    requests = [
+      self.factory.get(TAGS_URL, headers = {'Authorization': 'Token x'}),
+      self.factory.get(TAGS_URL, headers = {'Accept': 'text/html'}),
+      self.factory.get(TAGS_URL, {'unknown': '1'}),
+      self.factory.post(TAGS_URL, {'name': 'iOS'}),
+    ]
+
+    for request in requests:
+      response = await view(request)
+      self.assertEqual(response.content, b'drf')
+
+    response = await view(self.factory.get(TAGS_URL))
+    self.assertEqual(json.loads(response.content), [{
+      'id': (await Tag.objects.aget()).id,
+      'name': 'Android',
+    }])
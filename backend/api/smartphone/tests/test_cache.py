@@ -0,0 +1,205 @@
+"""
+Tests for the response cache
+"""
+import shutil
+import tempfile
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.urls import reverse
+from django.test import RequestFactory, TestCase, override_settings
+
+from rest_framework import status # type: ignore
+from rest_framework.response import Response # type: ignore
+from rest_framework.test import APIClient # type: ignore
+
+from core.models import (
+  Smartphone,
+  Tag
+)
+from core.routers import ReplicaRouter, replica_reads
+from smartphone import cache as response_cache
+
+SMARTPHONE_URLS = reverse('smartphone:smartphone-list')
+TAGS_URL = reverse('smartphone:tag-list')
+CACHE_STATS_URL = reverse('smartphone:cache-stats')
+CACHE_DIR = tempfile.mkdtemp()
+SHARED_CACHES = {
+  'default': {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': CACHE_DIR,
+  },
+}
+
+def create_user(email = 'test6@example.com', password = 'test123456'):
+  """Create a user"""
+  return get_user_model().objects.create_user(
+    email = email,
+    password = password
+  )
+
+def create_smartphone(user, name = 'Sample Smartphone'):
+  """Create and return a sample smartphone"""
+  return Smartphone.objects.create(
+    user = user,
+    name = name,
+    price = Decimal('100.00')
+  )
+
+class PublicResponseCacheTests(TestCase):
+  """Test caching of anonymous read requests"""
+
+  def setUp(self):
+    self.client = APIClient()
+    self.user = create_user()
+    cache.clear()
+
+  def test_list_served_from_cache(self):
+    """Test a repeated list request does not hit the database"""
+    create_smartphone(self.user)
+
+    res = self.client.get(SMARTPHONE_URLS)
+    self.assertEqual(res['X-Cache'], 'MISS')
+
+    with self.assertNumQueries(0):
+      cached = self.client.get(SMARTPHONE_URLS)
+
+    self.assertEqual(cached.status_code, status.HTTP_200_OK)
+    self.assertEqual(cached['X-Cache'], 'HIT')
+    self.assertEqual(cached.data, res.data)
+
+  def test_cached_response_not_modified(self):
+    """Test a cached response answers conditional requests"""
+    create_smartphone(self.user)
+    etag = self.client.get(SMARTPHONE_URLS)['ETag']
+
+    with self.assertNumQueries(0):
+      res = self.client.get(SMARTPHONE_URLS, HTTP_IF_NONE_MATCH=etag)
+
+    self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+    self.assertEqual(res['ETag'], etag)
+
+  def test_query_params_cached_separately(self):
+    """Test requests with different query params do not share entries"""
+    tag = Tag.objects.create(user = self.user, name = 'tag1')
+    create_smartphone(self.user)
+
+    self.client.get(SMARTPHONE_URLS)
+    res = self.client.get(SMARTPHONE_URLS, {'tags': f'{tag.id}'})
+
+    self.assertEqual(res['X-Cache'], 'MISS')
+    self.assertEqual(res.data['results'], [])
+
+  def test_invalidated_on_save(self):
+    """Test saving a smartphone invalidates cached responses"""
+    smartphone = create_smartphone(self.user)
+    self.client.get(SMARTPHONE_URLS)
+
+    smartphone.name = 'Renamed'
+    smartphone.save()
+    res = self.client.get(SMARTPHONE_URLS)
+
+    self.assertEqual(res['X-Cache'], 'MISS')
+    self.assertEqual(res.data['results'][0]['name'], 'Renamed')
+
+  def test_invalidated_on_tags_changed(self):
+    """Test changing smartphone tags invalidates cached responses"""
+    smartphone = create_smartphone(self.user)
+    self.client.get(SMARTPHONE_URLS)
+
+    smartphone.tags.add(Tag.objects.create(user = self.user, name = 'tag1'))
+    res = self.client.get(SMARTPHONE_URLS)
+
+    self.assertEqual(res['X-Cache'], 'MISS')
+    self.assertEqual(len(res.data['results'][0]['tags']), 1)
+
+  def test_invalidated_on_delete(self):
+    """Test deleting a tag invalidates cached responses"""
+    tag = Tag.objects.create(user = self.user, name = 'tag1')
+    self.client.get(TAGS_URL)
+
+    tag.delete()
+    res = self.client.get(TAGS_URL)
+
+    self.assertEqual(res['X-Cache'], 'MISS')
+    self.assertEqual(res.data, [])
+
+  def test_authenticated_requests_not_cached(self):
+    """Test authenticated requests bypass the cache"""
+    self.client.force_authenticate(self.user)
+
+    self.client.get(SMARTPHONE_URLS)
+    res = self.client.get(SMARTPHONE_URLS)
+
+    self.assertNotIn('X-Cache', res)
+
+  def test_cache_stats(self):
+    """Test hits and misses are counted"""
+    admin = get_user_model().objects.create_superuser(
+      'admin@example.com',
+      'test123456',
+    )
+    self.client.get(SMARTPHONE_URLS)
+    self.client.get(SMARTPHONE_URLS)
+    self.client.get(SMARTPHONE_URLS)
+
+    self.client.force_authenticate(admin)
+    res = self.client.get(CACHE_STATS_URL)
+
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+    self.assertEqual(res.data, {'hits': 2, 'misses': 1})
+
+  @override_settings(REPLICA_DATABASES = ['replica_1'])
+  def test_miss_after_write_reads_primary(self):
+    """Test a lagging replica cannot refill the cache after a write"""
+    routed = []
+
+    def get_response():
+      routed.append(ReplicaRouter().db_for_read(Smartphone))
+      return Response({})
+
+    def get(path):
+      request = RequestFactory().get(path)
+      request.user = AnonymousUser()
+      with replica_reads():
+        response_cache.cached_response(request, get_response)
+
+    get('/before/')
+    response_cache.invalidate()
+    get('/after/')
+
+    self.assertEqual(routed, ['replica_1', None])
+
+  def test_cache_stats_requires_admin(self):
+    """Test the cache counters are not public"""
+    res = self.client.get(CACHE_STATS_URL)
+
+    self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+@override_settings(CACHES = SHARED_CACHES)
+class FileBasedResponseCacheTests(TestCase):
+  """Test the response cache on the file-based backend"""
+
+  @classmethod
+  def tearDownClass(cls):
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+    super().tearDownClass()
+
+  def setUp(self):
+    self.client = APIClient()
+    cache.clear()
+
+  def test_served_and_invalidated(self):
+    """Test responses are cached and invalidated through files"""
+    smartphone = create_smartphone(create_user())
+
+    self.client.get(SMARTPHONE_URLS)
+    res = self.client.get(SMARTPHONE_URLS)
+    self.assertEqual(res['X-Cache'], 'HIT')
+
+    smartphone.delete()
+    res = self.client.get(SMARTPHONE_URLS)
+    self.assertEqual(res['X-Cache'], 'MISS')
+    self.assertEqual(res.data['results'], [])
@@ -0,0 +1,142 @@
+"""
+Tests for serving media files
+"""
+import shutil
+import tempfile
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.urls import reverse
+from django.test import TestCase, override_settings
+
+from rest_framework import status # type: ignore
+from rest_framework.test import APIClient # type: ignore
+
+from core.models import (
+  Smartphone,
+  SmartphoneImage
+)
+
+MEDIA_ROOT = tempfile.mkdtemp()
+VIDEO_CONTENT = b'0123456789'
+
+def media_url(name):
+  """Return the URL of a media file"""
+  return reverse('media', args=[name])
+
+def create_user(email = 'test9@example.com', password = 'test123456'):
+  """Create a user"""
+  return get_user_model().objects.create_user(
+    email = email,
+    password = password
+  )
+
+def create_smartphone(user, **params):
+  """Create and return a sample smartphone"""
+  defaults = {
+    'name': 'Sample Smartphone',
+    'price': Decimal('100.00'),
+  }
+  defaults.update(params)
+
+  return Smartphone.objects.create(user=user, **defaults)
+
+def content(response):
+  """Return the body of a regular or streaming response"""
+  return b''.join(response.streaming_content)
+
+@override_settings(MEDIA_ROOT = MEDIA_ROOT, MEDIA_ACCEL_REDIRECT = False)
+class MediaApiTests(TestCase):
+  """Test media downloads"""
+
+  @classmethod
+  def tearDownClass(cls):
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+    super().tearDownClass()
+
+  def setUp(self):
+    self.user = create_user()
+    self.client = APIClient()
+    self.smartphone = create_smartphone(self.user)
+    self.smartphone.video.save('video.mp4', ContentFile(VIDEO_CONTENT))
+    self.name = self.smartphone.video.name
+    Smartphone.objects.filter(pk = self.smartphone.pk).update(
+      video_status = 'ready',
+    )
+
+  def test_serve_whole_file(self):
+    """Test a public video is sent with Range support advertised"""
+    res = self.client.get(media_url(self.name), HTTP_ACCEPT='video/*')
+
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+    self.assertEqual(res['Accept-Ranges'], 'bytes')
+    self.assertEqual(res['Content-Type'], 'video/mp4')
+    self.assertEqual(content(res), VIDEO_CONTENT)
+
+  def test_serve_range(self):
+    """Test a byte range is answered with 206 Partial Content"""
+    res = self.client.get(media_url(self.name), HTTP_RANGE='bytes=2-5')
+
+    self.assertEqual(res.status_code, status.HTTP_206_PARTIAL_CONTENT)
+    self.assertEqual(res['Content-Range'], 'bytes 2-5/10')
+    self.assertEqual(res['Content-Length'], '4')
+    self.assertEqual(content(res), b'2345')
+
+  def test_serve_suffix_range(self):
+    """Test a suffix range returns the end of the file"""
+    res = self.client.get(media_url(self.name), HTTP_RANGE='bytes=-3')
+
+    self.assertEqual(res.status_code, status.HTTP_206_PARTIAL_CONTENT)
+    self.assertEqual(content(res), b'789')
+
+  def test_unsatisfiable_range(self):
+    """Test a range past the end of the file is rejected"""
+    res = self.client.get(media_url(self.name), HTTP_RANGE='bytes=20-')
+
+    self.assertEqual(
+      res.status_code,
+      status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+    )
+    self.assertEqual(res['Content-Range'], 'bytes */10')
+
+  def test_pending_video_only_for_owner(self):
+    """Test unprocessed videos are hidden from everyone but the owner"""
+    Smartphone.objects.filter(pk = self.smartphone.pk).update(
+      video_status = 'pending',
+    )
+
+    res = self.client.get(media_url(self.name))
+    self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    self.client.force_authenticate(self.user)
+    res = self.client.get(media_url(self.name))
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+  def test_unreferenced_file_not_served(self):
+    """Test files not attached to the catalog are not served"""
+    res = self.client.get(media_url('uploads/tmp/upload.part'))
+    self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    res = self.client.get(media_url('../etc/passwd'))
+    self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+  def test_image_is_public(self):
+    """Test catalog images are served to anonymous users"""
+    image = SmartphoneImage.objects.create(
+      user = self.user,
+      image = ContentFile(b'image', name = 'image.jpg'),
+    )
+
+    res = self.client.get(media_url(image.image.name))
+
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+  @override_settings(MEDIA_ACCEL_REDIRECT = True)
+  def test_accel_redirect(self):
+    """Test nginx is asked to send the file when enabled"""
+    res = self.client.get(media_url(self.name), HTTP_RANGE='bytes=2-5')
+
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+    self.assertEqual(res['X-Accel-Redirect'], f'/protected-media/{self.name}')
+    self.assertEqual(res.content, b'')
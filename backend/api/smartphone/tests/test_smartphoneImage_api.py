@@ -15,6 +15,7 @@ from rest_framework import status # type: ignore
 from rest_framework.test import APIClient # type: ignore
 
 from core.models import SmartphoneImage
+from core.tasks import run_pending
 
 from smartphone.serializers import SmartphoneImageSerializer
 
@@ -72,7 +73,7 @@ class PrivateSmartphoneImagesApiTests(TestCase):
     serializer = SmartphoneImageSerializer(images, many=True)
 
     self.assertEqual(res.status_code, status.HTTP_200_OK)
-    self.assertEqual(len(res.data), len(serializer.data))
+    self.assertEqual(len(res.data['results']), len(serializer.data))
 
   def test_update_smartphone_image(self):
     """Test updating a smartphone image"""
@@ -106,4 +107,58 @@ class PrivateSmartphoneImagesApiTests(TestCase):
 
     self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
     smartphone_images = SmartphoneImage.objects.filter(user = self.user)
-    self.assertFalse(smartphone_images.exists())
\ No newline at end of file
+    self.assertFalse(smartphone_images.exists())
+
+  def test_invalid_image_has_no_variants(self):
+    """Test files Pillow cannot read are stored without variants"""
+    smartphone_image = SmartphoneImage.objects.create(
+      user = self.user,
+      image = create_smartphone_image('test5.jpg')
+    )
+    run_pending()
+
+    smartphone_image.refresh_from_db()
+    self.assertEqual(smartphone_image.variants, [])
+    self.assertEqual(smartphone_image.processing_status, 'failed')
+
+
+  def test_identical_uploads_share_file(self):
+    """Test identical bytes are stored once and reused by reference"""
+    first = SmartphoneImage.objects.create(
+      user = self.user,
+      image = create_smartphone_image('front.jpg')
+    )
+    SmartphoneImage.objects.filter(pk = first.pk).update(
+      processing_status = 'ready',
+      variants = [{'name': 'variant.jpg'}],
+    )
+
+    second = SmartphoneImage.objects.create(
+      user = self.user,
+      image = create_smartphone_image('copy.jpg')
+    )
+
+    self.assertEqual(first.content_hash, second.content_hash)
+    self.assertEqual(first.image.name, second.image.name)
+    self.assertEqual(second.processing_status, 'ready')
+    self.assertEqual(second.variants, [{'name': 'variant.jpg'}])
+
+  def test_shared_file_removed_with_last_reference(self):
+    """Test a shared file is only deleted with the last image using it"""
+    first = SmartphoneImage.objects.create(
+      user = self.user,
+      image = create_smartphone_image('front.jpg')
+    )
+    second = SmartphoneImage.objects.create(
+      user = self.user,
+      image = create_smartphone_image('copy.jpg')
+    )
+    path = first.image.path
+
+    with self.captureOnCommitCallbacks(execute=True):
+      first.delete()
+    self.assertTrue(os.path.exists(path))
+
+    with self.captureOnCommitCallbacks(execute=True):
+      second.delete()
+    self.assertFalse(os.path.exists(path))
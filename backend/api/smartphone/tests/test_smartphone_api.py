@@ -3,19 +3,30 @@ Tests for smartphone APIs
 """
 
 from decimal import Decimal
+import hashlib
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+import shutil
 import tempfile
+import time
 import os
 
 from PIL import Image # type: ignore
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.http import http_date
 from django.core.files.uploadedfile import SimpleUploadedFile
 
 from rest_framework import status # type: ignore
 from rest_framework.test import APIClient # type: ignore
+from rest_framework.utils import encoders # type: ignore
 
+from core.loadtest import jpeg
 from core.models import (
   Smartphone,
   Tag,
@@ -25,6 +36,8 @@ from core.models import (
 from smartphone.serializers import (
   SmartphoneSerializer
 )
+from smartphone.pagination import IdCursorPagination
+from core.tasks import run_pending
 
 SMARTPHONE_URLS = reverse('smartphone:smartphone-list')
 SMARTPHONE_IMAGES_URL = reverse('smartphone:smartphoneimage-list')
@@ -88,7 +101,36 @@ class PrivateSmartphoneApiTests(TestCase):
     serializer = SmartphoneSerializer(smartphones, many=True)
 
     self.assertEqual(res.status_code, status.HTTP_200_OK)
-    self.assertEqual(res.data, serializer.data)
+    self.assertEqual(res.data['results'], serializer.data)
+
+  def test_list_smartphones_paginated_by_cursor(self):
+    """Test following cursor links walks every smartphone once"""
+    smartphones = [create_smartphone(user=self.user) for _ in range(5)]
+
+    res = self.client.get(SMARTPHONE_URLS, {'page_size': 2})
+
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+    self.assertIsNone(res.data['previous'])
+
+    ids = [item['id'] for item in res.data['results']]
+    while res.data['next']:
+      res = self.client.get(res.data['next'])
+      ids.extend(item['id'] for item in res.data['results'])
+
+    expected = sorted((s.id for s in smartphones), reverse=True)
+    self.assertEqual(ids, expected)
+
+  def test_list_smartphones_page_size_capped(self):
+    """Test the requested page size is capped by the max page size"""
+    for _ in range(3):
+      create_smartphone(user=self.user)
+
+    with patch.object(IdCursorPagination, 'max_page_size', 2):
+      res = self.client.get(SMARTPHONE_URLS, {'page_size': 50})
+
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+    self.assertEqual(len(res.data['results']), 2)
+    self.assertIsNotNone(res.data['next'])
 
   # def test_smartphone_list_limited_to_user(self):
   #   """Test that smartphones for the authenticated user are returned"""
@@ -108,6 +150,155 @@ class PrivateSmartphoneApiTests(TestCase):
   #   self.assertEqual(res.status_code, status.HTTP_200_OK)
   #   self.assertEqual(res.data, serializer.data)
 
+  def test_list_smartphones_query_count_constant(self):
+    """Test listing smartphones does not run a query per row"""
+
+    def populate(count):
+      tag = Tag.objects.create(user=self.user, name=f'tag{count}')
+      for index in range(count):
+        smartphone = create_smartphone(user=self.user)
+        smartphone.tags.add(tag)
+        smartphone.images.add(SmartphoneImage.objects.create(
+          user = self.user,
+          image = create_smartphone_image(f'count{index}.jpg')
+        ))
+
+    populate(2)
+    with CaptureQueriesContext(connection) as few:
+      self.client.get(SMARTPHONE_URLS)
+
+    populate(8)
+    with CaptureQueriesContext(connection) as many:
+      res = self.client.get(SMARTPHONE_URLS)
+
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+    self.assertEqual(len(res.data['results']), 10)
+    self.assertEqual(len(few), len(many))
+
+  def test_retrieve_smartphone_not_modified(self):
+    """Test retrieving an unchanged smartphone with its ETag returns 304"""
+    smartphone = create_smartphone(user=self.user)
+    url = detail_url(smartphone.id)
+
+    res = self.client.get(url)
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+    self.assertIn('Last-Modified', res)
+
+    res = self.client.get(url, HTTP_IF_NONE_MATCH=res['ETag'])
+    self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+  def test_retrieve_smartphone_modified_after_tag_added(self):
+    """Test adding a tag changes the smartphone ETag"""
+    smartphone = create_smartphone(user=self.user)
+    url = detail_url(smartphone.id)
+    etag = self.client.get(url)['ETag']
+
+    smartphone.tags.add(Tag.objects.create(user=self.user, name='tag1'))
+    res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+    self.assertNotEqual(res['ETag'], etag)
+
+  def test_list_smartphones_not_modified(self):
+    """Test listing unchanged smartphones with the ETag returns 304"""
+    create_smartphone(user=self.user)
+    etag = self.client.get(SMARTPHONE_URLS)['ETag']
+
+    res = self.client.get(SMARTPHONE_URLS, HTTP_IF_NONE_MATCH=etag)
+    self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    create_smartphone(user=self.user)
+    res = self.client.get(SMARTPHONE_URLS, HTTP_IF_NONE_MATCH=etag)
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+  def test_list_smartphones_not_modified_without_aggregates(self):
+    """Test a current list is answered without reading the catalog tables"""
+    create_smartphone(user=self.user)
+    etag = self.client.get(SMARTPHONE_URLS)['ETag']
+
+    with CaptureQueriesContext(connection) as queries:
+      res = self.client.get(SMARTPHONE_URLS, HTTP_IF_NONE_MATCH=etag)
+
+    self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+    self.assertFalse([
+      query['sql'] for query in queries
+      if 'core_smartphone' in query['sql'] or 'core_tag' in query['sql']
+    ])
+
+  def test_list_smartphones_modified_after_tag_renamed(self):
+    """Test renaming a nested tag changes the list ETag"""
+    smartphone = create_smartphone(user=self.user)
+    tag = Tag.objects.create(user=self.user, name='tag1')
+    smartphone.tags.add(tag)
+    etag = self.client.get(SMARTPHONE_URLS)['ETag']
+
+    tag.name = 'tag2'
+    tag.save()
+    res = self.client.get(SMARTPHONE_URLS, HTTP_IF_NONE_MATCH=etag)
+
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+    self.assertEqual(res.data['results'][0]['tags'][0]['name'], 'tag2')
+
+  def test_list_smartphones_modified_after_delete(self):
+    """Test a list fetched before a delete is not reported current"""
+    smartphone = create_smartphone(user=self.user)
+    create_smartphone(user=self.user)
+
+    res = self.client.get(SMARTPHONE_URLS)
+    self.assertNotIn('Last-Modified', res)
+
+    smartphone.delete()
+    res = self.client.get(
+      SMARTPHONE_URLS,
+      HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60),
+    )
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+    self.assertEqual(len(res.data['results']), 1)
+
+  def test_retrieve_smartphone_invalid_id(self):
+    """Test a non-integer smartphone id returns 404"""
+    res = self.client.get(detail_url('abc'))
+
+    self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+  def test_stream_smartphones(self):
+    """Test staff can stream every smartphone as NDJSON"""
+    self.user.is_staff = True
+    self.user.save()
+    tag = Tag.objects.create(user=self.user, name='tag1')
+    for _ in range(3):
+      create_smartphone(user=self.user).tags.add(tag)
+
+    with patch.object(IdCursorPagination, 'page_size', 1):
+      res = self.client.get(SMARTPHONE_URLS, {'stream': '1'})
+      lines = b''.join(res.streaming_content).splitlines()
+
+    smartphones = Smartphone.objects.all().order_by('-id')
+    serializer = SmartphoneSerializer(smartphones, many=True)
+
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+    self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+    self.assertEqual([json.loads(line) for line in lines], json.loads(
+      json.dumps(serializer.data, cls=encoders.JSONEncoder)
+    ))
+
+  def test_stream_smartphones_by_accept_header(self):
+    """Test the NDJSON media type selects streaming"""
+    self.user.is_staff = True
+    self.user.save()
+    create_smartphone(user=self.user)
+
+    res = self.client.get(SMARTPHONE_URLS, HTTP_ACCEPT='application/x-ndjson')
+
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+    self.assertEqual(len(b''.join(res.streaming_content).splitlines()), 1)
+
+  def test_stream_smartphones_requires_staff(self):
+    """Test regular users cannot stream the full catalog"""
+    res = self.client.get(SMARTPHONE_URLS, {'stream': '1'})
+
+    self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
   def test_create_smartphone(self):
     """Test creating a new smartphone"""
     payload = {
@@ -285,6 +476,27 @@ class PrivateSmartphoneApiTests(TestCase):
       ).exists()
       self.assertTrue(exists)
 
+  def test_create_smartphone_tags_query_count_constant(self):
+    """Test resolving tags does not run queries per tag"""
+    Tag.objects.create(user=self.user, name='existing')
+
+    def create_with_tags(count):
+      payload = {
+        'name': 'Test Smartphone',
+        'price': Decimal('100.00'),
+        'tags': [{'name': 'existing'}] + [
+          {'name': f'tag{count}-{index}'} for index in range(count)
+        ],
+      }
+      with CaptureQueriesContext(connection) as queries:
+        res = self.client.post(SMARTPHONE_URLS, payload, format='json')
+      self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+      self.assertEqual(len(res.data['tags']), count + 1)
+      return len(queries)
+
+    self.assertEqual(create_with_tags(2), create_with_tags(20))
+    self.assertEqual(Tag.objects.filter(name='existing').count(), 1)
+
   def test_create_tag_on_update(self):
     """Test create tag when updating a smartphone"""
     smartphone = create_smartphone(user=self.user)
@@ -378,9 +590,81 @@ class PrivateSmartphoneApiTests(TestCase):
     s2 = SmartphoneSerializer(smartphone2)
     s3 = SmartphoneSerializer(smartphone3)
 
-    self.assertIn(s1.data, res.data)
-    self.assertIn(s2.data, res.data)
-    self.assertNotIn(s3.data, res.data)
+    self.assertIn(s1.data, res.data['results'])
+    self.assertIn(s2.data, res.data['results'])
+    self.assertNotIn(s3.data, res.data['results'])
+
+  def test_filter_by_tags_without_duplicates(self):
+    """Test a smartphone matching several tags is returned once"""
+    smartphone = create_smartphone(user = self.user)
+    tag1 = Tag.objects.create(user=self.user, name='tag1')
+    tag2 = Tag.objects.create(user=self.user, name='tag2')
+    smartphone.tags.add(tag1, tag2)
+
+    params = { 'tags': f'{tag1.id},{tag2.id}' }
+    res = self.client.get(SMARTPHONE_URLS, params)
+
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+    self.assertEqual(len(res.data['results']), 1)
+
+  def test_filter_by_all_tags(self):
+    """Test tags_mode=all only returns smartphones having every tag"""
+    tag1 = Tag.objects.create(user=self.user, name='tag1')
+    tag2 = Tag.objects.create(user=self.user, name='tag2')
+
+    smartphone1 = create_smartphone(user = self.user, name = 'Iphone 1')
+    smartphone1.tags.add(tag1, tag2)
+    smartphone2 = create_smartphone(user = self.user, name = 'Iphone 2')
+    smartphone2.tags.add(tag1)
+
+    params = { 'tags': f'{tag1.id},{tag2.id}', 'tags_mode': 'all' }
+    res = self.client.get(SMARTPHONE_URLS, params)
+
+    ids = [item['id'] for item in res.data['results']]
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+    self.assertEqual(ids, [smartphone1.id])
+
+  def test_filter_by_tags_invalid_mode(self):
+    """Test an unknown tags_mode returns an error"""
+    tag = Tag.objects.create(user=self.user, name='tag1')
+
+    params = { 'tags': f'{tag.id}', 'tags_mode': 'some' }
+    res = self.client.get(SMARTPHONE_URLS, params)
+
+    self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+  def test_search_smartphones(self):
+    """Test full-text search ranks name matches above description matches"""
+    by_description = create_smartphone(
+      user = self.user,
+      name = 'Pixel 8',
+      description = 'Great camera, better than a galaxy',
+    )
+    by_name = create_smartphone(user = self.user, name = 'Galaxy S24')
+    create_smartphone(user = self.user, name = 'Iphone 15')
+
+    res = self.client.get(SMARTPHONE_URLS, {'q': 'galaxy'})
+
+    ids = [item['id'] for item in res.data['results']]
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+    self.assertEqual(ids, [by_name.id, by_description.id])
+
+  def test_search_smartphones_paginated(self):
+    """Test following cursor links through ranked search results"""
+    smartphones = [
+      create_smartphone(user = self.user, name = f'Galaxy {index}')
+      for index in range(5)
+    ]
+    create_smartphone(user = self.user, name = 'Iphone 15')
+
+    res = self.client.get(SMARTPHONE_URLS, {'q': 'galaxy', 'page_size': 2})
+
+    ids = [item['id'] for item in res.data['results']]
+    while res.data['next']:
+      res = self.client.get(res.data['next'])
+      ids.extend(item['id'] for item in res.data['results'])
+
+    self.assertEqual(sorted(ids), sorted(s.id for s in smartphones))
 
   def test_create_smartphone_with_new_video(self):
     """Test creating a new smartphone with new video"""
@@ -412,4 +696,131 @@ class PrivateSmartphoneApiTests(TestCase):
       url = detail_url(smartphone.id)
       res = self.client.patch(url, payload, format='multipart')
 
-      self.assertEqual(res.status_code, status.HTTP_200_OK)
\ No newline at end of file
+      self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+  def test_upload_image_generates_variants(self):
+    """Test uploading an image stores responsive variants next to it"""
+    smartphone = create_smartphone(user=self.user)
+    url = image_upload_url(smartphone.id)
+
+    with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+      img = Image.new('RGB', (800, 600))
+      img.save(image_file, format='JPEG')
+      image_file.seek(0)
+      payload = {'image': image_file}
+      res = self.client.post(url, payload, format='multipart')
+
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+    self.assertEqual(res.data['processing_status'], 'pending')
+    self.assertEqual(res.data['variants'], [])
+
+    self.assertEqual(run_pending(), 1)
+
+    image = SmartphoneImage.objects.get(id=res.data['id'])
+    self.assertEqual(image.user, self.user)
+    self.assertEqual(image.processing_status, 'ready')
+    directory = os.path.dirname(image.image.path)
+    widths = sorted({variant['width'] for variant in image.variants})
+    formats = {variant['format'] for variant in image.variants}
+
+    self.assertEqual(widths, [320, 640])
+    self.assertTrue({'jpeg', 'webp'} <= formats)
+    for variant in image.variants:
+      path = image.image.storage.path(variant['name'])
+      self.assertEqual(os.path.dirname(path), directory)
+      self.assertTrue(os.path.exists(path))
+
+
+  def test_upload_video_is_processed_in_background(self):
+    """Test uploading a video queues its processing"""
+    smartphone = create_smartphone(user=self.user)
+
+    video_file = SimpleUploadedFile(
+      'video.mp4',
+      b'video_content',
+      content_type='video/mp4'
+    )
+    res = self.client.patch(
+      detail_url(smartphone.id),
+      {'video': video_file},
+      format='multipart',
+    )
+
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+    self.assertEqual(res.data['video_status'], 'pending')
+
+    self.assertEqual(run_pending(), 1)
+    smartphone.refresh_from_db()
+    self.assertEqual(smartphone.video_status, 'ready')
+
+class SmartphoneImagesUpdateTests(TestCase):
+  """Test replacing the images of a smartphone"""
+
+  def setUp(self):
+    media_root = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+    media = override_settings(MEDIA_ROOT = media_root)
+    media.enable()
+    self.addCleanup(media.disable)
+
+    self.user = create_user(
+      email = 'images@example.com',
+      password = 'test123456'
+    )
+    self.smartphone = create_smartphone(user=self.user)
+
+  def update_images(self, *seeds):
+    """Set the smartphone images to JPEGs generated from seeds"""
+    serializer = SmartphoneSerializer(
+      self.smartphone,
+      data = {
+        'images': [
+          {
+            'user': self.user.id,
+            'image': SimpleUploadedFile(
+              f'image{seed}.jpg',
+              jpeg(seed),
+              content_type='image/jpeg',
+            ),
+          }
+          for seed in seeds
+        ],
+      },
+      partial = True,
+      context = {'request': SimpleNamespace(user=self.user)},
+    )
+    self.assertTrue(serializer.is_valid(), serializer.errors)
+    with self.captureOnCommitCallbacks(execute=True):
+      serializer.save()
+
+    return {
+      image.content_hash: image for image in self.smartphone.images.all()
+    }
+
+  def test_unchanged_images_kept(self):
+    """Test re-sent images keep their rows and dropped ones are deleted"""
+    kept_hash = hashlib.sha256(jpeg(1)).hexdigest()
+    dropped_hash = hashlib.sha256(jpeg(2)).hexdigest()
+    before = self.update_images(1, 2)
+    dropped_path = before[dropped_hash].image.path
+
+    after = self.update_images(1, 3)
+
+    self.assertEqual(len(after), 2)
+    self.assertEqual(after[kept_hash].pk, before[kept_hash].pk)
+    self.assertNotIn(dropped_hash, after)
+    self.assertFalse(
+      SmartphoneImage.objects.filter(pk = before[dropped_hash].pk).exists()
+    )
+    self.assertFalse(os.path.exists(dropped_path))
+
+  def test_image_shared_with_other_smartphone_kept(self):
+    """Test an image another smartphone still uses is only detached"""
+    image = next(iter(self.update_images(1).values()))
+    create_smartphone(user=self.user).images.add(image)
+
+    self.update_images()
+
+    self.assertEqual(self.smartphone.images.count(), 0)
+    self.assertTrue(SmartphoneImage.objects.filter(pk = image.pk).exists())
+    self.assertTrue(os.path.exists(image.image.path))
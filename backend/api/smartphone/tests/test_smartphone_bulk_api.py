@@ -0,0 +1,148 @@
+"""
+Tests for the smartphone bulk API
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase
+
+from rest_framework import status # type: ignore
+from rest_framework.test import APIClient # type: ignore
+
+from core.models import (
+  Smartphone,
+  Tag
+)
+
+BULK_URL = reverse('smartphone:smartphone-bulk')
+
+def create_user(email = 'test7@example.com', password = 'test123456'):
+  """Create a user"""
+  return get_user_model().objects.create_user(
+    email = email,
+    password = password
+  )
+
+def create_smartphone(user, **params):
+  """Create and return a sample smartphone"""
+  defaults = {
+    'name': 'Sample Smartphone',
+    'price': Decimal('100.00'),
+  }
+  defaults.update(params)
+
+  return Smartphone.objects.create(user=user, **defaults)
+
+class PublicSmartphoneBulkApiTests(TestCase):
+  """Test unauthenticated API requests"""
+
+  def setUp(self):
+    self.client = APIClient()
+
+  def test_auth_required(self):
+    """Test authentication is required for bulk changes"""
+    res = self.client.post(BULK_URL, [], format='json')
+
+    self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+class PrivateSmartphoneBulkApiTests(TestCase):
+  """Test authenticated API requests"""
+
+  def setUp(self):
+    self.user = create_user()
+    self.client = APIClient()
+    self.client.force_authenticate(self.user)
+
+  def test_bulk_create(self):
+    """Test creating many smartphones with shared tags"""
+    existing = Tag.objects.create(user = self.user, name = 'android')
+    payload = [
+      {
+        'name': f'Phone {index}',
+        'price': '100.00',
+        'tags': [{'name': 'android'}, {'name': f'tag{index}'}],
+      }
+      for index in range(20)
+    ]
+
+    with self.assertNumQueries(7):
+      res = self.client.post(BULK_URL, payload, format='json')
+
+    self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+    self.assertEqual(len(res.data['ids']), 20)
+
+    smartphones = Smartphone.objects.filter(user = self.user)
+    self.assertEqual(smartphones.count(), 20)
+    self.assertEqual(Tag.objects.filter(name = 'android').count(), 1)
+    self.assertEqual(existing.smartphone_set.count(), 20)
+
+    smartphone = smartphones.get(name = 'Phone 3')
+    self.assertEqual(
+      sorted(smartphone.tags.values_list('name', flat=True)),
+      ['android', 'tag3'],
+    )
+
+  def test_bulk_create_reports_item_errors(self):
+    """Test invalid items are reported and nothing is created"""
+    payload = [
+      {'name': 'Phone 1', 'price': '100.00'},
+      {'name': 'Phone 2'},
+    ]
+
+    res = self.client.post(BULK_URL, payload, format='json')
+
+    self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+    self.assertNotIn(0, res.data)
+    self.assertIn('price', res.data[1])
+    self.assertFalse(Smartphone.objects.exists())
+
+  def test_bulk_update(self):
+    """Test updating many smartphones at once"""
+    smartphone1 = create_smartphone(self.user, name = 'Phone 1')
+    smartphone2 = create_smartphone(self.user, name = 'Phone 2')
+    smartphone2.tags.add(Tag.objects.create(user = self.user, name = 'old'))
+
+    payload = [
+      {'id': smartphone1.id, 'price': '150.00'},
+      {'id': smartphone2.id, 'tags': [{'name': 'new'}]},
+    ]
+    res = self.client.patch(BULK_URL, payload, format='json')
+
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+    smartphone1.refresh_from_db()
+    self.assertEqual(smartphone1.price, Decimal('150.00'))
+    self.assertEqual(smartphone1.name, 'Phone 1')
+    self.assertEqual(
+      list(smartphone2.tags.values_list('name', flat=True)),
+      ['new'],
+    )
+
+  def test_bulk_update_other_users_smartphone_error(self):
+    """Test smartphones of other users cannot be bulk updated"""
+    other = create_user(email = 'other7@example.com')
+    smartphone = create_smartphone(other, name = 'Phone 1')
+
+    payload = [{'id': smartphone.id, 'name': 'Mine'}]
+    res = self.client.patch(BULK_URL, payload, format='json')
+
+    self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+    self.assertIn('id', res.data[0])
+    smartphone.refresh_from_db()
+    self.assertEqual(smartphone.name, 'Phone 1')
+
+  def test_bulk_delete(self):
+    """Test deleting many smartphones owned by the user"""
+    other = create_user(email = 'other8@example.com')
+    smartphone1 = create_smartphone(self.user)
+    smartphone2 = create_smartphone(self.user)
+    foreign = create_smartphone(other)
+
+    payload = {'ids': [smartphone1.id, smartphone2.id, foreign.id]}
+    res = self.client.delete(BULK_URL, payload, format='json')
+
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+    self.assertEqual(res.data['deleted'], [smartphone1.id, smartphone2.id])
+    self.assertEqual(res.data['not_found'], [foreign.id])
+    self.assertFalse(Smartphone.objects.filter(user = self.user).exists())
+    self.assertTrue(Smartphone.objects.filter(id = foreign.id).exists())
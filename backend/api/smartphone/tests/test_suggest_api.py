@@ -0,0 +1,75 @@
+"""
+Tests for the suggest API
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from django.test import TestCase
+
+from rest_framework import status # type: ignore
+from rest_framework.test import APIClient # type: ignore
+
+from core.models import (
+  Smartphone,
+  Tag
+)
+
+SUGGEST_URL = reverse('smartphone:suggest')
+
+def create_user(email = 'test5@example.com', password = 'test123456'):
+  """Create a user"""
+  return get_user_model().objects.create_user(
+    email = email,
+    password = password
+  )
+
+def create_smartphone(user, name):
+  """Create and return a sample smartphone"""
+  return Smartphone.objects.create(
+    user = user,
+    name = name,
+    price = Decimal('100.00')
+  )
+
+class PublicSuggestApiTests(TestCase):
+  """Test unauthenticated API requests"""
+
+  def setUp(self):
+    self.client = APIClient()
+    self.user = create_user()
+    cache.clear()
+
+  def test_suggest_names(self):
+    """Test smartphone and tag names are matched by prefix"""
+    create_smartphone(self.user, 'Galaxy S24')
+    create_smartphone(self.user, 'Galaxy A15')
+    create_smartphone(self.user, 'Pixel 8')
+    Tag.objects.create(user = self.user, name = 'galaxy')
+    Tag.objects.create(user = self.user, name = 'android')
+
+    res = self.client.get(SUGGEST_URL, {'prefix': 'gal'})
+
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+    self.assertEqual(res.data['smartphones'], ['Galaxy A15', 'Galaxy S24'])
+    self.assertEqual(res.data['tags'], ['galaxy'])
+
+  def test_suggest_empty_prefix(self):
+    """Test an empty prefix returns no suggestions"""
+    create_smartphone(self.user, 'Galaxy S24')
+
+    res = self.client.get(SUGGEST_URL)
+
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+    self.assertEqual(res.data, {'smartphones': [], 'tags': []})
+
+  def test_suggest_cached_per_prefix(self):
+    """Test repeated prefixes are served from the cache"""
+    create_smartphone(self.user, 'Galaxy S24')
+    self.client.get(SUGGEST_URL, {'prefix': 'gal'})
+
+    with self.assertNumQueries(0):
+      res = self.client.get(SUGGEST_URL, {'prefix': 'GAL'})
+
+    self.assertEqual(res.data['smartphones'], ['Galaxy S24'])
@@ -33,6 +33,15 @@ class PublicTagsApiTests(TestCase):
   def setUp(self):
     self.client = APIClient()
 
+  def test_tag_detail_not_allowed(self):
+    """Test tags have no detail GET"""
+    user = create_user()
+    tag = Tag.objects.create(user = user, name = 'Test tag')
+
+    res = self.client.get(detail_url(tag.id))
+
+    self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
 class PrivateTagsApiTests(TestCase):
   """Test authenticated API requests"""
 
@@ -78,6 +87,15 @@ class PrivateTagsApiTests(TestCase):
     res = self.client.post(TAGS_URL, payload)
     self.assertEqual(res.status_code, status.HTTP_201_CREATED)
 
+  def test_create_duplicate_tag_error(self):
+    """Test creating a tag with an existing name returns an error"""
+    Tag.objects.create(user = self.user, name = 'Test tag 6')
+
+    res = self.client.post(TAGS_URL, {'name': 'Test tag 6'})
+
+    self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+    self.assertEqual(Tag.objects.filter(name = 'Test tag 6').count(), 1)
+
   def test_update_tag(self):
     """Test updating a tag"""
     tag = Tag.objects.create(user = self.user, name = 'Test tag 4')
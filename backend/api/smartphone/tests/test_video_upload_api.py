@@ -0,0 +1,185 @@
+"""
+Tests for the resumable video upload API
+"""
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase, override_settings
+
+from rest_framework import status # type: ignore
+from rest_framework.test import APIClient # type: ignore
+
+from core.models import (
+  Smartphone,
+  VideoUpload
+)
+
+MEDIA_ROOT = tempfile.mkdtemp()
+CHUNK_TYPE = 'application/offset+octet-stream'
+
+def start_url(smartphone_id):
+  """Return the URL starting a video upload"""
+  return reverse('smartphone:smartphone-upload-video', args=[smartphone_id])
+
+def upload_url(upload_id):
+  """Return the URL of a video upload"""
+  return reverse('smartphone:videoupload-detail', args=[upload_id])
+
+def finalize_url(upload_id):
+  """Return the URL finalizing a video upload"""
+  return reverse('smartphone:videoupload-finalize', args=[upload_id])
+
+def create_user(email = 'test8@example.com', password = 'test123456'):
+  """Create a user"""
+  return get_user_model().objects.create_user(
+    email = email,
+    password = password
+  )
+
+def create_smartphone(user, **params):
+  """Create and return a sample smartphone"""
+  defaults = {
+    'name': 'Sample Smartphone',
+    'price': Decimal('100.00'),
+  }
+  defaults.update(params)
+
+  return Smartphone.objects.create(user=user, **defaults)
+
+class PublicVideoUploadApiTests(TestCase):
+  """Test unauthenticated API requests"""
+
+  def setUp(self):
+    self.client = APIClient()
+
+  def test_auth_required(self):
+    """Test authentication is required to upload videos"""
+    user = create_user()
+    smartphone = create_smartphone(user)
+
+    res = self.client.post(
+      start_url(smartphone.id),
+      {'filename': 'video.mp4', 'size': 10},
+    )
+
+    self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+@override_settings(
+  MEDIA_ROOT = MEDIA_ROOT,
+  VIDEO_UPLOAD_TEMP_DIR = os.path.join(MEDIA_ROOT, 'uploads', 'tmp'),
+  VIDEO_UPLOAD_CHUNK_SIZE = 8,
+)
+class PrivateVideoUploadApiTests(TestCase):
+  """Test authenticated API requests"""
+
+  @classmethod
+  def tearDownClass(cls):
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+    super().tearDownClass()
+
+  def setUp(self):
+    self.user = create_user()
+    self.client = APIClient()
+    self.client.force_authenticate(self.user)
+    self.smartphone = create_smartphone(self.user)
+
+  def _start(self, content):
+    """Start an upload of content and return its id"""
+    res = self.client.post(
+      start_url(self.smartphone.id),
+      {'filename': 'video.mp4', 'size': len(content)},
+      format='json',
+    )
+    self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+    self.assertTrue(res['Location'].endswith(upload_url(res.data['id'])))
+
+    return res.data['id']
+
+  def _send(self, upload_id, offset, chunk):
+    """Send a chunk starting at offset"""
+    return self.client.patch(
+      upload_url(upload_id),
+      chunk,
+      content_type=CHUNK_TYPE,
+      HTTP_UPLOAD_OFFSET=str(offset),
+    )
+
+  def test_chunked_upload(self):
+    """Test a video sent in chunks becomes the smartphone video"""
+    content = b'0123456789abcdefghij'
+    upload_id = self._start(content)
+
+    for offset in range(0, len(content), 8):
+      res = self._send(upload_id, offset, content[offset:offset + 8])
+      self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+      self.assertEqual(
+        res['Upload-Offset'],
+        str(min(offset + 8, len(content))),
+      )
+
+    res = self.client.post(finalize_url(upload_id))
+
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+    self.assertEqual(res.data['video_status'], 'pending')
+    self.smartphone.refresh_from_db()
+    with self.smartphone.video.open('rb') as video:
+      self.assertEqual(video.read(), content)
+    self.assertFalse(VideoUpload.objects.exists())
+
+  def test_resume_reports_offset(self):
+    """Test the received offset is reported so the client can resume"""
+    content = b'0123456789'
+    upload_id = self._start(content)
+    self._send(upload_id, 0, content[:4])
+
+    res = self.client.head(upload_url(upload_id))
+
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+    self.assertEqual(res['Upload-Offset'], '4')
+    self.assertEqual(res['Upload-Length'], '10')
+
+    res = self._send(upload_id, 4, content[4:])
+    self.assertEqual(res['Upload-Offset'], '10')
+
+  def test_wrong_offset_conflicts(self):
+    """Test a chunk not starting at the received offset is rejected"""
+    upload_id = self._start(b'0123456789')
+    self._send(upload_id, 0, b'0123')
+
+    res = self._send(upload_id, 2, b'2345')
+
+    self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+    self.assertEqual(res['Upload-Offset'], '4')
+
+  def test_chunk_too_large(self):
+    """Test chunks above the configured size are rejected"""
+    upload_id = self._start(b'0123456789')
+
+    res = self._send(upload_id, 0, b'0123456789')
+
+    self.assertEqual(res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+  def test_finalize_incomplete_upload(self):
+    """Test an upload missing bytes cannot be finalized"""
+    upload_id = self._start(b'0123456789')
+    self._send(upload_id, 0, b'0123')
+
+    res = self.client.post(finalize_url(upload_id))
+
+    self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+    self.smartphone.refresh_from_db()
+    self.assertFalse(self.smartphone.video)
+
+  def test_other_user_upload_not_found(self):
+    """Test uploads of other users cannot be resumed"""
+    upload_id = self._start(b'0123456789')
+    other = create_user(email = 'other8@example.com')
+    self.client.force_authenticate(other)
+
+    res = self._send(upload_id, 0, b'0123')
+
+    self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
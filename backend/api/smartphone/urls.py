@@ -7,16 +7,29 @@ from django.urls import (
   include
 )
 
+from django.conf import settings
+
 from rest_framework.routers import DefaultRouter # type: ignore
 from smartphone import views
+from smartphone.async_views import with_async_reads
 
 router = DefaultRouter()
 router.register('smartphone', views.SmartphoneViewSet)
 router.register('tags', views.TagViewSet)
 router.register('smartphoneimage', views.SmartphoneImageViewSet)
+router.register('video-uploads', views.VideoUploadViewSet)
 
 app_name = 'smartphone'
 
+router_urls = router.urls
+
 urlpatterns = [
-    path('', include(router.urls))
+    path('suggest/', views.SuggestView.as_view(), name='suggest'),
+    path('cache-stats/', views.CacheStatsView.as_view(), name='cache-stats'),
 ]
+
+if settings.ASYNC_READ_VIEWS:
+    router_urls = with_async_reads(router_urls)
+    urlpatterns = with_async_reads(urlpatterns)
+
+urlpatterns.append(path('', include(router_urls)))
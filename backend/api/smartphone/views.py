@@ -3,6 +3,14 @@ Views for smartphone APIs
 """
 import json
 
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max, Prefetch
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+
 from drf_spectacular.utils import ( # type: ignore
   extend_schema_view,
   extend_schema,
@@ -16,18 +24,36 @@ from rest_framework import ( # type: ignore
 )
 
 from rest_framework.response import Response # type: ignore
+from rest_framework.views import APIView # type: ignore
+from rest_framework.negotiation import BaseContentNegotiation # type: ignore
 from rest_framework.decorators import action # type: ignore
-from rest_framework.authentication import TokenAuthentication # type: ignore
+from rest_framework.exceptions import PermissionDenied, ValidationError # type: ignore
+from rest_framework.settings import api_settings # type: ignore
 from rest_framework import generics # type: ignore
 
+from core import uploads
 from core.models import (
   Smartphone,
   Tag,
-  SmartphoneImage
+  SmartphoneImage,
+  VideoUpload,
+  ProcessingStatus
+)
+from smartphone import media, serializers
+from smartphone import cache as response_cache
+from smartphone.cache import CachedReadMixin, CachedRetrieveMixin
+from smartphone.conditional import ConditionalReadMixin
+from smartphone.pagination import IdCursorPagination
+from smartphone.renderers import NDJSONRenderer, to_ndjson_line
+from smartphone.filters import (
+  filter_by_tags,
+  search,
+  suggest_names,
+  TAGS_MODE_ANY,
+  TAGS_MODES,
 )
-from smartphone import serializers
 
-from rest_framework.permissions import BasePermission, IsAuthenticated, AllowAny # type: ignore
+from rest_framework.permissions import BasePermission, IsAuthenticated, IsAdminUser, AllowAny # type: ignore
 
 class CustomPermission(BasePermission):
   """
@@ -54,36 +80,139 @@ class CustomPermission(BasePermission):
         'tags',
         OpenApiTypes.STR,
         description = 'Comma separated list of IDs to filter'
-      )
+      ),
+      OpenApiParameter(
+        'tags_mode',
+        OpenApiTypes.STR,
+        enum = TAGS_MODES,
+        description = 'Match smartphones having any (default) or all of the tags'
+      ),
+      OpenApiParameter(
+        'stream',
+        OpenApiTypes.BOOL,
+        description = 'Stream every match as NDJSON instead of a page (staff only)'
+      ),
+      OpenApiParameter(
+        'q',
+        OpenApiTypes.STR,
+        description = 'Full-text search on name and description, ranked by relevance'
+      ),
     ]
   )
 )
-class SmartphoneViewSet(viewsets.ModelViewSet):
+class SmartphoneViewSet(
+  CachedReadMixin,
+  CachedRetrieveMixin,
+  ConditionalReadMixin,
+  viewsets.ModelViewSet
+):
   """Manage smartphones in the database"""
 
   serializer_class = serializers.SmartphoneSerializer
   queryset = Smartphone.objects.all()
-  authentication_classes = (TokenAuthentication,)
   permission_classes = [CustomPermission]
+  pagination_class = IdCursorPagination
+  renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
+  cursor_ordering = None
 
   def _params_to_ints(self, qs):
     """Convert a list of string IDs to a list of integers"""
     return [int(str_id) for str_id in qs.split(',')]
 
+  def _prefetch_related(self, queryset):
+    """Batch load the nested relations rendered by the serializer"""
+    return queryset.prefetch_related(
+      'tags',
+      Prefetch(
+        'images',
+        queryset = SmartphoneImage.objects.select_related('user'),
+      ),
+    )
+
+  def get_list_state(self):
+    """
+    Derive the list validators from the catalog version.
+
+    Any write to smartphones, tags or images bumps it, so lists are not
+    aggregated over the tables on every request.
+    """
+    return {'catalog': response_cache.catalog_version()}
+
+  def get_object_state(self):
+    """Include the nested tags and images in the detail validators"""
+    return Smartphone.objects.filter(pk = self.kwargs['pk']).aggregate(
+      updated_at = Max('updated_at'),
+      count = Count('pk', distinct=True),
+      tags_updated_at = Max('tags__updated_at'),
+      tags_count = Count('tags', distinct=True),
+      images_updated_at = Max('images__updated_at'),
+      images_count = Count('images', distinct=True),
+    )
+
   def get_queryset(self):
     """Retrieve Smartphone for authenticated users"""
     tags = self.request.query_params.get('tags')
+    text = self.request.query_params.get('q', '').strip()
 
     queryset = self.queryset
 
+    if self.action in ('list', 'retrieve'):
+      queryset = self._prefetch_related(queryset)
+
     if tags:
       tag_ids = self._params_to_ints(tags)
-      queryset = queryset.filter(tags__id__in = tag_ids)
+      tags_mode = self.request.query_params.get('tags_mode', TAGS_MODE_ANY)
+
+      if tags_mode not in TAGS_MODES:
+        raise ValidationError(
+          {'tags_mode': f'Must be one of: {", ".join(TAGS_MODES)}.'}
+        )
+
+      queryset = filter_by_tags(queryset, tag_ids, tags_mode)
 
     if self.request.method == 'DELETE':
       return queryset.filter(user = self.request.user).order_by('-id')
 
-    return queryset.all().order_by('-id').distinct()
+    if text and self.action == 'list':
+      self.cursor_ordering = ('-rank', '-id')
+      return search(queryset, text).order_by(*self.cursor_ordering)
+
+    return queryset.order_by('-id')
+
+  def _is_streaming(self):
+    """Return True if the client asked for a streamed list"""
+    return (
+      self.request.query_params.get('stream') in ('1', 'true')
+      or self.request.accepted_renderer.format == NDJSONRenderer.format
+    )
+
+  def _stream_list(self, queryset):
+    """
+    Stream the whole queryset as NDJSON, one smartphone per line.
+
+    Rows are fetched with a server-side cursor and relations are prefetched
+    per chunk, so worker memory stays flat regardless of the result size.
+    """
+    serializer_class = self.get_serializer_class()
+    context = self.get_serializer_context()
+    smartphones = queryset.iterator(chunk_size=settings.API_STREAM_CHUNK_SIZE)
+
+    lines = (
+      to_ndjson_line(serializer_class(smartphone, context=context).data)
+      for smartphone in smartphones
+    )
+
+    return StreamingHttpResponse(lines, content_type=NDJSONRenderer.media_type)
+
+  def list(self, request, *args, **kwargs):
+    """List smartphones, streaming the full result on request"""
+    if not self._is_streaming():
+      return super().list(request, *args, **kwargs)
+
+    if not request.user.is_staff:
+      raise PermissionDenied('Streaming the full catalog requires staff access.')
+
+    return self._stream_list(self.filter_queryset(self.get_queryset()))
 
   def get_serializer_class(self):
     """Return the serializer class for request"""
@@ -92,6 +221,8 @@ class SmartphoneViewSet(viewsets.ModelViewSet):
       return serializers.SmartphoneSerializer
     elif self.action =='upload_image':
       return serializers.SmartphoneImageSerializer
+    elif self.action == 'upload_video':
+      return serializers.VideoUploadSerializer
 
     return self.serializer_class
 
@@ -117,7 +248,82 @@ class SmartphoneViewSet(viewsets.ModelViewSet):
 
     return Response(serializer.errors,status=status.HTTP_400_BAD_REQUEST)
 
+  @action(detail=True, methods=['POST'], url_path = 'upload-video')
+  def upload_video(self, request, pk=None):
+    """Start a resumable upload of the smartphone video"""
+    smartphone = self.get_object()
+    serializer = self.get_serializer(data = request.data)
+    serializer.is_valid(raise_exception=True)
+    upload = serializer.save(user = request.user, smartphone = smartphone)
+
+    location = request.build_absolute_uri(
+      reverse('smartphone:videoupload-detail', args=[upload.pk])
+    )
+    return Response(
+      serializer.data,
+      status=status.HTTP_201_CREATED,
+      headers={'Location': location, 'Upload-Offset': '0'},
+    )
+
+  @extend_schema(request = serializers.SmartphoneSerializer(many=True))
+  @action(detail=False, methods=['POST', 'PATCH', 'DELETE'], url_path = 'bulk')
+  def bulk(self, request):
+    """Create, update or delete many smartphones at once"""
+    if request.method == 'DELETE':
+      return self._bulk_delete(request)
+
+    instance = None
+    if request.method == 'PATCH':
+      items = request.data if isinstance(request.data, list) else []
+      ids = [
+        item['id'] for item in items
+        if isinstance(item, dict) and isinstance(item.get('id'), int)
+      ]
+      instance = Smartphone.objects.filter(user = request.user, pk__in = ids)
+
+    serializer = self.get_serializer(
+      instance,
+      data = request.data,
+      many = True,
+      partial = instance is not None,
+      max_length = settings.API_BULK_MAX_ITEMS,
+    )
+
+    if not serializer.is_valid():
+      return Response(
+        self._item_errors(serializer.errors),
+        status=status.HTTP_400_BAD_REQUEST,
+      )
+
+    smartphones = serializer.save(user=self.request.user)
+    code = status.HTTP_201_CREATED if instance is None else status.HTTP_200_OK
+
+    return Response({'ids': [s.id for s in smartphones]}, status=code)
+
+  def _item_errors(self, errors):
+    """Key bulk validation errors by item index on every DRF version"""
+    if isinstance(errors, list):
+      return {index: error for index, error in enumerate(errors) if error}
+
+    return errors
+
+  def _bulk_delete(self, request):
+    """Delete the listed smartphones owned by the user"""
+    serializer = serializers.SmartphoneBulkDeleteSerializer(data = request.data)
+    serializer.is_valid(raise_exception=True)
+
+    ids = serializer.validated_data['ids']
+    smartphones = Smartphone.objects.filter(user = request.user, pk__in = ids)
+    deleted = set(smartphones.values_list('id', flat=True))
+    smartphones.delete()
+
+    return Response({
+      'deleted': sorted(deleted),
+      'not_found': sorted(set(ids) - deleted),
+    }, status=status.HTTP_200_OK)
+
 class TagViewSet(
+  CachedReadMixin,
   mixins.CreateModelMixin,
   mixins.DestroyModelMixin,
   mixins.UpdateModelMixin,
@@ -128,7 +334,6 @@ class TagViewSet(
 
   serializer_class = serializers.TagSerializer
   queryset = Tag.objects.all()
-  authentication_classes = (TokenAuthentication,)
   permission_classes = [CustomPermission]
 
   def get_queryset(self):
@@ -137,11 +342,24 @@ class TagViewSet(
 
     return queryset.order_by('-name')
 
+  def _save_unique(self, serializer, **kwargs):
+    """Save a tag, reporting a duplicate name as a validation error"""
+    try:
+      with transaction.atomic():
+        serializer.save(**kwargs)
+    except IntegrityError:
+      raise ValidationError({'name': ['A tag with this name already exists.']})
+
   def perform_create(self, serializer):
     """Create a new smartphone image"""
-    serializer.save(user=self.request.user)
+    self._save_unique(serializer, user=self.request.user)
+
+  def perform_update(self, serializer):
+    """Update a tag"""
+    self._save_unique(serializer)
 
 class SmartphoneImageViewSet(
+  CachedReadMixin,
   mixins.CreateModelMixin,
   mixins.DestroyModelMixin,
   mixins.UpdateModelMixin,
@@ -152,13 +370,226 @@ class SmartphoneImageViewSet(
 
   serializer_class = serializers.SmartphoneImageSerializer
   queryset = SmartphoneImage.objects.all()
-  authentication_classes = (TokenAuthentication,)
   permission_classes = [CustomPermission]
+  pagination_class = IdCursorPagination
 
   def get_queryset(self):
     """Retrieve tags for the authenticated user"""
-    return self.queryset.all().order_by('-id')
+    return self.queryset.select_related('user').order_by('-id')
 
   def perform_create(self, serializer):
     """Create a new smartphone image"""
     serializer.save(user=self.request.user)
+
+@extend_schema_view(
+  partial_update = extend_schema(
+    request = {'application/offset+octet-stream': OpenApiTypes.BINARY},
+    responses = {204: None},
+    parameters = [
+      OpenApiParameter(
+        'Upload-Offset',
+        OpenApiTypes.INT,
+        location = OpenApiParameter.HEADER,
+        required = True,
+        description = 'Byte offset the chunk starts at'
+      ),
+    ],
+  ),
+  finalize = extend_schema(
+    request = None,
+    responses = serializers.SmartphoneSerializer,
+  ),
+)
+class VideoUploadViewSet(
+  mixins.RetrieveModelMixin,
+  mixins.DestroyModelMixin,
+  viewsets.GenericViewSet
+):
+  """
+  Resume, append to and finalize smartphone video uploads.
+
+  Chunks are sent with PATCH as application/offset+octet-stream bodies,
+  each starting at the Upload-Offset the server last reported.
+  """
+
+  serializer_class = serializers.VideoUploadSerializer
+  queryset = VideoUpload.objects.all()
+  permission_classes = [IsAuthenticated]
+  http_method_names = ['get', 'head', 'patch', 'post', 'delete', 'options']
+
+  def get_queryset(self):
+    """Retrieve the uploads of the authenticated user"""
+    return self.queryset.filter(user = self.request.user)
+
+  def _locked_upload(self, pk):
+    """Return the upload, locked until the end of the transaction"""
+    return get_object_or_404(self.get_queryset().select_for_update(), pk = pk)
+
+  def _offset_headers(self, upload):
+    """Return the headers reporting upload progress"""
+    return {
+      'Upload-Offset': str(upload.offset),
+      'Upload-Length': str(upload.size),
+      'Cache-Control': 'no-store',
+    }
+
+  def retrieve(self, request, *args, **kwargs):
+    """Report how many bytes were received, so the client can resume"""
+    upload = self.get_object()
+    serializer = self.get_serializer(upload)
+
+    return Response(serializer.data, headers=self._offset_headers(upload))
+
+  def partial_update(self, request, pk=None):
+    """Append a chunk at the offset given in the Upload-Offset header"""
+    if request.content_type != 'application/offset+octet-stream':
+      return Response(
+        {'detail': 'Chunks must be sent as application/offset+octet-stream.'},
+        status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+      )
+
+    try:
+      offset = int(request.headers['Upload-Offset'])
+      length = int(request.headers.get('Content-Length') or 0)
+    except (KeyError, ValueError):
+      raise ValidationError({'Upload-Offset': 'A byte offset is required.'})
+
+    if length > settings.VIDEO_UPLOAD_CHUNK_SIZE:
+      return Response(
+        {'detail': f'Chunks may not exceed {settings.VIDEO_UPLOAD_CHUNK_SIZE} bytes.'},
+        status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+      )
+
+    with transaction.atomic():
+      upload = self._locked_upload(pk)
+
+      if offset != upload.offset:
+        return Response(
+          {'detail': 'Upload-Offset does not match the received bytes.'},
+          status=status.HTTP_409_CONFLICT,
+          headers=self._offset_headers(upload),
+        )
+
+      if offset + length > upload.size:
+        return Response(
+          {'detail': 'Chunk goes past the declared upload size.'},
+          status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+          headers=self._offset_headers(upload),
+        )
+
+      if length:
+        upload.offset += uploads.append_chunk(upload, request.stream, length)
+        upload.save(update_fields=['offset', 'updated_at'])
+
+    return Response(
+      status=status.HTTP_204_NO_CONTENT,
+      headers=self._offset_headers(upload),
+    )
+
+  @action(detail=True, methods=['POST'])
+  def finalize(self, request, pk=None):
+    """Move the complete upload into place as the smartphone video"""
+    with transaction.atomic():
+      upload = self._locked_upload(pk)
+
+      if upload.offset != upload.size:
+        return Response(
+          {'detail': 'Upload is incomplete.'},
+          status=status.HTTP_409_CONFLICT,
+          headers=self._offset_headers(upload),
+        )
+
+      smartphone = upload.smartphone
+      smartphone.video = uploads.finalize(upload)
+      smartphone.video_status = ProcessingStatus.PENDING
+      smartphone.save()
+      upload.delete()
+
+    serializer = serializers.SmartphoneSerializer(
+      smartphone,
+      context = self.get_serializer_context(),
+    )
+    return Response(serializer.data, status=status.HTTP_200_OK)
+
+  def perform_destroy(self, instance):
+    """Abort an upload and drop the bytes received so far"""
+    uploads.discard(instance)
+    instance.delete()
+
+@extend_schema(
+  parameters = [
+    OpenApiParameter(
+      'prefix',
+      OpenApiTypes.STR,
+      description = 'Beginning of a smartphone or tag name'
+    )
+  ],
+  responses = serializers.SuggestSerializer,
+)
+class SuggestView(APIView):
+  """Suggest smartphone and tag names for typeahead"""
+
+  permission_classes = [CustomPermission]
+
+  def get(self, request):
+    """Return the names matching the requested prefix"""
+    prefix = request.query_params.get('prefix', '').strip()
+
+    if not prefix:
+      return Response({'smartphones': [], 'tags': []})
+
+    key = f'suggest:{prefix.lower()}'
+    suggestions = cache.get(key)
+
+    if suggestions is None:
+      suggestions = {
+        'smartphones': suggest_names(
+          Smartphone.objects.all(),
+          prefix,
+          settings.SUGGEST_LIMIT,
+        ),
+        'tags': suggest_names(
+          Tag.objects.all(),
+          prefix,
+          settings.SUGGEST_LIMIT,
+        ),
+      }
+      cache.set(key, suggestions, settings.SUGGEST_CACHE_TIMEOUT)
+
+    return Response(suggestions)
+
+class CacheStatsView(APIView):
+  """Report response cache hits and misses"""
+
+  permission_classes = [IsAdminUser]
+
+  @extend_schema(responses = serializers.CacheStatsSerializer)
+  def get(self, request):
+    """Return the response cache counters"""
+    return Response(response_cache.stats())
+
+
+class MediaContentNegotiation(BaseContentNegotiation):
+  """Accept any Accept header, media responses carry their own type"""
+
+  def select_parser(self, request, parsers):
+    return parsers[0]
+
+  def select_renderer(self, request, renderers, format_suffix=None):
+    return (renderers[0], renderers[0].media_type)
+
+class MediaView(APIView):
+  """Serve uploaded media after checking the user may read it"""
+
+  permission_classes = [AllowAny]
+  content_negotiation_class = MediaContentNegotiation
+
+  @extend_schema(exclude = True)
+  def get(self, request, name):
+    """Send the media file, or the requested byte range of it"""
+    name = media.normalize_name(name)
+
+    if name is None or not media.can_read(request.user, name):
+      raise Http404('Media file not found.')
+
+    return media.serve(request, name)
@@ -0,0 +1,202 @@
+"""
+Token authentication with cached token lookups
+"""
+import atexit
+import copy
+import hmac
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from rest_framework import exceptions # type: ignore
+from rest_framework.authentication import TokenAuthentication # type: ignore
+from rest_framework.authtoken.models import Token # type: ignore
+
+from core.models import ApiToken
+
+class LocalCache:
+  """Thread-safe in-process LRU cache with per-entry expiry"""
+
+  def __init__(self):
+    self._entries = OrderedDict()
+    self._lock = threading.Lock()
+
+  def get(self, key):
+    """Return the cached value for key, or None if missing or expired"""
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        return None
+
+      expires, value = entry
+      if expires < time.monotonic():
+        del self._entries[key]
+        return None
+
+      self._entries.move_to_end(key)
+      return value
+
+  def set(self, key, value, timeout, max_size):
+    """Store value for timeout seconds, evicting the least recent entries"""
+    with self._lock:
+      self._entries[key] = (time.monotonic() + timeout, value)
+      self._entries.move_to_end(key)
+      while len(self._entries) > max_size:
+        self._entries.popitem(last=False)
+
+  def delete(self, key):
+    """Drop key if present"""
+    with self._lock:
+      self._entries.pop(key, None)
+
+  def clear(self):
+    """Drop every entry"""
+    with self._lock:
+      self._entries.clear()
+
+local_cache = LocalCache()
+
+def _get_cache():
+  """Return the shared cache holding resolved tokens"""
+  return caches[settings.AUTH_TOKEN_CACHE_ALIAS]
+
+def token_cache_key(key_hash):
+  """Return the cache key for a token from its hash, never the token itself"""
+  return f'auth-token:{key_hash}'
+
+def invalidate_tokens(key_hashes):
+  """Forget the cached resolution of the tokens with the given hashes"""
+  cache_keys = [token_cache_key(key_hash) for key_hash in key_hashes]
+  for cache_key in cache_keys:
+    local_cache.delete(cache_key)
+  _get_cache().delete_many(cache_keys)
+
+def invalidate_user(user):
+  """Forget the cached resolution of every token of user"""
+  key_hashes = [
+    ApiToken.hash_key(key)
+    for key in Token.objects.filter(user = user).values_list('key', flat=True)
+  ]
+  key_hashes.extend(
+    ApiToken.objects.filter(user = user).values_list('key_hash', flat=True)
+  )
+  invalidate_tokens(key_hashes)
+
+class LastUsedRecorder:
+  """
+  Collect API token uses and write them back in batches.
+
+  Uses are recorded in memory during the request and written once it
+  finished, at most every API_TOKEN_LAST_USED_INTERVAL seconds per
+  process, with one UPDATE covering every token used since the last one.
+  """
+
+  def __init__(self):
+    self._pending = set()
+    self._flushed_at = time.monotonic()
+    self._lock = threading.Lock()
+
+  def touch(self, token):
+    """Record a use of token"""
+    with self._lock:
+      self._pending.add(token.pk)
+
+  def flush_if_due(self):
+    """Flush when the interval elapsed and return True if it did"""
+    with self._lock:
+      due = self._pending and (
+        time.monotonic() - self._flushed_at
+        >= settings.API_TOKEN_LAST_USED_INTERVAL
+      )
+
+    if due:
+      self.flush()
+
+    return bool(due)
+
+  def flush(self):
+    """Write the recorded uses to the database"""
+    with self._lock:
+      pks, self._pending = self._pending, set()
+      self._flushed_at = time.monotonic()
+
+    if pks:
+      ApiToken.objects.filter(pk__in = pks).update(last_used_at = timezone.now())
+
+last_used = LastUsedRecorder()
+
+@atexit.register
+def _flush_last_used():
+  """Write pending token uses when the worker exits"""
+  try:
+    last_used.flush()
+  except DatabaseError:
+    # The database went first, as after a test run, the uses are dropped
+    pass
+
+class CachedTokenAuthentication(TokenAuthentication):
+  """
+  Token authentication resolving hot tokens without a database query.
+
+  Accepts the hashed, expiring API tokens issued at login as well as
+  legacy DRF tokens. Resolved tokens are kept in a small in-process LRU
+  backed by the shared cache. The shared entry is dropped when the token
+  is deleted or its user changes; the in-process entry expires after
+  AUTH_TOKEN_LOCAL_TIMEOUT seconds in the other workers.
+  """
+
+  def _resolve_api_token(self, prefix, key_hash):
+    """Return the user and API token matching a key"""
+    token = ApiToken.objects.select_related('user').filter(
+      prefix = prefix,
+    ).first()
+
+    if token is None or not hmac.compare_digest(token.key_hash, key_hash):
+      raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+    if not token.user.is_active:
+      raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+    return (token.user, token)
+
+  def authenticate_credentials(self, key):
+    prefix, separator, _secret = key.partition('.')
+    key_hash = ApiToken.hash_key(key)
+    cache_key = token_cache_key(key_hash)
+    resolved = local_cache.get(cache_key)
+
+    if resolved is None:
+      resolved = _get_cache().get(cache_key)
+
+      if resolved is None:
+        if separator:
+          resolved = self._resolve_api_token(prefix, key_hash)
+        else:
+          resolved = super().authenticate_credentials(key)
+        _get_cache().set(
+          cache_key,
+          resolved,
+          settings.AUTH_TOKEN_CACHE_TIMEOUT,
+        )
+
+      local_cache.set(
+        cache_key,
+        resolved,
+        settings.AUTH_TOKEN_LOCAL_TIMEOUT,
+        settings.AUTH_TOKEN_LOCAL_SIZE,
+      )
+
+    user, token = resolved
+    if isinstance(token, ApiToken):
+      if token.is_expired():
+        raise exceptions.AuthenticationFailed(_('Token has expired.'))
+      last_used.touch(token)
+
+    # Requests may modify their user, keep the cached one untouched
+    return (copy.copy(user), token)
@@ -10,6 +10,8 @@ from django.contrib.auth import (
 from django.utils.translation import gettext as _
 from rest_framework import serializers # type: ignore
 
+from core.models import ApiToken
+
 class UserSerializer(serializers.ModelSerializer):
   """
   Serializer for the user model
@@ -44,6 +46,11 @@ class AuthTokenSerializer(serializers.Serializer):
     style = {'input_type': 'password'},
     trim_whitespace = False,
   )
+  name = serializers.CharField(
+    max_length = 255,
+    required = False,
+    allow_blank = True,
+  )
 
   def validate(self, attrs):
     """Validate and autheticate the user"""
@@ -62,4 +69,12 @@ class AuthTokenSerializer(serializers.Serializer):
       raise serializers.ValidationError(msg, code = 'authorization')
 
     attrs['user'] = user
-    return attrs
\ No newline at end of file
+    return attrs
+
+class ApiTokenSerializer(serializers.ModelSerializer):
+  """Serializer for issued API tokens, never exposing the key"""
+
+  class Meta:
+    model = ApiToken
+    fields = ('id', 'name', 'prefix', 'created_at', 'expires_at', 'last_used_at',)
+    read_only_fields = fields
@@ -0,0 +1,45 @@
+"""
+Signal handlers for the user API
+"""
+from django.contrib.auth import get_user_model
+from django.core.signals import request_finished
+from django.db import connections, router
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token # type: ignore
+
+from core.models import ApiToken
+from user.authentication import (
+  invalidate_tokens,
+  invalidate_user,
+  last_used,
+)
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+  """Stop accepting a deleted token from the cache"""
+  invalidate_tokens([ApiToken.hash_key(instance.key)])
+
+@receiver(post_delete, sender=ApiToken)
+def invalidate_deleted_api_token(sender, instance, **kwargs):
+  """Stop accepting a revoked API token from the cache"""
+  invalidate_tokens([instance.key_hash])
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_changed_user(sender, instance, created, **kwargs):
+  """Drop cached tokens of a changed, possibly deactivated, user"""
+  if not created:
+    invalidate_user(instance)
+
+@receiver(request_finished)
+def flush_token_uses(sender, **kwargs):
+  """Write back the recorded token uses once a response was sent"""
+  if not last_used.flush_if_due():
+    return
+
+  # close_old_connections already ran for this request, redo it for the
+  # connection the flush opened
+  connection = connections[router.db_for_write(ApiToken)]
+  if not connection.in_atomic_block:
+    connection.close_if_unusable_or_obsolete()
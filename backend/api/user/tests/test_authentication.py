@@ -0,0 +1,63 @@
+"""Tests for cached token authentication"""
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token # type: ignore
+from rest_framework.test import APIClient # type: ignore
+from rest_framework import status # type: ignore
+
+ME_URL = reverse('user:me')
+
+class CachedTokenAuthenticationTests(TestCase):
+  """Test resolving tokens through the cache"""
+
+  def setUp(self):
+    self.user = get_user_model().objects.create_user(
+      email = 'token@example.com',
+      password = 'testpass123',
+      name = 'Token',
+    )
+    self.token = Token.objects.create(user = self.user)
+    self.client = APIClient()
+    self.client.credentials(HTTP_AUTHORIZATION = f'Token {self.token.key}')
+
+  def test_hot_token_skips_database(self):
+    """Test a token seen before is resolved without queries"""
+    res = self.client.get(ME_URL)
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    with self.assertNumQueries(0):
+      res = self.client.get(ME_URL)
+
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+    self.assertEqual(res.data['email'], self.user.email)
+
+  def test_deleted_token_rejected(self):
+    """Test a deleted token stops working immediately"""
+    self.client.get(ME_URL)
+
+    self.token.delete()
+    res = self.client.get(ME_URL)
+
+    self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+  def test_deactivated_user_rejected(self):
+    """Test tokens of a deactivated user stop working immediately"""
+    self.client.get(ME_URL)
+
+    self.user.is_active = False
+    self.user.save()
+    res = self.client.get(ME_URL)
+
+    self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+  def test_profile_update_visible(self):
+    """Test the cached user is refreshed after it changes"""
+    self.client.get(ME_URL)
+
+    self.client.patch(ME_URL, {'name': 'Renamed'})
+    res = self.client.get(ME_URL)
+
+    self.assertEqual(res.data['name'], 'Renamed')
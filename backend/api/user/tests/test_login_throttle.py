@@ -0,0 +1,71 @@
+"""Tests for login rate limits"""
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient # type: ignore
+from rest_framework import status # type: ignore
+
+TOKEN_URL = reverse('user:token')
+
+class LoginThrottleTests(TestCase):
+  """Test rejecting login bursts before hashing"""
+
+  def setUp(self):
+    cache.clear()
+    self.addCleanup(cache.clear)
+    self.user = get_user_model().objects.create_user(
+      email = 'throttle@example.com',
+      password = 'testpass123',
+    )
+    self.client = APIClient()
+
+  @override_settings(LOGIN_RATE_LIMIT_IP = None, LOGIN_RATE_LIMIT_EMAIL = '2/min')
+  def test_email_limit_skips_hashing(self):
+    """Test attempts over the email limit never reach the hasher"""
+    payload = {'email': self.user.email, 'password': 'wrong'}
+    for _ in range(2):
+      res = self.client.post(TOKEN_URL, payload)
+      self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    with patch('user.serializers.authenticate') as authenticate:
+      res = self.client.post(TOKEN_URL, {
+        'email': self.user.email.upper(),
+        'password': 'testpass123',
+      }, REMOTE_ADDR = '10.0.0.2')
+
+    self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+    self.assertIn('Retry-After', res)
+    authenticate.assert_not_called()
+
+  @override_settings(LOGIN_RATE_LIMIT_IP = '2/min', LOGIN_RATE_LIMIT_EMAIL = None)
+  def test_ip_limit_across_emails(self):
+    """Test one address cannot spread attempts over many accounts"""
+    for number in range(2):
+      self.client.post(TOKEN_URL, {
+        'email': f'user{number}@example.com',
+        'password': 'wrong',
+      })
+
+    res = self.client.post(TOKEN_URL, {
+      'email': self.user.email,
+      'password': 'testpass123',
+    })
+
+    self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+  @override_settings(LOGIN_RATE_LIMIT_IP = '2/min', LOGIN_RATE_LIMIT_EMAIL = None)
+  def test_other_address_unaffected(self):
+    """Test a throttled address does not lock out other clients"""
+    for _ in range(3):
+      self.client.post(TOKEN_URL, {'email': self.user.email, 'password': 'x'})
+
+    res = self.client.post(TOKEN_URL, {
+      'email': self.user.email,
+      'password': 'testpass123',
+    }, REMOTE_ADDR = '10.0.0.2')
+
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
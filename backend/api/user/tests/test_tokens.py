@@ -0,0 +1,200 @@
+"""Tests for expiring API tokens"""
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.db import ProgrammingError
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient # type: ignore
+from rest_framework import status # type: ignore
+
+from core.models import ApiToken
+from user.authentication import _flush_last_used, last_used
+
+TOKEN_URL = reverse('user:token')
+TOKENS_URL = reverse('user:tokens')
+ME_URL = reverse('user:me')
+
+def revoke_url(token_id):
+  """Create and return a token revoke URL"""
+  return reverse('user:token-revoke', args=[token_id])
+
+class ApiTokenTests(TestCase):
+  """Test issuing, using and revoking API tokens"""
+
+  def setUp(self):
+    self.user = get_user_model().objects.create_user(
+      email = 'apitoken@example.com',
+      password = 'testpass123',
+      name = 'Token',
+    )
+    self.client = APIClient()
+
+  def authenticate(self, key):
+    """Send key with every following request"""
+    self.client.credentials(HTTP_AUTHORIZATION = f'Token {key}')
+
+  def expire(self, token):
+    """Move the expiry of token into the past"""
+    ApiToken.objects.filter(pk = token.pk).update(
+      expires_at = token.expires_at - timedelta(days=2),
+    )
+
+  def test_login_issues_hashed_token(self):
+    """Test login returns a prefixed key that is only stored hashed"""
+    res = self.client.post(TOKEN_URL, {
+      'email': self.user.email,
+      'password': 'testpass123',
+      'name': 'laptop',
+    })
+
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+    key = res.data['token']
+    token = ApiToken.objects.get(user = self.user)
+    self.assertEqual(key.split('.')[0], token.prefix)
+    self.assertEqual(token.key_hash, ApiToken.hash_key(key))
+    self.assertNotEqual(token.key_hash, key)
+    self.assertEqual(token.name, 'laptop')
+    self.assertIsNotNone(token.expires_at)
+
+    self.authenticate(key)
+    res = self.client.get(ME_URL)
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+  def test_wrong_secret_rejected(self):
+    """Test a key with a known prefix but wrong secret is rejected"""
+    token, key = ApiToken.objects.create_token(self.user)
+
+    self.authenticate(f'{token.prefix}.wrong')
+    res = self.client.get(ME_URL)
+
+    self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+  def test_expired_token_rejected(self):
+    """Test a token past its expiry stops working, even when cached"""
+    token, key = ApiToken.objects.create_token(
+      self.user,
+      lifetime = timedelta(hours=1),
+    )
+    self.authenticate(key)
+    self.client.get(ME_URL)
+
+    ApiToken.objects.filter(pk = token.pk).update(
+      expires_at = token.expires_at - timedelta(hours=2),
+    )
+    self.user.save()
+    res = self.client.get(ME_URL)
+
+    self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+  def test_list_tokens_hides_keys(self):
+    """Test listing tokens never exposes keys or hashes"""
+    token, key = ApiToken.objects.create_token(self.user, name = 'cli')
+    other = get_user_model().objects.create_user(
+      email = 'other@example.com',
+      password = 'testpass123',
+    )
+    ApiToken.objects.create_token(other)
+
+    self.authenticate(key)
+    res = self.client.get(TOKENS_URL)
+
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+    self.assertEqual(len(res.data), 1)
+    self.assertEqual(res.data[0]['prefix'], token.prefix)
+    self.assertNotIn('key_hash', res.data[0])
+
+  def test_revoke_token(self):
+    """Test a revoked token stops working immediately"""
+    token, key = ApiToken.objects.create_token(self.user)
+    self.authenticate(key)
+    self.client.get(ME_URL)
+
+    res = self.client.delete(revoke_url(token.id))
+    self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+    res = self.client.get(ME_URL)
+    self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+  @override_settings(API_TOKEN_LAST_USED_INTERVAL = 3600)
+  def test_hot_token_skips_database(self):
+    """Test a token seen before is verified without queries"""
+    token, key = ApiToken.objects.create_token(self.user)
+    self.authenticate(key)
+    self.client.get(ME_URL)
+
+    with self.assertNumQueries(0):
+      res = self.client.get(ME_URL)
+
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+  @override_settings(API_TOKEN_LAST_USED_INTERVAL = 0)
+  def test_last_used_recorded(self):
+    """Test token uses are written back once the request finished"""
+    token, key = ApiToken.objects.create_token(self.user)
+    self.authenticate(key)
+
+    self.client.get(ME_URL)
+
+    token.refresh_from_db()
+    self.assertIsNotNone(token.last_used_at)
+
+  def test_exit_flush_without_database_is_silent(self):
+    """Test pending uses are dropped quietly when the table is gone"""
+    with patch.object(
+      last_used,
+      'flush',
+      side_effect = ProgrammingError('relation does not exist'),
+    ), self.assertNoLogs('user.authentication'):
+      _flush_last_used()
+
+  def test_login_purges_expired_tokens(self):
+    """Test logging in deletes the user's expired tokens only"""
+    expired, _ = ApiToken.objects.create_token(
+      self.user,
+      lifetime = timedelta(days=1),
+    )
+    self.expire(expired)
+    kept, _ = ApiToken.objects.create_token(self.user)
+    other = get_user_model().objects.create_user(
+      email = 'other@example.com',
+      password = 'testpass123',
+    )
+    other_expired, _ = ApiToken.objects.create_token(
+      other,
+      lifetime = timedelta(days=1),
+    )
+    self.expire(other_expired)
+
+    res = self.client.post(TOKEN_URL, {
+      'email': self.user.email,
+      'password': 'testpass123',
+    })
+
+    self.assertEqual(res.status_code, status.HTTP_200_OK)
+    self.assertFalse(ApiToken.objects.filter(pk = expired.pk).exists())
+    self.assertTrue(ApiToken.objects.filter(pk = kept.pk).exists())
+    self.assertTrue(ApiToken.objects.filter(pk = other_expired.pk).exists())
+    self.assertEqual(self.user.api_tokens.count(), 2)
+
+  def test_purge_tokens_command(self):
+    """Test the command deletes every expired token"""
+    expired, _ = ApiToken.objects.create_token(
+      self.user,
+      lifetime = timedelta(days=1),
+    )
+    self.expire(expired)
+    kept, _ = ApiToken.objects.create_token(
+      self.user,
+      lifetime = timedelta(days=1),
+    )
+    out = StringIO()
+
+    call_command('purge_tokens', stdout = out)
+
+    self.assertEqual(list(ApiToken.objects.all()), [kept])
+    self.assertIn('Deleted 1 expired tokens.', out.getvalue())
@@ -0,0 +1,49 @@
+"""
+Login rate limits applied before any password is hashed
+"""
+from django.conf import settings
+from django.core.cache import caches
+
+from rest_framework.throttling import SimpleRateThrottle # type: ignore
+
+class LoginRateThrottle(SimpleRateThrottle):
+  """
+  Limit login attempts using a rate taken from the settings.
+
+  Throttles run before the serializer, so rejected attempts never reach
+  the password hasher. A rate of None disables the limit.
+  """
+  rate_setting = None
+
+  def __init__(self):
+    self.cache = caches[settings.LOGIN_RATE_LIMIT_CACHE_ALIAS]
+    super().__init__()
+
+  def get_rate(self):
+    return getattr(settings, self.rate_setting)
+
+class LoginIPRateThrottle(LoginRateThrottle):
+  """Limit login attempts per client address"""
+  scope = 'login-ip'
+  rate_setting = 'LOGIN_RATE_LIMIT_IP'
+
+  def get_cache_key(self, request, view):
+    return self.cache_format % {
+      'scope': self.scope,
+      'ident': self.get_ident(request),
+    }
+
+class LoginEmailRateThrottle(LoginRateThrottle):
+  """Limit login attempts per account, whatever address they come from"""
+  scope = 'login-email'
+  rate_setting = 'LOGIN_RATE_LIMIT_EMAIL'
+
+  def get_cache_key(self, request, view):
+    email = request.data.get('email')
+    if not isinstance(email, str) or not email.strip():
+      return None
+
+    return self.cache_format % {
+      'scope': self.scope,
+      'ident': email.strip().lower(),
+    }
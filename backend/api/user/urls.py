@@ -10,5 +10,11 @@ app_name = 'user'
 urlpatterns = [
     path('create/', views.CreateUserView.as_view(), name='create'),
     path('token/', views.CreateTokenView.as_view(), name='token'),
-    path('me/', views.ManageUserView.as_view(), name='me')
+    path('me/', views.ManageUserView.as_view(), name='me'),
+    path('tokens/', views.ListTokenView.as_view(), name='tokens'),
+    path(
+      'tokens/<int:pk>/',
+      views.RevokeTokenView.as_view(),
+      name='token-revoke',
+    ),
 ]
@@ -1,17 +1,27 @@
 """
 Views for the user API
 """
+from datetime import timedelta
+
+from django.conf import settings
 
 from rest_framework import ( # type: ignore
   generics,
-  authentication,
   permissions
 )
 from rest_framework.authtoken.views import ObtainAuthToken # type: ignore
+from rest_framework.response import Response # type: ignore
 from rest_framework.settings import api_settings # type: ignore
+
+from core.models import ApiToken
 from user.serializers import (
   UserSerializer,
   AuthTokenSerializer,
+  ApiTokenSerializer,
+)
+from user.throttling import (
+  LoginIPRateThrottle,
+  LoginEmailRateThrottle,
 )
 
 class CreateUserView(generics.CreateAPIView):
@@ -28,6 +38,23 @@ class CreateTokenView(ObtainAuthToken):
   """Create a new auth token for user"""
   serializer_class = AuthTokenSerializer
   renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+  throttle_classes = (LoginIPRateThrottle, LoginEmailRateThrottle)
+
+  def post(self, request, *args, **kwargs):
+    """Issue a new expiring API token for the credentials"""
+    serializer = self.get_serializer(data = request.data)
+    serializer.is_valid(raise_exception = True)
+
+    user = serializer.validated_data['user']
+    # Every login issues a token, drop the ones that ran out meanwhile
+    user.api_tokens.purge_expired()
+    token, key = ApiToken.objects.create_token(
+      user,
+      name = serializer.validated_data.get('name', ''),
+      lifetime = timedelta(seconds = settings.API_TOKEN_LIFETIME),
+    )
+
+    return Response({'token': key, 'expires_at': token.expires_at})
 
 '''
 The generics.RetrieveUpdateAPIView is a class in Django REST Framework
@@ -37,9 +64,27 @@ handling GET and PUT or PATCH requests automatically.
 class ManageUserView(generics.RetrieveUpdateAPIView):
   """Manage the authenticated user"""
   serializer_class = UserSerializer
-  authentication_classes = [authentication.TokenAuthentication]
   permission_classes = [permissions.IsAuthenticated]
 
   def get_object(self):
     """Retrieve and return authenticated user"""
-    return self.request.user
\ No newline at end of file
+    return self.request.user
+
+class ListTokenView(generics.ListAPIView):
+  """List the API tokens of the authenticated user"""
+  serializer_class = ApiTokenSerializer
+  permission_classes = [permissions.IsAuthenticated]
+  pagination_class = None
+
+  def get_queryset(self):
+    """Retrieve tokens for authenticated user"""
+    return ApiToken.objects.filter(user = self.request.user).order_by('-id')
+
+class RevokeTokenView(generics.DestroyAPIView):
+  """Revoke an API token of the authenticated user"""
+  serializer_class = ApiTokenSerializer
+  permission_classes = [permissions.IsAuthenticated]
+
+  def get_queryset(self):
+    """Retrieve tokens for authenticated user"""
+    return ApiToken.objects.filter(user = self.request.user)
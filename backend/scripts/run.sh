@@ -6,4 +6,10 @@ python manage.py wait_for_db
 python manage.py collectstatic --noinput
 python manage.py migrate
 
-uwsgi --socket :9000 --workers 4 --master --enable-threads --module ecarrot.wsgi
\ No newline at end of file
+if [ "${APP_SERVER:-uwsgi}" = "asgi" ]; then
+  exec uvicorn ecarrot.asgi:application \
+    --host 0.0.0.0 --port 9000 --workers 4 \
+    --proxy-headers --forwarded-allow-ips '*'
+fi
+
+uwsgi --socket :9000 --workers 4 --master --enable-threads --module ecarrot.wsgi
@@ -1,13 +1,19 @@
 server {
   listen ${LISTEN_PORT};
 
-  location /static {
-    alias /vol/static;
+  location /static/static {
+    alias /vol/static/static;
+  }
+
+  # Media is sent by nginx once Django has checked access (X-Accel-Redirect)
+  location /protected-media/ {
+    internal;
+    alias /vol/static/media/;
   }
 
   location / {
-    uwsgi_pass  ${APP_HOST}:${APP_PORT};
-    include     /etc/nginx/uwsgi_params;
+    # uwsgi or asgi upstream, chosen by APP_SERVER in run.sh
+    include     /etc/nginx/app.conf;
     client_max_body_size 10M;
   }
 }
\ No newline at end of file
@@ -3,4 +3,6 @@
 set -e
 
 envsubst < /etc/nginx/default.conf.tpl > /etc/nginx/conf.d/default.conf
-nginx -g 'daemon off;'
\ No newline at end of file
+envsubst '${APP_HOST} ${APP_PORT}' \
+  < /etc/nginx/app-${APP_SERVER}.conf.tpl > /etc/nginx/app.conf
+nginx -g 'daemon off;'